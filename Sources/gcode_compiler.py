@@ -0,0 +1,353 @@
+# Compile G-code into a compact binary move stream and replay it on a GCodeMachine.
+# Compiling runs the interpreter once (tokenizing, float parsing, arc resolution), so replaying
+# on the Pico only unpacks fixed width records and calls move/penup/pendown.
+#
+# Usage on the host or the device:
+#   python gcode_compiler.py absolute.gcode absolute.gcb [--steps]
+#
+# Lines are stored as single moves and arcs as chords within half a motor step, finer chords can't be drawn,
+# so the program is smaller than its G-code.
+#
+# File layout:
+#   header  b"GCB2" + struct "<Bf"  coordinate type ('f' float32 mm or 'i' int32 steps), steps_per_mm
+#   records one opcode byte, move records follow it with struct "<ff" or "<ii" absolute x, y
+#           and feed rate records with struct "<f" the F word in mm/min
+# Replay runs pen up records at the machine's rapid rate and pen down records at the feed rate, like G0 and G1.
+#
+# compile_program() runs the same interpretation into a Program of pen down polylines and pen up travels
+# instead, for tools on the host that work on the geometry of a whole program.
+import math
+import struct
+import sys
+from array import array
+
+from gcode_machine import GCodeMachine
+from gcode_interpreter import GcodeInterpreter, SilentIO
+
+MAGIC = b"GCB2"
+HEADER_FORMAT = "<Bf"
+
+OP_END = 0
+OP_MOVE = 1
+OP_PENUP = 2
+OP_PENDOWN = 3
+OP_HOME = 4
+OP_FEED_RATE = 5
+
+FEED_RATE_FORMAT = "<f"
+
+FLOAT_COORDINATES = ord('f')
+STEP_COORDINATES = ord('i')
+
+
+def move_format(coordinates):
+    return "<ii" if coordinates == STEP_COORDINATES else "<ff"
+
+
+class _CompilingMachine(GCodeMachine):
+    """GCodeMachine that writes each absolute move and pen change as a binary record"""
+
+    def __init__(self, out, steps_per_mm, rounding_precision, line_increment, integer_steps, arc_tolerance):
+        super().__init__(steps_per_mm, 0, rounding_precision, line_increment)
+        self.arc_tolerance = arc_tolerance
+        self.out = out
+        self.coordinates = STEP_COORDINATES if integer_steps else FLOAT_COORDINATES
+        self.format = move_format(self.coordinates)
+        self.record_count = 0
+        # F of the last feed rate record
+        self.recorded_feed_rate = None
+
+    def _record(self, opcode):
+        self.out.write(bytes((opcode,)))
+        self.record_count += 1
+
+    def _record_move(self, x, y):
+        if self.coordinates == STEP_COORDINATES:
+            x = int(round(x * self.steps_per_mm))
+            y = int(round(y * self.steps_per_mm))
+        self._record(OP_MOVE)
+        self.out.write(struct.pack(self.format, x, y))
+
+    def move(self, x = None, y = None):
+        if self.relative_mode:
+            next_x = self.absolute_x + (0 if x is None else x)
+            next_y = self.absolute_y + (0 if y is None else y)
+        else:
+            next_x = self.absolute_x if x is None else x
+            next_y = self.absolute_y if y is None else y
+        # zero length moves are no-ops on every machine, don't store them
+        if next_x != self.absolute_x or next_y != self.absolute_y:
+            self._record_move(next_x, next_y)
+        self.absolute_x = next_x
+        self.absolute_y = next_y
+
+    def set_feed_rate(self, feed_rate):
+        super().set_feed_rate(feed_rate)
+        # the F word itself, replay clamps it to the max rate of its machine
+        if feed_rate > 0 and feed_rate != self.recorded_feed_rate:
+            self.recorded_feed_rate = feed_rate
+            self._record(OP_FEED_RATE)
+            self.out.write(struct.pack(FEED_RATE_FORMAT, feed_rate))
+
+    def home(self):
+        self.penup()
+        self._record(OP_HOME)
+        self.absolute_x = 0
+        self.absolute_y = 0
+
+    def penup(self):
+        if self.is_pendown:
+            self.is_pendown = False
+            self._record(OP_PENUP)
+
+    def pendown(self):
+        if not self.is_pendown:
+            self.is_pendown = True
+            self._record(OP_PENDOWN)
+
+    def end(self):
+        self._record(OP_END)
+
+
+def compile_lines(lines, out, steps_per_mm=11, integer_steps=False, rounding_precision=0, line_increment=0,
+                  arc_tolerance=None):
+    """
+    Compile G-code lines into binary records written to the out stream.
+    The geometry settings should match the machine the program is replayed on,
+    the defaults match StepperGCodeMachine, which draws every line as a single move.
+    :param arc_tolerance: mm the arc chords may stray from the arc, defaults to half a step
+    :return: number of records written, including the end record
+    """
+    if arc_tolerance is None:
+        arc_tolerance = 0.5 / steps_per_mm
+    machine = _CompilingMachine(out, steps_per_mm, rounding_precision, line_increment, integer_steps, arc_tolerance)
+    out.write(MAGIC)
+    out.write(struct.pack(HEADER_FORMAT, machine.coordinates, steps_per_mm))
+    interpret_lines(machine, lines)
+    machine.end()
+    return machine.record_count
+
+
+def interpret_lines(machine, lines):
+    """Run G-code lines through a GcodeInterpreter driving machine, up to the end or M30"""
+    interpreter = GcodeInterpreter(machine, SilentIO())
+    line_number = 0
+    for line in lines:
+        line_number += 1
+        try:
+            interpreter.gcode(line.strip())
+        except KeyboardInterrupt:
+            # M30 end of program
+            break
+        except Exception as e:
+            raise ValueError(f"line {line_number}: {e}")
+
+
+def compile_file(source_path, target_path, steps_per_mm=11, integer_steps=False, rounding_precision=0, line_increment=0,
+                 arc_tolerance=None):
+    """Compile a G-code file into a binary program file, returns the number of records written"""
+    with open(source_path, 'r') as source, open(target_path, 'wb') as target:
+        return compile_lines(source, target, steps_per_mm, integer_steps, rounding_precision, line_increment,
+                             arc_tolerance)
+
+
+def path_length(path):
+    """Length of a path stored as x0, y0, x1, y1, ..."""
+    length = 0.0
+    for i in range(2, len(path), 2):
+        length += math.sqrt((path[i] - path[i - 2]) ** 2 + (path[i + 1] - path[i - 1]) ** 2)
+    return length
+
+
+class Program:
+    """
+    A G-code program as geometry: the pen down polylines it draws and the pen up travels between them.
+    Every path is an array('d') of absolute x0, y0, x1, y1, ... in mm starting where the pen went down or up,
+    travels[i] leads to the start of polylines[i] and the last travel follows the last polyline,
+    so there is always one more travel than polylines. feed_rates[i] is the F word polylines[i] is drawn at,
+    0 when the program gave none. A change of F splits a polyline, with an empty travel in between.
+    """
+
+    def __init__(self, start_x=0.0, start_y=0.0):
+        self.polylines = []
+        self.feed_rates = []
+        self.travels = [array('d', (start_x, start_y))]
+
+    def draw_length(self):
+        return sum(path_length(polyline) for polyline in self.polylines)
+
+    def travel_length(self):
+        return sum(path_length(travel) for travel in self.travels)
+
+    def execute(self, machine):
+        """Draw the program on machine with absolute moves"""
+        relative_mode = machine.relative_mode
+        machine.relative_mode = False
+        try:
+            for index, travel in enumerate(self.travels):
+                machine.penup()
+                machine.select_rate(rapid=True)
+                for i in range(2, len(travel), 2):
+                    machine.move(travel[i], travel[i + 1])
+                if index < len(self.polylines):
+                    polyline = self.polylines[index]
+                    machine.set_feed_rate(self.feed_rates[index])
+                    machine.select_rate()
+                    machine.pendown()
+                    for i in range(2, len(polyline), 2):
+                        machine.move(polyline[i], polyline[i + 1])
+        finally:
+            machine.relative_mode = relative_mode
+
+
+class _ProgramMachine(GCodeMachine):
+    """GCodeMachine that collects its moves into a Program"""
+
+    def __init__(self, steps_per_mm, arc_tolerance):
+        # a line_increment of 0 keeps lines as single segments
+        super().__init__(steps_per_mm, 0, 0, 0)
+        if arc_tolerance is not None:
+            self.arc_tolerance = arc_tolerance
+        self.program = Program()
+        self.path = self.program.travels[0]
+        # the F word in effect, 0 until the program gives one
+        self.f_word = 0
+
+    def move(self, x = None, y = None):
+        if self.relative_mode:
+            next_x = self.absolute_x + (0 if x is None else x)
+            next_y = self.absolute_y + (0 if y is None else y)
+        else:
+            next_x = self.absolute_x if x is None else x
+            next_y = self.absolute_y if y is None else y
+        if next_x != self.absolute_x or next_y != self.absolute_y:
+            self.path.append(next_x)
+            self.path.append(next_y)
+        self.absolute_x = next_x
+        self.absolute_y = next_y
+
+    def set_feed_rate(self, feed_rate):
+        super().set_feed_rate(feed_rate)
+        if feed_rate <= 0 or feed_rate == self.f_word:
+            return
+        self.f_word = feed_rate
+        if self.is_pendown:
+            if len(self.path) > 2:
+                # carry on drawing from here at the new rate in a polyline of its own
+                self.program.travels.append(array('d', (self.absolute_x, self.absolute_y)))
+                self._start_polyline()
+            else:
+                self.program.feed_rates[-1] = feed_rate
+
+    def _start_polyline(self):
+        self.path = array('d', (self.absolute_x, self.absolute_y))
+        self.program.polylines.append(self.path)
+        self.program.feed_rates.append(self.f_word)
+
+    def home(self):
+        self.penup()
+        relative_mode = self.relative_mode
+        self.relative_mode = False
+        self.move(0, 0)
+        self.relative_mode = relative_mode
+
+    def penup(self):
+        if self.is_pendown:
+            self.is_pendown = False
+            self.path = array('d', (self.absolute_x, self.absolute_y))
+            self.program.travels.append(self.path)
+
+    def pendown(self):
+        if not self.is_pendown:
+            self.is_pendown = True
+            self._start_polyline()
+
+
+def compile_program(lines, steps_per_mm=11, arc_tolerance=None):
+    """
+    Interpret G-code lines, keeping the modal state (G90/G91, pen, position) without driving a machine,
+    into a Program of pen down polylines and pen up travels. Lines stay single segments and arcs are
+    split into chords within arc_tolerance mm, by default the GCodeMachine $12 setting.
+    :return: Program
+    """
+    machine = _ProgramMachine(steps_per_mm, arc_tolerance)
+    interpret_lines(machine, lines)
+    machine.penup()
+    return machine.program
+
+
+class CompiledFileIO:
+    """Replay a compiled program file straight into a GCodeMachine.
+    Records are read one at a time into a reusable buffer so the program never has to fit in RAM.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.coordinates, self.steps_per_mm = self._read_header(f)
+        self.format = move_format(self.coordinates)
+        self.move_size = struct.calcsize(self.format)
+        self.feed_rate_size = struct.calcsize(FEED_RATE_FORMAT)
+
+    def _read_header(self, f):
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a compiled G-code program: {self.path}")
+        return struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+
+    def records(self):
+        """Yield (opcode, x, y) tuples with x, y in millimeters, or the feed rate in mm/min as x of feed rate records"""
+        scale = 1 / self.steps_per_mm if self.coordinates == STEP_COORDINATES else 1
+        opcode_buffer = bytearray(1)
+        move_buffer = bytearray(self.move_size)
+        feed_rate_buffer = bytearray(self.feed_rate_size)
+        with open(self.path, 'rb') as f:
+            self._read_header(f)
+            while f.readinto(opcode_buffer) == 1:
+                opcode = opcode_buffer[0]
+                if opcode == OP_END:
+                    break
+                if opcode == OP_MOVE:
+                    if f.readinto(move_buffer) != self.move_size:
+                        break
+                    x, y = struct.unpack_from(self.format, move_buffer)
+                    yield opcode, x * scale, y * scale
+                elif opcode == OP_FEED_RATE:
+                    if f.readinto(feed_rate_buffer) != self.feed_rate_size:
+                        break
+                    yield opcode, struct.unpack_from(FEED_RATE_FORMAT, feed_rate_buffer)[0], 0
+                else:
+                    yield opcode, 0, 0
+
+    def execute(self, machine):
+        """Run the program on machine, returns the number of records executed"""
+        relative_mode = machine.relative_mode
+        machine.relative_mode = False
+        machine.select_rate(rapid=not machine.is_pendown)
+        count = 0
+        try:
+            for opcode, x, y in self.records():
+                if opcode == OP_MOVE:
+                    machine.move(x, y)
+                elif opcode == OP_PENUP:
+                    machine.penup()
+                    machine.select_rate(rapid=True)
+                elif opcode == OP_PENDOWN:
+                    machine.pendown()
+                    machine.select_rate()
+                elif opcode == OP_HOME:
+                    machine.home()
+                    machine.select_rate(rapid=True)
+                elif opcode == OP_FEED_RATE:
+                    machine.set_feed_rate(x)
+                    machine.select_rate(rapid=not machine.is_pendown)
+                count += 1
+        finally:
+            machine.relative_mode = relative_mode
+        return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python gcode_compiler.py source.gcode target.gcb [--steps]")
+    else:
+        count = compile_file(sys.argv[1], sys.argv[2], integer_steps="--steps" in sys.argv)
+        print(f"Compiled {sys.argv[1]} to {sys.argv[2]}: {count} records")
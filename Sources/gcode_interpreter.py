@@ -2,20 +2,52 @@
 # Pico Plotter Project
 # 28 June 2025
 
-import sys, select
-from gcode_machine import GCodeMachine
+import os, sys, select
+from gcode_machine import GCodeMachine, SoftReset
 from time_compat import tick_millis, ticks_diff, sleep_secs
 #from enum import StrEnum
 from point import Point
+from gcode_parser import parse_line
 from logging_compat import get_logger, logging
 
 
 
+# GRBL real-time commands, single bytes outside of any line that are acted on as soon as they arrive
+REALTIME_STATUS = 0x3F  # '?'
+REALTIME_FEED_HOLD = 0x21  # '!'
+REALTIME_CYCLE_START = 0x7E  # '~'
+REALTIME_SOFT_RESET = 0x18  # Ctrl-X
+REALTIME_COMMANDS = (REALTIME_STATUS, REALTIME_FEED_HOLD, REALTIME_CYCLE_START, REALTIME_SOFT_RESET)
+
+# read_line() result in place of a line too long for the input buffer, the rest of it up to the newline is skipped
+LINE_OVERFLOW = "\x00line overflow"
+
+
 # IO abstraction layer -----------------------------------------------------
 class IOBase:
     """Abstract IO handler. Provide read_line(blocking=True), write(s), any(),
     and optionally get_fileno() for integration with select.poll().
+    Handlers that can pick real-time commands out of the input hand them to realtime_handler(byte)
+    and drop them from the lines, poll_realtime() does so for input that arrives while the motors run.
     """
+    realtime_handler = None
+
+    def poll_realtime(self):
+        """Read the input waiting without blocking, acting on real-time commands and keeping the rest for read_line()"""
+        pass
+
+    def filter_realtime(self, line: str) -> str:
+        """Hand the real-time commands in a line to realtime_handler, returns the line without them"""
+        if self.realtime_handler is None:
+            return line
+        for code in REALTIME_COMMANDS:
+            character = chr(code)
+            if character in line:
+                for _ in range(line.count(character)):
+                    self.realtime_handler(code)
+                line = line.replace(character, "")
+        return line
+
     def read_line(self, blocking=True):
         raise NotImplementedError
 
@@ -28,24 +60,141 @@ class IOBase:
         """
         return True
 
+    def has_line(self) -> bool:
+        """True only when a whole line is known to be waiting, unlike any() this never guesses.
+        While it is False the interpreter lets the machine run the moves it holds back for planning.
+        """
+        return False
+
     def get_fileno(self):
         """Return a file descriptor integer usable with select.poll(), or None.
         """
         return None
 
 
-class StdioIO(IOBase):
+class SilentIO(IOBase):
+    """No input and every reply discarded, for driving an interpreter from code through gcode()"""
+
+    def read_line(self, blocking=True):
+        return None
+
+    def write(self, s: str):
+        pass
+
+
+class _ByteLineIO(IOBase):
+    """Splits the bytes received into lines as they arrive, real-time commands among them go to realtime_handler
+    straight away. A line longer than line_size is skipped up to its newline and read as LINE_OVERFLOW."""
+    NEWLINE = 10
+    RETURN = 13
+
+    def __init__(self, line_size=256):
+        self.line_size = line_size
+        self._line = bytearray()
+        self._lines = []
+        # the line being received has outgrown line_size
+        self._overflow = False
+
+    def _receive(self, data):
+        handler = self.realtime_handler
+        line = self._line
+        for byte in data:
+            if handler is not None and byte in REALTIME_COMMANDS:
+                handler(byte)
+            elif byte == _ByteLineIO.NEWLINE:
+                self._lines.append(LINE_OVERFLOW if self._overflow else line)
+                self._overflow = False
+                line = bytearray()
+            elif self._overflow or byte == _ByteLineIO.RETURN:
+                pass
+            elif len(line) >= self.line_size:
+                self._overflow = True
+                line = bytearray()
+            else:
+                line.append(byte)
+        self._line = line
+
+    def _next_line(self):
+        """The first whole line received, or None if there is none yet"""
+        if not self._lines:
+            return None
+        raw = self._lines.pop(0)
+        if raw is LINE_OVERFLOW:
+            return raw
+        try:
+            return raw.decode()
+        except Exception:
+            return bytes(b for b in raw if b < 128).decode()
+
+
+class StdioIO(_ByteLineIO):
     """Standard input/output handler using sys.stdin/sys.stdout.
-    Works with both blocking and (with select) non-blocking modes.
+    Where stdin can be polled, the bytes waiting are read without going through its line buffer and split into
+    lines like UARTIO does, so poll_realtime() never waits for the rest of a line. Without poll() whole lines
+    are read from sys.stdin and real-time commands are only seen once their line has arrived.
     """
-    def __init__(self):
-        # cached poll object (if poll is available and registration succeeds)
+    READ_SIZE = 256
+
+    def __init__(self, line_size=256):
+        super().__init__(line_size)
+        self._fileno = self.get_fileno()
+        self._eof = False
+        # poll object for stdin, None when stdin can't be polled
         self._poll = None
+        if hasattr(select, 'poll'):
+            try:
+                self._poll = select.poll()
+                # MicroPython's stdin has no file descriptor, its poll() takes the stream
+                self._poll.register(sys.stdin if self._fileno is None else self._fileno, select.POLLIN)
+            except Exception:
+                self._poll = None
+
+    def _read_waiting(self, timeout_ms=0):
+        """Receive the bytes waiting on stdin, waiting up to timeout_ms (-1 for ever) for some to arrive"""
+        if self._eof:
+            return
+        try:
+            if not self._poll.poll(timeout_ms):
+                return
+            data = self._read_bytes()
+        except Exception:
+            data = b""
+        if data:
+            self._receive(data)
+            return
+        # a closed stdin polls as readable and reads nothing, the last line may have no newline
+        self._eof = True
+        if self._line and not self._overflow:
+            self._lines.append(self._line)
+        self._line = bytearray()
+
+    def _read_bytes(self):
+        if self._fileno is not None and hasattr(os, 'read'):
+            return os.read(self._fileno, StdioIO.READ_SIZE)
+        # MicroPython has no os.read(), poll() only promises the first byte
+        return sys.stdin.buffer.read(1)
+
+    def poll_realtime(self):
+        if self._poll is not None:
+            self._read_waiting()
 
     def read_line(self, blocking=True):
+        if self._poll is None:
+            return self._read_whole_line(blocking)
+        self._read_waiting()
+        while blocking and not self._lines and not self._eof:
+            self._read_waiting(-1)
+        line = self._next_line()
+        if line is None and not self._eof:
+            # only part of a line has arrived, any() says when a whole one is there,
+            # an empty line isn't mistaken for the end of input
+            return ""
+        return line
+
+    def _read_whole_line(self, blocking):
         if blocking:
             try:
-                return input("")
+                return self.filter_realtime(input(""))
             except EOFError:
                 return None
         else:
@@ -56,7 +205,7 @@ class StdioIO(IOBase):
                 return None
             if line == "":
                 return None
-            return line.rstrip('\n')
+            return self.filter_realtime(line.rstrip('\n'))
 
     def write(self, s: str):
         try:
@@ -66,33 +215,17 @@ class StdioIO(IOBase):
             pass
 
     def any(self) -> bool:
-        # Prefer a poll-based check when possible (more efficient / scalable).
-        try:
-            fileno = self.get_fileno()
-        except Exception:
-            fileno = None
-
-        # Use select.poll where available and we have a fileno
-        try:
-            if fileno is not None and hasattr(select, 'poll'):
-                # Cache a poll object on this StdioIO instance to avoid recreating it each call
-                if self._poll is None:
-                    try:
-                        self._poll = select.poll()
-                        self._poll.register(fileno, select.POLLIN)
-                    except Exception:
-                        # If poll/register fails, clear _poll and fall back
-                        self._poll = None
-                if self._poll is not None:
-                    events = self._poll.poll(0)
-                    return bool(events)
-        except Exception:
-            # Fall through to select.select fallback
-            pass
+        # Without poll() be conservative and assume data may be available
+        if self._poll is None:
+            return True
+        self._read_waiting()
+        return bool(self._lines) or self._eof
 
-        # Fallback: if poll isn't available or failed, be conservative and assume data may be available
-        # (This avoids platform-specific select.select unpacking warnings in static analyzers.)
-        return True
+    def has_line(self) -> bool:
+        if self._poll is None:
+            return False
+        self._read_waiting()
+        return bool(self._lines)
 
     def get_fileno(self):
         try:
@@ -126,6 +259,10 @@ class FileIO(IOBase):
         return val
 
     def any(self) -> bool:
+        # at the end of the file read_line() returns None straight away, the polling loop has to read it to stop
+        return True
+
+    def has_line(self) -> bool:
         return self._pos < len(self._lines)
 
     def write(self, s: str):
@@ -136,14 +273,138 @@ class FileIO(IOBase):
                 pass
 
 
-class UARTIO(IOBase):
-    """Wrap a UART-like object that provides any(), readline(), and write().
-    The uart.readline() is expected to return bytes (MicroPython style) or a
-    string (pyserial style)."""
-    def __init__(self, uart):
+class StreamingFileIO(IOBase):
+    """Read lines from a file path through a fixed size buffer, so memory use doesn't grow with the file.
+    A line that doesn't fit the buffer with its newline is skipped and read as LINE_OVERFLOW.
+    Writes still go to stdout by default.
+    """
+    NEWLINE = 10
+
+    def __init__(self, path, write_to_stdout=True, buffer_size=512):
+        self.write_to_stdout = write_to_stdout
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # first unread byte in the buffer
+        self._end = 0  # end of valid data in the buffer
+        # MicroPython's bytearray has no find(), fall back to scanning the bytes
+        self._has_find = hasattr(self._buffer, 'find')
+        try:
+            self._file = open(path, 'rb')
+        except Exception:
+            self._file = None
+
+    def _fill(self):
+        """Move unread bytes to the front of the buffer and top it up from the file"""
+        if self._file is None:
+            return False
+        remaining = self._end - self._start
+        if self._start > 0:
+            if remaining:
+                self._view[0:remaining] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = remaining
+        if self._end >= len(self._buffer):
+            return True
+        count = self._file.readinto(self._view[self._end:])
+        if not count:
+            self._file.close()
+            self._file = None
+            return False
+        self._end += count
+        return True
+
+    def _find_newline(self, start):
+        if self._has_find:
+            return self._buffer.find(b'\n', start, self._end)
+        for index in range(start, self._end):
+            if self._buffer[index] == StreamingFileIO.NEWLINE:
+                return index
+        return -1
+
+    def read_line(self, blocking=True):
+        searched = self._start
+        overflow = False
+        while True:
+            index = self._find_newline(searched)
+            if index >= 0:
+                line = LINE_OVERFLOW if overflow else self._decode(self._start, index)
+                self._start = index + 1
+                return line
+            if self._start == 0 and self._end >= len(self._buffer):
+                # no newline in a full buffer, drop what there is of the line and skip to its end
+                overflow = True
+                self._start = self._end
+            searched = self._end - self._start
+            if not self._fill():
+                break
+        if overflow:
+            # the long line ran to the end of the file
+            self._start = self._end
+            return LINE_OVERFLOW
+        if self._start < self._end:
+            # last line without a trailing newline
+            line = self._decode(self._start, self._end)
+            self._start = self._end
+            return line
+        return None
+
+    def _decode(self, start, end):
+        line = bytes(self._view[start:end]).decode()
+        return line.rstrip('\r')
+
+    def any(self) -> bool:
+        # reading a file never waits, at its end read_line() returns the None that stops the polling loop
+        return True
+
+    def has_line(self) -> bool:
+        if self._start < self._end:
+            return True
+        return self._fill() and self._start < self._end
+
+    def write(self, s: str):
+        if self.write_to_stdout:
+            try:
+                sys.stdout.write(s)
+            except Exception:
+                pass
+
+
+class UARTIO(_ByteLineIO):
+    """Wrap a UART-like object that provides any(), read(n) or readline(), and write().
+    Bytes are read as they arrive, real-time commands among them go to realtime_handler straight away
+    and the rest is kept until a whole line has arrived. A line longer than line_size is skipped
+    up to its newline and read as LINE_OVERFLOW.
+    A UART without read() is read with readline(), which is expected to return bytes (MicroPython style)
+    or a string (pyserial style)."""
+
+    def __init__(self, uart, line_size=256):
+        super().__init__(line_size)
         self.uart = uart
+        self._has_read = hasattr(uart, 'read')
+
+    def poll_realtime(self):
+        if not self._has_read:
+            return
+        try:
+            waiting = self.uart.any()
+            data = self.uart.read(waiting) if waiting else None
+        except Exception:
+            return
+        if data:
+            self._receive(data)
 
     def read_line(self, blocking=True):
+        if not self._has_read:
+            return self._read_line_from_uart()
+        self.poll_realtime()
+        while not self._lines:
+            if not blocking:
+                return None
+            sleep_secs(0.001)
+            self.poll_realtime()
+        return self._next_line()
+
+    def _read_line_from_uart(self):
         # On typical uart objects, readline() will block until a line is available
         try:
             raw = self.uart.readline()
@@ -153,18 +414,30 @@ class UARTIO(IOBase):
             return None
         if isinstance(raw, bytes):
             try:
-                return raw.decode().rstrip('\r\n')
+                line = raw.decode().rstrip('\r\n')
             except Exception:
-                return raw.decode(errors='ignore').rstrip('\r\n')
-        return str(raw).rstrip('\r\n')
+                line = raw.decode(errors='ignore').rstrip('\r\n')
+        else:
+            line = str(raw).rstrip('\r\n')
+        return self.filter_realtime(line)
 
     def any(self) -> bool:
+        if self._has_read:
+            self.poll_realtime()
+            return bool(self._lines)
         try:
             return bool(self.uart.any())
         except Exception:
             # If underlying UART doesn't expose any(), assume data may be present
             return True
 
+    def has_line(self) -> bool:
+        if self._has_read:
+            self.poll_realtime()
+            return bool(self._lines)
+        # readline() may still wait for the end of the line
+        return False
+
     def write(self, s: str):
         try:
             if hasattr(self.uart, 'write'):
@@ -186,18 +459,20 @@ class GcodeInterpreter:
     IDLE_RESET_MS = 8000  # if no '?' for this long, treat as new session
     REQ_INTERVAL_MS = 1500  # max gap between two '?' for banner trigger
     STATUS_INTERVAL_MS = 2000  # send idle status every 2s after banner
+    IDLE_WAIT_MIN_MS = 1  # first wait once no input is available
+    IDLE_WAIT_MAX_MS = 20  # idle waits double up to this, keeps status and banner timing responsive
+    RX_BUFFER_SIZE = 128  # bytes of input the host may send ahead of the oks, GRBL character counting
 
-    ## this class was originally intended to be an Enum, but Python's Enum doesn't support the way I want to look up by string value, so I switched to a regular class with a dict for lookup instead.
-    # The StrEnum base is just to get some of the nice features of Enums like immutability and auto string values.
+    # Command words as parse_line() returns them, the keys of the handler table built by _build_command_handlers()
     class GCodeCommands:
 
         G0 = "g0"
         G00 = "g00"
         G1 = "g1"
         G01 = "g01"
-        G02 = "g2"
+        G02 = "g02"
         G2 = "g2"
-        G03 = "g3"
+        G03 = "g03"
         G3 = "g3"
         G21 = "g21"
         G28 = "g28"
@@ -207,46 +482,16 @@ class GcodeInterpreter:
         JOG = "$j="
         UNLOCK = "$x"
         SETTINGS = "$$"
+        SET_SETTING = "$n="
         HOME = "$h"
         HELP = "$"
         INFO = "$i"
         STATE = "$g"
         CHECK = "$c"
+        STATS = "$s"
         STATUS = "?"
         FILE_BOUNDARY = "%"
 
-        codes = {
-        "g0": G0,
-        "g00": G00,
-        "g1": G1,
-        "g01": G01,
-        "g02": G02,
-        "g2": G2,
-        "g03": G03,
-        "g3": G3,
-        "g21": G21,
-        "g28": G28,
-        "g90": G90,
-        "g91": G91,
-        "m30": M30,
-        "$j=": JOG,
-        "$x": UNLOCK,
-        "$$": SETTINGS,
-        "$h": HOME,
-        "$": HELP,
-        "$i": INFO,
-        "$g": STATE,
-        "$c": CHECK,
-        "?": STATUS,
-        "%": FILE_BOUNDARY
-        }
-
-        def get_command(command_str):
-            try:
-                return GcodeInterpreter.GCodeCommands.codes[command_str]
-            except:
-                raise ValueError(f"Unknown G-code command: {command_str}")
-
     commands = (
 
         ("g00 [x?] [y?]", "Rapid move, no printing"),
@@ -269,8 +514,10 @@ class GcodeInterpreter:
         ("$j", "GRBL jog, same x y params as g0, support for z with positive for pen up and negative for pen down"),
         ("$i", "GRBL info"),
         ("$$", "GRBL Settings"),
+        ("$11=0.01", "GRBL change a setting, $11 junction deviation, $12 arc tolerance"),
         ("?", "GRBL status report"),
         ("$c", "GRBL check mode toggle"),
+        ("$s", "Job statistics, pen transitions and pen lifts skipped"),
         ("$", "Help"),
         ("%", "Begin and end of file")
     )
@@ -279,17 +526,40 @@ class GcodeInterpreter:
     logger = get_logger("gcode_interpreter")
 
 
-    def __init__(self, machine: GCodeMachine, io_handler: IOBase = None, use_polling=False):
+    def __init__(self, machine: GCodeMachine, io_handler: IOBase = None, use_polling=False, rx_buffer_size=None):
+        """
+        :param rx_buffer_size: input bytes the host may stream ahead of the oks, reported by $I for GRBL
+            character counting, the input must be able to buffer at least this much. Defaults to RX_BUFFER_SIZE.
+            A machine that queues its moves, like ThreadedGCodeMachine, lets the ok go out once a line is queued.
+        """
         self.machine = machine
+        self.rx_buffer_size = GcodeInterpreter.RX_BUFFER_SIZE if rx_buffer_size is None else rx_buffer_size
         self.banner_sent = False
         self.question_counter = 0
         self.last_question_time = 0
         self.last_status_time = tick_millis()
         self.now = tick_millis()
         self.use_polling = use_polling
+        # pen transitions made, and pen lifts skipped by zero length G0 moves between strokes, reported by $s
+        self.pen_downs = 0
+        self.pen_ups = 0
+        self.pen_lifts_skipped = 0
+        # last status report and the machine state it shows, formatted again only once one of them changes
+        self._status_report = None
+        self._status_state = None
+        self._status_position = None
+        self._status_pendown = None
+
+        # Command word -> handler table, machines may add their own codes through register_command()
+        self.extra_commands = []
+        self.command_handlers = self._build_command_handlers()
+        self.machine.register_commands(self)
 
         # IO handler: default to standard input/output
         self.io = io_handler if io_handler is not None else StdioIO()
+        # real-time commands are acted on as they arrive, the machine polls for them between steps
+        self.io.realtime_handler = self._realtime
+        self.machine.poll_realtime = self.poll_realtime
 
         logging.info(f"G-code interpreter initialized, polling={'enabled' if use_polling else 'disabled'}, io_handler={type(self.io).__name__}")
 
@@ -317,19 +587,29 @@ class GcodeInterpreter:
             self.poller = None
 
     def _send_status(self):
-        return "<Idle|MPos:{:.3f},{:.3f},{:.3f}|FS:0,0>\r\n".format(
-                self.machine.absolute_x , self.machine.absolute_y, -1 if self.machine.is_pendown else 0
-            )
+        machine = self.machine
+        state = machine.state()
+        # where the motors are, planned and queued moves still to run aren't reported
+        position = machine.machine_position()
+        if (self._status_report is None or state != self._status_state or machine.is_pendown != self._status_pendown
+                or position != self._status_position):
+            self._status_state = state
+            self._status_position = position
+            self._status_pendown = machine.is_pendown
+            self._status_report = "<{}|MPos:{:.3f},{:.3f},{:.3f}|FS:0,0>\r\n".format(
+                state, position[0], position[1], -1 if machine.is_pendown else 0)
+        return self._status_report
 
     def _send_state(self):
         distance_mode = "G91" if self.machine.relative_mode else "G90"
-        return "[GC:G1 G54 G17 G2 {} G94 M5 M9 T0 S0.0 F500.0]\r\nok\r\n".format(distance_mode)
+        return "[GC:G1 G54 G17 G2 {} G94 M5 M9 T0 S0.0 F{:.1f}]\r\nok\r\n".format(distance_mode, self.machine.feed_rate)
 
     def _banner(self):
 
         # Send the banner plus three status reports and trailing ok.
         statuses = "".join(self._send_status() for _ in range(3))
-        banner = "Grbl 1.1f ['$' for help]\r\n<Idle|MPos:0.000,0.000,0.000|FS:0,0>\r\nMSG: '$X' to unlock]\r\n"
+        banner = ("Grbl 1.1f ['$' for help]\r\n" + self._options() +
+                  "<Idle|MPos:0.000,0.000,0.000|FS:0,0>\r\nMSG: '$X' to unlock]\r\n")
         result= banner + statuses + "ok\r\n"
         self.banner_sent = True
         self.last_status_time = tick_millis()
@@ -353,8 +633,8 @@ class GcodeInterpreter:
             (5, 0, "Limit pins invert, bool"),
             (6, 0, "Probe pin invert, bool"),
             (10, 3, "Status report mask"),
-            (11, 0.010, "Junction deviation, mm"),
-            (12, 0.002, "Arc tolerance, mm"),
+            (11, self.machine.junction_deviation, "Junction deviation, mm"),
+            (12, self.machine.arc_tolerance, "Arc tolerance, mm"),
             (13, 0, "Report in inches, bool"),
             (20, 0, "Soft limits enable, bool"),
             (21, 0, "Hard limits enable, bool"),
@@ -373,18 +653,45 @@ class GcodeInterpreter:
 
 
 
+    # GRBL setting number -> machine attribute that $n=value changes, every one of them must be greater than 0
+    machine_settings = {
+        11: "junction_deviation",
+        12: "arc_tolerance",
+    }
+
+    def _set_setting(self, words):
+        """response to a $n=value command"""
+        number = int(words['n'])
+        attribute = GcodeInterpreter.machine_settings.get(number)
+        if attribute is None:
+            return f"error: Unsupported setting ${number}\r\n"
+        if words['v'] <= 0:
+            # the planner and the arc segmentation take square roots and logs of these, refuse before they fail
+            return f"error: Setting ${number} must be greater than 0\r\n"
+        setattr(self.machine, attribute, words['v'])
+        return "ok\r\n"
+
+    def _stats(self):
+        """response to a $s command"""
+        return (f"[STATS:pen_downs={self.pen_downs},pen_ups={self.pen_ups},"
+                f"pen_lifts_skipped={self.pen_lifts_skipped}]\r\nok\r\n")
+
     def _help(self):
 
-        return "".join(f"{key}: {value}\r\n" for (key, value) in GcodeInterpreter.commands)
+        return "".join(f"{key}: {value}\r\n" for (key, value) in GcodeInterpreter.commands + tuple(self.extra_commands))
 
 
     def _info(self):
 
         result = "[VER:MicroPythonGRBL:1.1]\r\n"
-        result += "[OPT:MPY,USB,3AXIS]\r\n"
+        result += self._options()
         result += "ok\r\n"
         return result
 
+    def _options(self):
+        # GRBL 1.1 option codes (none), block buffer size and RX buffer size, senders size character counting on it
+        return f"[OPT:,{self.machine.block_buffer_size},{self.rx_buffer_size}]\r\n"
+
     def _status(self):
         # Determine if this '?' arrived within the quick-request window
         since_last_question = ticks_diff(self.now, self.last_question_time)
@@ -404,80 +711,116 @@ class GcodeInterpreter:
             self.question_counter = 0
             return result
 
-        # After banner has been shown, throttle status replies by STATUS_INTERVAL_MS
-        if self.banner_sent and ticks_diff(self.now, self.last_status_time) > GcodeInterpreter.STATUS_INTERVAL_MS:
-            result = self._send_status()
-            self.last_status_time = self.now
-            return result
-
+        # Every '?' is answered, the first of a handshake too, only the unasked idle reports are throttled
+        self.last_status_time = self.now
+        return self._send_status()
+
+
+    def poll_realtime(self):
+        """Act on the real-time commands that arrived, called by the machine between steps"""
+        self.io.poll_realtime()
+
+    def _realtime(self, code):
+        if code == REALTIME_STATUS:
+            self.now = tick_millis()
+            result = self._status()
+            if result:
+                self.io.write(result)
+        elif code == REALTIME_FEED_HOLD:
+            self.machine.feed_hold()
+        elif code == REALTIME_CYCLE_START:
+            self.machine.resume()
+        elif code == REALTIME_SOFT_RESET:
+            self.machine.soft_reset()
+
+    def _reset(self):
+        """Finish a soft reset: the machine drops what it has queued and the host gets the welcome again"""
+        self.machine.abort()
+        self._soft_reset()
+        self.io.write("\r\nGrbl 1.1f ['$' for help]\r\n")
+
+    def _flush(self):
+        try:
+            self.machine.flush()
+        except SoftReset:
+            self._reset()
+
+    def _wait_for_input(self, timeout_ms):
+        """Return True when a line can be read, waiting up to timeout_ms for input to arrive"""
+        # lines the IO handler already holds, read while the motors were running, don't show on the poller
+        if self.io.any():
+            return True
+        if self.poller is not None:
+            # poll() returns as soon as input arrives, so the wait never delays a line,
+            # but what arrived may only be part of one
+            return bool(self.poller.poll(timeout_ms)) and self.io.any()
+        if timeout_ms:
+            sleep_secs(timeout_ms / 1000)
+        return False
 
     def interpret(self):
         self.logger.info("Interpreting G-code...")
+        idle_ms = 0
         try:
             while True:
                 self.now = tick_millis()
 
+                # a Ctrl-X that arrived while nothing was moving
+                if self.machine.reset_requested:
+                    self._reset()
+
                 # If no '?' for a while, assume UGS reconnected → reset banner logic
                 if self.banner_sent and ticks_diff(self.now, self.last_question_time) > GcodeInterpreter.IDLE_RESET_MS:
                     self.banner_sent  = False
                     self.question_counter = 0
 
                 # Non-blocking mode: check for input, otherwise allow periodic tasks
-                if self.use_polling and self.poller is not None:
-                    #self.logger.info("Polling with self poller")
-                    events = self.poller.poll(0)
-                    if not events:
+                if self.use_polling:
+                    if not self._wait_for_input(idle_ms):
+                        if idle_ms == 0:
+                            # no more input for now, let the machine finish what it has queued
+                            self._flush()
                         # Optionally emit periodic idle status after banner
-                        if self.banner_sent and ticks_diff(self.now,
-                                                            self.last_status_time) > GcodeInterpreter.STATUS_INTERVAL_MS:
+                        if self.banner_sent and ticks_diff(tick_millis(), self.last_status_time) > GcodeInterpreter.STATUS_INTERVAL_MS:
                             self.io.write(self._send_status())
-                            self.last_status_time = self.now
-                        sleep_secs(0.01)
+                            self.last_status_time = tick_millis()
+                        # Back off while idle, a busy host gets served without any sleep
+                        idle_ms = GcodeInterpreter.IDLE_WAIT_MIN_MS if idle_ms == 0 else min(idle_ms * 2, GcodeInterpreter.IDLE_WAIT_MAX_MS)
                         continue
-                    # Read a single line (poll indicated input available)
+                    idle_ms = 0
                     line = self.io.read_line(blocking=False)
                     if line is None:
                         # EOF on stdin or no data
                         self.logger.info("EOF on input polling, exiting interpreter")
                         break
                 else:
-                    # If we have a non-poller IO, use its any() to check availability
-
-                    if self.use_polling and self.poller is None:
-                        #self.logger.info("Polling without self poller")
-                        if not self.io.any():
-                            # Optionally emit periodic idle status after banner
-                            if self.banner_sent and ticks_diff(self.now, self.last_status_time) > GcodeInterpreter.STATUS_INTERVAL_MS:
-                                self.io.write(self._send_status())
-                                self.last_status_time = self.now
-                            sleep_secs(0.01)
-                            continue
-                        #self.logger.info("About to read line in polling mode without poller...")
-                        line = self.io.read_line(blocking=False)
-                        sleep_secs(0.01)
-                        if line is None:
-                            self.logger.info("EOF on input non polling, exiting interpreter")
-                            break
-
-                    else:
-                        # Blocking read; will wait for a line from the host
-                        sleep_secs(0.01)
-                        #self.logger.info("Blocking read for line input...")
-                        line = self.io.read_line(blocking=True)
-                        if line is None:
-                            break
+                    # Blocking read; will wait for a line from the host, the machine runs what it holds meanwhile
+                    if not self.io.has_line():
+                        self._flush()
+                    line = self.io.read_line(blocking=True)
+                    if line is None:
+                        break
+
+                if line == LINE_OVERFLOW:
+                    # GRBL's reply to a line longer than its buffer, the host still counts it as answered
+                    self.io.write("error: Line overflow\r\n")
+                    continue
 
                 # Update last_question_time if this looks like a status request
                 stripped = (line or "").strip()
                 if stripped.startswith("?"):
                     self.last_question_time = self.now
 
-                # Dispatch the line to the gcode handler
+                # Dispatch the line to the gcode handler, every line gets exactly one reply
                 try:
-                    if stripped:
-                        result = self.gcode(stripped)
-                        self.io.write(result)
+                    result = self.gcode(stripped)
+                    self.io.write(result if result is not None else "ok\r\n")
+                except SoftReset:
+                    # the rest of the line is dropped with the moves
+                    self._reset()
                 except KeyboardInterrupt:
+                    # M30 ends the program, it is answered like the lines before it
+                    self.io.write("ok\r\n")
                     break
                 except Exception as e:
                     self.io.write("error: {}\r\n".format(e))
@@ -494,21 +837,12 @@ class GcodeInterpreter:
             except Exception:
                 pass
 
-    def _parse_command_params(self, sub_commands):
-
-        x = y = z = r = abs_mode = None
-        for sub_command in sub_commands:
-            if sub_command.startswith("x"):
-                x = float(sub_command[1:])
-            elif sub_command.startswith("y"):
-                y = float(sub_command[1:])
-            elif sub_command.startswith("z"):
-                z = float(sub_command[1:])
-            elif sub_command.startswith("r"):
-                r = float(sub_command[1:])
-            elif sub_command.startswith("$j="):
-                abs_mode = True
+    def _parse_command_params(self, words, abs_mode=None):
 
+        x = words.get('x')
+        y = words.get('y')
+        z = words.get('z')
+        r = words.get('r')
 
         if self.machine.relative_mode:
             if abs_mode == True:
@@ -529,114 +863,139 @@ class GcodeInterpreter:
 
         return {'x': x, 'y': y, 'z': z, 'r': r}
 
-    def split_and_separate_with_spaces(self, command):
-        replacements = {"g": " g", "x": " x", "y": " y", "z": " z", "r": " r", "f": " f", "=": "= "}
-        # translation_table = str.maketrans(replacements)
-        result =  (command or "").split(';', 1)[0].rstrip().lower()  # Remove comments and trailing whitespace
-        if len(command) > 2:
-            ## translation_table = str.maketrans(replacements)
-            ## result = result[0:2] + result[2:].translate(translation_table)  # Ensure spaces before command letters for splitting
-            for key, value in replacements.items():
-                result = result.replace(key, value)
-        return result
+    def _build_command_handlers(self):
+        """Map every normalized command word to its bound handler so gcode() dispatch is a single dict lookup"""
+        codes = GcodeInterpreter.GCodeCommands
+        handlers = {}
+        for code in (codes.G0, codes.G00, codes.JOG):
+            handlers[code] = self._rapid_move
+        for code in (codes.G1, codes.G01):
+            handlers[code] = self._linear_move
+        for code in (codes.G2, codes.G02):
+            handlers[code] = self._clockwise_arc
+        for code in (codes.G3, codes.G03):
+            handlers[code] = self._counter_clockwise_arc
+        for code in (codes.G28, codes.HOME):
+            handlers[code] = self._home
+        for code in (codes.G21, codes.CHECK, codes.STATE, codes.FILE_BOUNDARY):
+            handlers[code] = self._ok
+        handlers[codes.G90] = self._absolute_mode
+        handlers[codes.G91] = self._relative_mode
+        handlers[codes.M30] = self._end_program
+        handlers[codes.STATUS] = self._status_request
+        handlers[codes.SETTINGS] = lambda words: self._settings()
+        handlers[codes.SET_SETTING] = self._set_setting
+        handlers[codes.INFO] = lambda words: self._info()
+        handlers[codes.STATS] = lambda words: self._stats()
+        handlers[codes.HELP] = lambda words: self._help()
+        handlers[codes.UNLOCK] = lambda words: self._unlock()
+        return handlers
+
+    def register_command(self, code, handler, description=None):
+        """
+        Register or replace the handler for a command word.
+        :param code: command word as it appears first on the line, e.g. "m3" or "$p"
+        :param handler: callable taking the dict of parsed words, e.g. {'x': 10.0}, returning the reply string
+        :param description: optional text listed by the '$' help command
+        """
+        code = code.lower()
+        self.command_handlers[code] = handler
+        if description is not None:
+            self.extra_commands.append((code, description))
 
     def gcode(self, command):
 
-        command = self.split_and_separate_with_spaces(command)
-        if not command: return
-        sub_commands = command.split()
-        result = ""
-
-        try:
-            sub_command = GcodeInterpreter.GCodeCommands.get_command(sub_commands[0])
-        except ValueError:
-             return f"Unknown G-code command: {command}\r\n"
-
-
-        ## Originally I used enumStr matching for this, but it's not supported with MicroPython
-        #     match sub_command:
-        #        case GcodeInterpreter.GCodeCommands.G00 | GcodeInterpreter.GCodeCommands.G0 | GcodeInterpreter.GCodeCommands.JOG:
-        #  So I switched to a dict lookup in the GCodeCommands class.
-        #  The get_command method will raise a ValueError if the command is not found,
-
-        if sub_command in (GcodeInterpreter.GCodeCommands.G00,
-                           GcodeInterpreter.GCodeCommands.G0,
-                           GcodeInterpreter.GCodeCommands.JOG):
-            params = self._parse_command_params(sub_commands[1:])
+        # Single pass scan into the command word and a letter -> value dict of the remaining words
+        command_word, words = parse_line(command)
+        # a blank or comment only line is answered too, a streaming host counts one reply per line
+        if not command_word:
+            return "ok\r\n"
+
+        handler = self.command_handlers.get(command_word)
+        if handler is None:
+            self.logger.warning(f"Unknown G-code command: {command}")
+            # GRBL's unsupported command error
+            return "error:20\r\n"
+        return handler(words)
+
+    def _select_rate(self, words, rapid=False):
+        # F is modal, it sets the feed rate even when it is given on a G0 line
+        if 'f' in words:
+            self.machine.set_feed_rate(words['f'])
+        self.machine.select_rate(rapid)
+
+    def _pen_up(self):
+        if self.machine.is_pendown:
+            self.pen_ups += 1
             self.machine.penup()
-            self.machine.move(params['x'], params['y'])
-            #support fine tunning on the pen
-            if GcodeInterpreter.GCodeCommands.JOG and params['z'] is not None:
-                if params['z'] > 0:
-                    self.machine.motor_z.move(abs(params['z']), 1)
-                else:
-                    self.machine.motor_z.move(abs(params['z']), -1)
-            result = "ok\r\n"
-
-        elif sub_command in (GcodeInterpreter.GCodeCommands.G01,
-                             GcodeInterpreter.GCodeCommands.G1):
-            params = self._parse_command_params(sub_commands[1:])
-            self.machine.pendown()
-            self.machine.line( Point(params['x'], params['y']))
-            #self.machine.move(params['x'], params['y'])
-            result = "ok\r\n"
 
-        elif sub_command in (GcodeInterpreter.GCodeCommands.G02,
-                             GcodeInterpreter.GCodeCommands.G2):
-            params = self._parse_command_params(sub_commands[1:])
+    def _pen_down(self):
+        if not self.machine.is_pendown:
+            self.pen_downs += 1
             self.machine.pendown()
-            self.machine.circle(Point(params['x'], params['y']), params['r'], is_clockwise=True)
-            result = "ok\r\n"
-
-        elif sub_command in (GcodeInterpreter.GCodeCommands.G03,
-                             GcodeInterpreter.GCodeCommands.G3):
-            params = self._parse_command_params(sub_commands[1:])
-            self.machine.pendown()
-            self.machine.circle(Point(params['x'], params['y']), params['r'], is_clockwise=False)
-            result = "ok\r\n"
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.G21:
-            result = "ok\r\n"
-
-        elif sub_command in (GcodeInterpreter.GCodeCommands.G28,
-                             GcodeInterpreter.GCodeCommands.HOME):
-            self.machine.home()
-            result = "ok\r\n"
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.G90:
-            self.machine.relative_mode = False
-            result = "ok\r\n"
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.G91:
-            self.machine.relative_mode = True
-            result = "ok\r\n"
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.M30:
-            raise KeyboardInterrupt
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.STATUS:
-           sult = self._status()
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.CHECK:
-            result = "ok\r\n"
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.SETTINGS:
-            # Call instance method so it uses the configured io handler
-            result =self._settings()
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.INFO:
-            result = self._info()
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.HELP:
-            result = self._help()
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.UNLOCK:
-            result = self._unlock()
-
-        elif sub_command == GcodeInterpreter.GCodeCommands.STATE:
-            result = "ok\r\n"
 
+    def _rapid_move(self, words):
+        params = self._parse_command_params(words)
+        self._select_rate(words, rapid=True)
+        if self.machine.relative_mode:
+            moving = params['x'] != 0 or params['y'] != 0
         else:
-            result =  f"Unknown G-code command: {command}"
-
-        return result
+            moving = params['x'] != self.machine.absolute_x or params['y'] != self.machine.absolute_y
+        if moving or params['z'] is not None:
+            self._pen_up()
+            self.machine.move(params['x'], params['y'])
+        elif self.machine.is_pendown:
+            # a G0 that goes nowhere between two strokes, the next stroke starts where the pen already is,
+            # G0 Z still lifts the pen
+            self.pen_lifts_skipped += 1
+        #support fine tunning on the pen
+        if params['z'] is not None:
+            self.machine.flush()
+            if params['z'] > 0:
+                self.machine.motor_z.move(abs(params['z']), 1)
+            else:
+                self.machine.motor_z.move(abs(params['z']), -1)
+        return "ok\r\n"
+
+    def _linear_move(self, words):
+        params = self._parse_command_params(words)
+        self._select_rate(words)
+        self._pen_down()
+        self.machine.line( Point(params['x'], params['y']))
+        return "ok\r\n"
+
+    def _clockwise_arc(self, words):
+        params = self._parse_command_params(words)
+        self._select_rate(words)
+        self._pen_down()
+        self.machine.circle(Point(params['x'], params['y']), params['r'], is_clockwise=True)
+        return "ok\r\n"
+
+    def _counter_clockwise_arc(self, words):
+        params = self._parse_command_params(words)
+        self._select_rate(words)
+        self._pen_down()
+        self.machine.circle(Point(params['x'], params['y']), params['r'], is_clockwise=False)
+        return "ok\r\n"
+
+    def _home(self, words):
+        self._pen_up()
+        self.machine.home()
+        return "ok\r\n"
+
+    def _absolute_mode(self, words):
+        self.machine.relative_mode = False
+        return "ok\r\n"
+
+    def _relative_mode(self, words):
+        self.machine.relative_mode = True
+        return "ok\r\n"
+
+    def _end_program(self, words):
+        raise KeyboardInterrupt
+
+    def _status_request(self, words):
+        return self._status()
+
+    def _ok(self, words):
+        return "ok\r\n"
@@ -1,10 +1,21 @@
 import math
-from point import Point
+from point import Point, PointArray, HAS_NUMPY
 from logging_compat import get_logger, logging
+from time_compat import sleep_micros
+
+
+class SoftReset(Exception):
+    """Raised between steps after a soft reset (GRBL Ctrl-X), abandoning the moves in progress"""
 
 
 class GCodeMachine:
 
+    # arcs recompute their radius vector exactly every ARC_CORRECTION chords
+    ARC_CORRECTION = 12
+    # sample arcs in one numpy call on the host, MicroPython uses the scalar rotation
+    VECTORIZED_ARCS = HAS_NUMPY
+    # how often a feed hold checks for the resume
+    HOLD_WAIT_US = 1000
 
     def __init__(self, steps_per_mm = 10, step_delay_us = 100, rounding_precision=0, line_increment=0.25):
         self.absolute_x = 0
@@ -18,26 +29,51 @@ class GCodeMachine:
         self.rounding_precision = rounding_precision
         # line increment of 1 is very coarse, 0.25 is very fine
         self.line_increment = line_increment
+        # modal feed rate (F word) for G1/G2/G3 and the rapid rate for G0, both mm/min
+        self.feed_rate = 500.0
+        self.rapid_rate = 1000.0
+        # fastest rate the machine supports in mm/min, None for no limit
+        self.max_rate = None
+        # rate of the moves being made, set by select_rate()
+        self.rate = self.feed_rate
+        # GRBL $11, how far a corner may be cut when moving through it without stopping, mm
+        self.junction_deviation = 0.010
+        # GRBL $12, largest distance between an arc and the chords drawing it, mm. GRBL's 0.002 is far below
+        # a plotter step, 0.01 still keeps the chords within a ninth of a step at 11 steps/mm with half the moves
+        self.arc_tolerance = 0.01
+        # moves the machine takes ahead of the motors, reported to the host by $I
+        self.block_buffer_size = 1
+        # called between steps and while waiting on the motors, set by the interpreter to read real-time commands
+        self.poll_realtime = None
+        # feed hold (GRBL '!') and soft reset (Ctrl-X) requests, acted on between steps
+        self.holding = False
+        self.reset_requested = False
         logging.basicConfig(level=logging.INFO)
         self.logger = get_logger("gcode_machine")
 
 
 
     def line(self, end_point):
-        start_point = self.current_point()
-        ending_point = end_point.add(start_point) if self.relative_mode else end_point
-
-        # Optimization: if line is effectively horizontal or vertical, just move to the endpoint without bresenham sampling
-        if ending_point.x == start_point.x or ending_point.y == start_point.y:
-            next_point = ending_point.subtract(self.current_point()) if self.relative_mode else end_point
-            self.move(next_point.x, next_point.y)
-            return
-
-        self.logger.debug("Line start: %s, end: %s, point: %s", start_point, ending_point, end_point)
-        points = start_point.bresenham_line(ending_point, self.line_increment)
-        for point in points:
-            next_point = point.subtract(self.current_point()) if self.relative_mode else end_point
-            self.move(next_point.x, next_point.y)
+        """
+        Draw a straight line from the current point to end_point, moving through points spaced at most
+        line_increment apart along the longer axis. Both distance modes share the same samples and each
+        point is moved to exactly once.
+        """
+        start_x = self.absolute_x
+        start_y = self.absolute_y
+        dx = end_point.x if self.relative_mode else end_point.x - start_x
+        dy = end_point.y if self.relative_mode else end_point.y - start_y
+
+        # horizontal and vertical lines need no intermediate points
+        samples = 1
+        if dx != 0 and dy != 0 and self.line_increment > 0:
+            samples = max(1, int(math.ceil(max(abs(dx), abs(dy)) / self.line_increment)))
+
+        self.logger.debug("Line start: (%s, %s), delta: (%s, %s), samples: %s", start_x, start_y, dx, dy, samples)
+        for n in range(1, samples):
+            t = n / samples
+            self._move_to(start_x + dx * t, start_y + dy * t)
+        self._move_to(start_x + dx, start_y + dy)
 
     def circle(self, end_point, radius, is_clockwise=True):
         """
@@ -45,20 +81,19 @@ class GCodeMachine:
         Uses is_clockwise to choose sweep direction and is robust to zero-length arcs.
         """
         start_point = self.current_point()
-        ending_point = start_point.add(end_point) if self.relative_mode else end_point
+        ending_point = self.current_point().iadd(end_point) if self.relative_mode else end_point
         center_point = start_point.circle_center(ending_point, radius, is_clockwise)
-        mid_point = start_point.midpoint(ending_point)
         start_angle = start_point.angle(center_point)
         end_angle = ending_point.angle(center_point)
-        start_point_vector = start_point.vector(center_point)
-        end_point_vector = ending_point.vector(center_point)
 
-        self.logger.debug(f"mid: {mid_point}")
-        self.logger.debug(f"center: {center_point}")
-        self.logger.debug(f"start_angle: {start_angle:.2f}, end_angle: {end_angle:.2f}")
-        self.logger.debug(f"start_degrees: {start_angle * 180 / math.pi:.2f}, end_degrees: {end_angle * 180 / math.pi:.2f}")
-        self.logger.debug(f"v1: {start_point_vector}, v2: {end_point_vector}")
-        self.logger.debug(f"center to mid distance: {center_point.distance(mid_point):.2f}")
+        # the messages are formatted before debug() can drop them, only build them when they are logged
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"mid: {start_point.midpoint(ending_point)}")
+            self.logger.debug(f"center: {center_point}")
+            self.logger.debug(f"start_angle: {start_angle:.2f}, end_angle: {end_angle:.2f}")
+            self.logger.debug(f"start_degrees: {start_angle * 180 / math.pi:.2f}, end_degrees: {end_angle * 180 / math.pi:.2f}")
+            self.logger.debug(f"v1: {start_point.vector(center_point)}, v2: {ending_point.vector(center_point)}")
+            self.logger.debug(f"center to mid distance: {center_point.distance(start_point.midpoint(ending_point)):.2f}")
 
         # normalize delta to (-pi, pi]
         delta = end_angle - start_angle
@@ -73,116 +108,131 @@ class GCodeMachine:
         arc_length = abs(sweep) * abs(radius)
         # if arc is effectively zero, just move to the endpoint
         if arc_length < 1e-9:
-            next_point = self.current_point().subtract(ending_point) if self.relative_mode else ending_point
+            next_point = Point(ending_point.x, ending_point.y)
+            if self.relative_mode:
+                next_point.isub(self.current_point())
             next_point.round(self.rounding_precision)
             self.move(next_point.x, next_point.y)
             return
 
-        steps = int(math.floor(arc_length * self.steps_per_mm))
-        if steps <= 0:
-            # ensure at least one sampling step if arc length small
-            steps = 1
+        segments = self.arc_segments(abs(radius), sweep)
 
-        # Streamed generation to avoid allocating a list of Point objects
-        # First pass: find the first emitted (rounded) sample and remember whether
-        # a final endpoint needs to be appended.
+        # the arc starts at the current point, so the pen stays where it is, without a lift to get there
+        if GCodeMachine.VECTORIZED_ARCS:
+            for x, y in PointArray.arc(center_point, abs(radius), start_angle, sweep, segments)[1:-1].to_list():
+                self._move_to(x, y)
+        else:
+            self._scalar_arc(center_point, abs(radius), start_angle, sweep, segments)
+
+        # finally, land exactly on the endpoint
+        self._move_to(ending_point.x, ending_point.y)
+
+    def _scalar_arc(self, center_point, radius, start_angle, sweep, segments):
+        """Move through the inner vertices of an arc split into segments chords"""
+        # Rotate the radius vector by a fixed angle per chord instead of calling cos/sin for every sample,
+        # recomputing it exactly every ARC_CORRECTION chords to stop rounding errors from building up.
+        theta = sweep / segments
+        cos_theta = math.cos(theta)
+        sin_theta = math.sin(theta)
+        radius_x = radius * math.cos(start_angle)
+        radius_y = radius * math.sin(start_angle)
+        for n in range(1, segments):
+            if n % GCodeMachine.ARC_CORRECTION == 0:
+                angle = start_angle + n * theta
+                radius_x = radius * math.cos(angle)
+                radius_y = radius * math.sin(angle)
+            else:
+                radius_x, radius_y = (radius_x * cos_theta - radius_y * sin_theta,
+                                      radius_x * sin_theta + radius_y * cos_theta)
+            self._move_to(center_point.x + radius_x, center_point.y + radius_y)
+
+    def arc_segments(self, radius, sweep):
+        """Number of chords for an arc so no chord is further than arc_tolerance from the circle"""
+        if self.arc_tolerance < radius:
+            max_theta = 2.0 * math.acos(1.0 - self.arc_tolerance / radius)
+        else:
+            max_theta = math.pi / 2
+        return max(1, int(math.ceil(abs(sweep) / max_theta)))
 
-        first_x = first_y = None
-        last_emitted_x = last_emitted_y = None
-        emitted_any = False
+    def _move_to(self, x, y):
+        """Move to the absolute position x, y in either distance mode"""
+        if self.relative_mode:
+            self.move(x - self.absolute_x, y - self.absolute_y)
+        else:
+            self.move(x, y)
 
-        for n in range(steps):
-            t = n / float(steps)
-            theta = start_angle + t * sweep
-            x = center_point.x + abs(radius) * math.cos(theta)
-            y = center_point.y + abs(radius) * math.sin(theta)
-            # apply rounding precision semantics from original implementation
-            rx = round(x, self.rounding_precision)
-            ry = round(y, self.rounding_precision)
 
-            if emitted_any and rx == last_emitted_x and ry == last_emitted_y:
-                continue
+    def clamp_rate(self, rate):
+        """Limit a rate in mm/min to max_rate"""
+        if self.max_rate is not None and rate > self.max_rate:
+            return self.max_rate
+        return rate
 
-            if not emitted_any:
-                first_x, first_y = rx, ry
+    def set_feed_rate(self, feed_rate):
+        """Set the modal feed rate from an F word, in mm/min"""
+        if feed_rate > 0:
+            self.feed_rate = self.clamp_rate(feed_rate)
 
-            last_emitted_x, last_emitted_y = rx, ry
-            emitted_any = True
+    def select_rate(self, rapid=False):
+        """Use the rapid rate for the following moves (G0) or the feed rate (G1/G2/G3)"""
+        self.rate = self.clamp_rate(self.rapid_rate if rapid else self.feed_rate)
 
-        # ensure final endpoint is considered
-        final_rx = round(ending_point.x, self.rounding_precision)
-        final_ry = round(ending_point.y, self.rounding_precision)
-        final_needed = not emitted_any or (final_rx != last_emitted_x or final_ry != last_emitted_y)
+    def flush(self):
+        """Finish any moves a machine has queued, called when the input goes idle"""
+        pass
 
-        if not emitted_any and not final_needed:
-            # nothing to draw
-            return
+    def is_busy(self):
+        """True while the motors are running a move"""
+        return False
 
-        # Move to start of arc
-        self.penup()
-        if emitted_any:
-            # compute move to first sample
-            if self.relative_mode:
-                dx = first_x - self.absolute_x
-                dy = first_y - self.absolute_y
-                self.move(dx, dy)
-            else:
-                self.move(first_x, first_y)
-        else:
-            # No sampled points, just move to final endpoint
-            if self.relative_mode:
-                dx = final_rx - self.absolute_x
-                dy = final_ry - self.absolute_y
-                self.move(dx, dy)
-            else:
-                self.move(final_rx, final_ry)
-
-        # draw remaining points
-        self.pendown()
-
-        # Second pass: recompute and emit moves (skip the first emitted sample)
-        emitted_count = 0
-        last_emitted_during_draw_x = None
-        last_emitted_during_draw_y = None
-
-        for n in range(steps):
-            t = n / float(steps)
-            theta = start_angle + t * sweep
-            x = center_point.x + abs(radius) * math.cos(theta)
-            y = center_point.y + abs(radius) * math.sin(theta)
-            rx = round(x, self.rounding_precision)
-            ry = round(y, self.rounding_precision)
-
-            if emitted_count > 0 and rx == last_emitted_during_draw_x and ry == last_emitted_during_draw_y:
-                continue
-
-            # this is an emitted sample
-            if emitted_count == 0:
-                # skip the first because we already moved to it (penup->move)
-                emitted_count += 1
-                last_emitted_during_draw_x, last_emitted_during_draw_y = rx, ry
-                continue
-
-            # compute relative delta if needed at moment of move so current position is accounted
-            if self.relative_mode:
-                dx = rx - self.absolute_x
-                dy = ry - self.absolute_y
-                self.move(dx, dy)
-            else:
-                self.move(rx, ry)
+    def machine_position(self):
+        """(x, y) in mm the motors have reached, for status reports. Machines that run behind the moves given override it"""
+        return self.absolute_x, self.absolute_y
 
-            last_emitted_during_draw_x, last_emitted_during_draw_y = rx, ry
-            emitted_count += 1
+    def state(self):
+        """GRBL machine state for status reports: Hold, Run or Idle"""
+        if self.holding:
+            return "Hold"
+        return "Run" if self.is_busy() else "Idle"
 
-        # finally, ensure final endpoint is reached
-        if final_needed:
-            if self.relative_mode:
-                dx = final_rx - self.absolute_x
-                dy = final_ry - self.absolute_y
-                self.move(dx, dy)
-            else:
-                self.move(final_rx, final_ry)
+    def feed_hold(self):
+        """Pause the motors at the next step, GRBL '!'"""
+        self.holding = True
 
+    def resume(self):
+        """Carry on after a feed hold, GRBL '~'"""
+        self.holding = False
+
+    def soft_reset(self):
+        """Stop the motors at the next step and drop the queued moves, GRBL Ctrl-X, see abort()"""
+        self.holding = False
+        self.reset_requested = True
+
+    def abort(self):
+        """Called by the interpreter once a soft reset has stopped the motors, forgets whatever is still queued"""
+        self.holding = False
+        self.reset_requested = False
+
+    def between_steps(self):
+        """
+        Called by the step loops of a machine after every step: reads real-time commands through poll_realtime,
+        waits out a feed hold and raises SoftReset once one is requested
+        """
+        if self.poll_realtime is not None:
+            self.poll_realtime()
+        while self.holding and not self.reset_requested:
+            sleep_micros(GCodeMachine.HOLD_WAIT_US)
+            if self.poll_realtime is not None:
+                self.poll_realtime()
+        if self.reset_requested:
+            raise SoftReset()
+
+    def register_commands(self, interpreter):
+        """
+        Called once by the GcodeInterpreter so a machine can add its own command words, e.g.
+            interpreter.register_command("m3", lambda words: self.pendown() or "ok\r\n", "Pen down")
+        """
+        pass
 
     def dot(self, point):
         pass
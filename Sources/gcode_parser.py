@@ -0,0 +1,71 @@
+# Single pass G-code line scanner.
+# Works on both CPython and MicroPython (no re module, no str.translate).
+
+# Characters that can make up the numeric value of a word, e.g. x-10.5
+_NUMBER_CHARS = "+-.0123456789"
+_SPACE_CHARS = " \t\r\n"
+
+
+def parse_line(line):
+    """
+    Scan a G-code line once and return (command, words).
+        command is the lower case first word, e.g. "g00", "g1", "$j=", "$$", "?"
+        words maps each following word letter to its value, e.g. {"x": 10.0, "y": 20.0}
+    Comments after ';' are dropped. Returns (None, None) for blank or comment only lines.
+    Examples:
+        "G01 X90 Y80 F500 ; corner" -> ("g01", {"x": 90.0, "y": 80.0, "f": 500.0})
+        "G1Z1"                      -> ("g1", {"z": 1.0})
+        "$J=G91 X10"                -> ("$j=", {"g": 91.0, "x": 10.0})
+        "$11=0.02"                  -> ("$n=", {"n": 11.0, "v": 0.02})
+    """
+    if not line:
+        return None, None
+    comment = line.find(';')
+    if comment >= 0:
+        line = line[:comment]
+    line = line.strip()
+    if not line:
+        return None, None
+
+    first = line[0]
+    if first == '?' or first == '%':
+        return line, {}
+    if first == '$':
+        if len(line) > 2 and line[2] == '=' and line[1] in "jJ":
+            # jog carries regular words after the '$j=' prefix
+            words = {}
+            _scan_words(line, 3, words)
+            return "$j=", words
+        if len(line) > 1 and line[1] in "0123456789":
+            # setting write, e.g. $11=0.02 -> ("$n=", {"n": 11.0, "v": 0.02})
+            equals = line.find('=')
+            if equals > 0:
+                return "$n=", {"n": float(line[1:equals]), "v": float(line[equals + 1:])}
+        # other system commands ($, $$, $x, $h, ...) have no words
+        return line.lower(), {}
+
+    # first word is the command, e.g. g01 or m30
+    n = len(line)
+    end = 1
+    while end < n and line[end] in _NUMBER_CHARS:
+        end += 1
+    command = first.lower() + line[1:end]
+    words = {}
+    _scan_words(line, end, words)
+    return command, words
+
+
+def _scan_words(line, index, words):
+    """Collect letter/number words from line[index:] into the words dict"""
+    n = len(line)
+    while index < n:
+        letter = line[index]
+        index += 1
+        if letter in _SPACE_CHARS:
+            continue
+        start = index
+        while index < n and line[index] in _NUMBER_CHARS:
+            index += 1
+        if index > start:
+            words[letter.lower()] = float(line[start:index])
+    return words
@@ -0,0 +1,157 @@
+# Estimate how long a job takes on the stepper plotter without moving anything.
+# JobEstimator is a StepperGCodeMachine with the step loop replaced by the duration of each planned move,
+# so the estimate follows the same feed rates, acceleration ramps, look-ahead planning and pen moves
+# as the plotter, at the cost of interpreting the G-code once.
+#
+# Usage on the host or the device:
+#   python job_estimator.py job.gcode|job.gcb [steps_per_mm] [step_delay_us]
+import math
+import sys
+
+from gcode_compiler import CompiledFileIO, interpret_lines
+from motion_planner import trapezoid_seconds
+from stepper_gcode_machine import Motor, StepperGCodeMachine
+
+
+class _TimedMotor(Motor):
+    """Motor without pins that adds the time of its moves to a JobEstimator instead of stepping"""
+
+    def __init__(self, estimator, name, delay_us, mode='half', endstop_direction=None, max_steps=1200):
+        super().__init__(name, delay_us, mode, endstop_direction, max_steps)
+        self.estimator = estimator
+
+    def move(self, steps, direction=1):
+        steps = max(0, steps)
+        self.estimator.pen_seconds += steps * len(self.sequence) * self.delay_us / 1_000_000
+        self.current_step += steps * direction
+        return steps * direction
+
+
+class JobEstimator(StepperGCodeMachine):
+    """
+    StepperGCodeMachine that adds up how long each move, pen move and homing would take.
+    Takes the same parameters as StepperGCodeMachine, the defaults match pico_main.py.
+    """
+
+    def __init__(self, steps_per_mm=11, step_delay_us=1500, **kwargs):
+        self.draw_seconds = 0.0
+        self.travel_seconds = 0.0
+        self.pen_seconds = 0.0
+        self.home_seconds = 0.0
+        self.draw_mm = 0.0
+        self.travel_mm = 0.0
+        self.pen_lifts = 0
+        super().__init__(steps_per_mm, step_delay_us, **kwargs)
+        # the move_profile() constants, looked up once instead of for every move
+        self._phases = len(self.motor_x.sequence)
+        self._start_rate = 1_000_000 / (self.start_step_delay_us * self._phases)
+
+    def _build_motors(self, step_delay_us):
+        self.motor_y = _TimedMotor(self, "Y", step_delay_us, endstop_direction=1)
+        self.motor_x = _TimedMotor(self, "X", step_delay_us, endstop_direction=-1)
+        self.motor_z = _TimedMotor(self, "Z", 1500)
+
+    def _execute_segment(self, dx, dy, nominal_speed, entry_speed, exit_speed):
+        # move_profile() worked out on plain floats, without the method calls and the tuple per move
+        steps_per_mm = self.steps_per_mm
+        x_steps = abs(round(dx * steps_per_mm))
+        y_steps = abs(round(dy * steps_per_mm))
+        ticks = x_steps if x_steps > y_steps else y_steps
+        if ticks <= 0:
+            return
+        step_distance = math.sqrt(x_steps * x_steps + y_steps * y_steps)
+        distance = step_distance / steps_per_mm
+        phases = self._phases
+        rate = nominal_speed * 60
+        if rate > 0:
+            delay_us = int(distance * 60_000_000 / (rate * ticks * phases))
+            if delay_us < self.min_step_delay_us:
+                delay_us = self.min_step_delay_us
+        else:
+            delay_us = self.step_delay_us
+        ticks_per_mm = ticks / distance
+        start_rate = self._start_rate
+        entry_rate = entry_speed * ticks_per_mm
+        exit_rate = exit_speed * ticks_per_mm
+        seconds = trapezoid_seconds(ticks, entry_rate if entry_rate > start_rate else start_rate,
+                                    1_000_000 / (delay_us * phases), exit_rate if exit_rate > start_rate else start_rate,
+                                    self.acceleration * ticks_per_mm)
+        # the planner runs every queued move before the pen changes, so is_pendown is the pen of this move
+        if self.is_pendown:
+            self.draw_seconds += seconds
+            self.draw_mm += distance
+        else:
+            self.travel_seconds += seconds
+            self.travel_mm += distance
+
+    def home(self):
+        self.penup()
+        self.flush()
+        # X then Y run back to their endstops one after the other, a step at a time at the motor delay
+        steps = abs(self.step_x) + abs(self.step_y)
+        self.home_seconds += steps * len(self.motor_x.sequence) * self.motor_x.delay_us / 1_000_000
+        self.absolute_x = 0
+        self.absolute_y = 0
+        self.step_x = 0
+        self.step_y = 0
+        self.simplifier.reset()
+
+    def penup(self):
+        if self.is_pendown:
+            self.flush()
+            self.pen_lifts += 1
+            self.is_pendown = False
+            self.motor_z.move(40, -1)
+
+    def pendown(self):
+        if not self.is_pendown:
+            self.flush()
+            self.is_pendown = True
+            self.motor_z.move(40, 1)
+
+    def total_seconds(self):
+        return self.draw_seconds + self.travel_seconds + self.pen_seconds + self.home_seconds
+
+    def report(self):
+        return (f"total: {_duration(self.total_seconds())}\n"
+                f"drawing: {_duration(self.draw_seconds)} over {self.draw_mm:.1f} mm\n"
+                f"travel: {_duration(self.travel_seconds)} over {self.travel_mm:.1f} mm\n"
+                f"pen: {_duration(self.pen_seconds)} for {self.pen_lifts} pen lifts\n"
+                f"homing: {_duration(self.home_seconds)}")
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def estimate_lines(lines, **kwargs):
+    """Estimate G-code lines, returns the JobEstimator holding the times"""
+    estimator = JobEstimator(**kwargs)
+    interpret_lines(estimator, lines)
+    estimator.end()
+    return estimator
+
+
+def estimate_file(path, **kwargs):
+    """Estimate a G-code file, or a program compiled by gcode_compiler.py when path ends with .gcb"""
+    if path.endswith('.gcb'):
+        estimator = JobEstimator(**kwargs)
+        CompiledFileIO(path).execute(estimator)
+        estimator.end()
+        return estimator
+    with open(path, 'r') as f:
+        return estimate_lines(f, **kwargs)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python job_estimator.py job.gcode|job.gcb [steps_per_mm] [step_delay_us]")
+    else:
+        settings = {}
+        if len(sys.argv) > 2:
+            settings['steps_per_mm'] = float(sys.argv[2])
+        if len(sys.argv) > 3:
+            settings['step_delay_us'] = int(sys.argv[3])
+        print(estimate_file(sys.argv[1], **settings).report())
@@ -2,6 +2,7 @@
 import asyncio
 from machine import Pin
 from stepper_gcode_machine import StepperGCodeMachine
+from threaded_gcode_machine import ThreadedGCodeMachine
 from gcode_interpreter import GcodeInterpreter, IOBase
 from microdot import Microdot
 import network
@@ -38,6 +39,8 @@ class RestSerialServer:
                     print("\nProcessing command: "+s)
                     result = self.interpreter.gcode(s)
                     output = output + line + ":\n" +  (result or "") + "\n"
+            # nothing else is coming with this request, run the moves the planner holds back
+            self.interpreter.machine.flush()
         except KeyboardInterrupt:
             led_pin.value(0)
             output = output + "\nEnding Server\n"
@@ -93,7 +96,8 @@ async def main():
     led_pin.value(1)
     #rest_io = RestIO()
     stepper_machine = StepperGCodeMachine(11, 1500)
-    interpreter = GcodeInterpreter(stepper_machine, use_polling=True)
+    # the motors run on core 1 so requests are still answered while a move is stepping
+    interpreter = GcodeInterpreter(ThreadedGCodeMachine(stepper_machine), use_polling=True)
     rest_server = RestSerialServer(interpreter)
 
     rest_server.run(debug=True)
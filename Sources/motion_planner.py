@@ -0,0 +1,190 @@
+# Motion planning for the stepper machines: acceleration profiles and look-ahead across moves.
+import math
+from array import array
+
+
+def new_delay_table(size=0):
+    """Table of unsigned step delays in microseconds, reused between moves to avoid allocations"""
+    return array('I', [0] * size)
+
+
+def fill_trapezoid(delays, ticks, entry_rate, cruise_rate, exit_rate, acceleration, phases=1):
+    """
+    Fill delays[0:ticks] with a trapezoidal speed profile: accelerate from entry_rate up to cruise_rate,
+    cruise, then decelerate to exit_rate. A move too short to reach cruise_rate gets a triangle profile.
+    Rates are in ticks/second and acceleration in ticks/second^2, each delay is the time of one tick
+    in microseconds divided by phases, i.e. the wait after each coil phase of the tick.
+    The table is extended when it is shorter than ticks, so the step loop only has to index it.
+    :return: delays
+    """
+    if len(delays) < ticks:
+        delays.extend(array('I', [0] * (ticks - len(delays))))
+    entry_rate = min(entry_rate, cruise_rate)
+    exit_rate = min(exit_rate, cruise_rate)
+    scale = 1_000_000 / phases
+    if acceleration <= 0 or (entry_rate >= cruise_rate and exit_rate >= cruise_rate):
+        delay = int(scale / cruise_rate)
+        for tick in range(ticks):
+            delays[tick] = delay
+        return delays
+
+    entry_squared = entry_rate * entry_rate
+    exit_squared = exit_rate * exit_rate
+    cruise_squared = cruise_rate * cruise_rate
+    twice_acceleration = 2 * acceleration
+    for tick in range(ticks):
+        # v^2 = v0^2 + 2 a d, from the start for the ramp up and from the end for the ramp down
+        rate_squared = min(cruise_squared,
+                           entry_squared + twice_acceleration * tick,
+                           exit_squared + twice_acceleration * (ticks - 1 - tick))
+        if rate_squared < acceleration:
+            # starting from rest, use the rate reached after half a tick
+            rate_squared = acceleration
+        delays[tick] = int(scale / math.sqrt(rate_squared))
+    return delays
+
+
+def trapezoid_seconds(ticks, entry_rate, cruise_rate, exit_rate, acceleration):
+    """
+    Duration in seconds of the profile fill_trapezoid() samples, worked out from the continuous motion
+    instead of summing a table, for estimating the time of a job without running it.
+    Rates are in ticks/second and acceleration in ticks/second^2.
+    """
+    if ticks <= 0:
+        return 0.0
+    entry_rate = min(entry_rate, cruise_rate)
+    exit_rate = min(exit_rate, cruise_rate)
+    if acceleration <= 0 or (entry_rate >= cruise_rate and exit_rate >= cruise_rate):
+        return ticks / cruise_rate
+
+    twice_acceleration = 2 * acceleration
+    # a move too short to change speed that much follows the ramp from the other end
+    entry_rate = min(entry_rate, math.sqrt(exit_rate * exit_rate + twice_acceleration * ticks))
+    exit_rate = min(exit_rate, math.sqrt(entry_rate * entry_rate + twice_acceleration * ticks))
+    entry_squared = entry_rate * entry_rate
+    exit_squared = exit_rate * exit_rate
+    # highest rate reached, where the ramp up from the entry meets the ramp down to the exit or at cruise
+    peak_squared = min(cruise_rate * cruise_rate, (entry_squared + exit_squared + twice_acceleration * ticks) / 2)
+    peak_rate = math.sqrt(peak_squared)
+    # v^2 = v0^2 + 2 a d for the ticks spent ramping, t = (v - v0) / a for their time
+    ramp_ticks = (2 * peak_squared - entry_squared - exit_squared) / twice_acceleration
+    return ((2 * peak_rate - entry_rate - exit_rate) / acceleration
+            + max(0.0, ticks - ramp_ticks) / peak_rate)
+
+
+class MotionPlanner:
+    """
+    Look-ahead buffer of the next moves, so consecutive segments of a polyline or arc don't stop at every vertex.
+    The speed through the junction of two segments is limited GRBL style by the junction deviation:
+    the largest speed at which the centripetal acceleration of a circle of that deviation from the corner
+    stays within the machine acceleration. Speeds are then planned backward from a full stop at the end
+    of the buffer and forward from the current speed, and the oldest segment is handed to execute().
+    Segments are kept in preallocated arrays used as a ring buffer.
+    """
+
+    def __init__(self, execute, size=16, acceleration=20.0):
+        """
+        :param execute: called as execute(dx, dy, nominal_speed, entry_speed, exit_speed) to run the oldest
+            segment, distances in mm and speeds in mm/s
+        :param size: number of segments planned ahead
+        :param acceleration: acceleration along the path in mm/s^2
+        """
+        self.execute = execute
+        self.size = size
+        self.acceleration = acceleration
+        self.dx = array('f', [0.0] * size)
+        self.dy = array('f', [0.0] * size)
+        self.length = array('f', [0.0] * size)
+        self.nominal_speed = array('f', [0.0] * size)
+        # largest speed allowed through the junction into each segment
+        self.max_entry_speed = array('f', [0.0] * size)
+        self.first = 0
+        self.count = 0
+        # speed at the end of the last executed segment
+        self.speed = 0.0
+        self.previous_ux = 0.0
+        self.previous_uy = 0.0
+
+    def push(self, dx, dy, nominal_speed, junction_deviation):
+        """Queue a move of dx, dy mm at nominal_speed mm/s, running the oldest segment when the buffer is full"""
+        length = math.sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return
+        if self.count == self.size:
+            self._execute_first()
+
+        ux = dx / length
+        uy = dy / length
+        if self.count == 0:
+            # nothing queued means the motors are at rest
+            max_entry_speed = 0.0
+        else:
+            previous = (self.first + self.count - 1) % self.size
+            max_entry_speed = min(self.junction_speed(ux, uy, junction_deviation),
+                                  nominal_speed, self.nominal_speed[previous])
+
+        index = (self.first + self.count) % self.size
+        self.dx[index] = dx
+        self.dy[index] = dy
+        self.length[index] = length
+        self.nominal_speed[index] = nominal_speed
+        self.max_entry_speed[index] = max_entry_speed
+        self.count += 1
+        self.previous_ux = ux
+        self.previous_uy = uy
+
+    def junction_speed(self, ux, uy, junction_deviation):
+        """Largest speed through the corner from the previous segment into direction ux, uy"""
+        # cosine of the angle between the segments, -1 straight on and 1 a full reversal
+        cos_theta = -(self.previous_ux * ux + self.previous_uy * uy)
+        if cos_theta > 0.999999:
+            return 0.0
+        if cos_theta < -0.999999:
+            return float('inf')
+        sin_theta_d2 = math.sqrt(0.5 * (1.0 - cos_theta))
+        return math.sqrt(self.acceleration * junction_deviation * sin_theta_d2 / (1.0 - sin_theta_d2))
+
+    def flush(self):
+        """Run every queued segment, ending at rest"""
+        while self.count:
+            self._execute_first()
+
+    def clear(self):
+        """Drop every queued segment without running it, the motors are at rest"""
+        self.first = 0
+        self.count = 0
+        self.speed = 0.0
+
+    def _exit_speed_of_first(self):
+        # backward pass: fastest entry into the second segment that can still stop at the end of the buffer.
+        # Unrolled, its square is the smallest of max_entry_speed[k]^2 + 2 a (length of the segments between),
+        # and 2 a (length of them all) for the stop, walked forward it can stop once the lengths alone are larger
+        twice_acceleration = 2 * self.acceleration
+        first = self.first
+        size = self.size
+        max_entry_speed = self.max_entry_speed
+        length = self.length
+        ramp = 0.0
+        next_entry_squared = float('inf')
+        for k in range(1, self.count):
+            if ramp >= next_entry_squared:
+                break
+            index = (first + k) % size
+            entry_squared = max_entry_speed[index] * max_entry_speed[index] + ramp
+            if entry_squared < next_entry_squared:
+                next_entry_squared = entry_squared
+            ramp += twice_acceleration * length[index]
+        if ramp < next_entry_squared:
+            next_entry_squared = ramp
+        # forward pass: the first segment can only speed up so much from the current speed
+        return min(math.sqrt(next_entry_squared), self.nominal_speed[first],
+                   math.sqrt(self.speed * self.speed + twice_acceleration * length[first]))
+
+    def _execute_first(self):
+        first = self.first
+        exit_speed = self._exit_speed_of_first()
+        entry_speed = self.speed
+        self.first = (first + 1) % self.size
+        self.count -= 1
+        self.speed = exit_speed
+        self.execute(self.dx[first], self.dy[first], self.nominal_speed[first], entry_speed, exit_speed)
@@ -0,0 +1,116 @@
+# Fixed capacity queue of motion segments between the code that works out moves and the code that steps them,
+# e.g. the interpreter thread and the motion thread of ThreadedGCodeMachine.
+# Segments are kept in preallocated arrays with head and tail indices, so pushing and popping are O(1)
+# and never allocate, which keeps the MicroPython garbage collector from pausing the step loop.
+# Safe for one producer and one consumer thread, or the two cores of the RP2040/RP2350.
+from array import array
+
+from thread_compat import allocate_lock
+from time_compat import tick_millis, ticks_diff, sleep_micros
+
+PEN_UP = 0
+PEN_DOWN = 1
+
+
+class MotionQueue:
+    """
+    Ring buffer of size segments, each dx_steps, dy_steps, pen and rate:
+        dx_steps, dy_steps  move in whole motor steps, int32
+        pen                 PEN_UP or PEN_DOWN for the move, users may give negative values their own meaning
+        rate                mm/min, float32
+    The consumer reads the segment at peek() straight from the arrays and calls drop() once it is done with it,
+    so the slot isn't reused while it is being read. pop() is the allocating shortcut returning a tuple.
+    The *_wait variants block, polling every wait_us, optionally giving up after timeout_ms.
+    """
+
+    def __init__(self, size=64, wait_us=200):
+        self.size = size
+        self.wait_us = wait_us
+        self.dx_steps = array('i', [0] * size)
+        self.dy_steps = array('i', [0] * size)
+        self.pen = array('b', [0] * size)
+        self.rate = array('f', [0.0] * size)
+        # next segment to read and next free slot
+        self.head = 0
+        self.tail = 0
+        self.count = 0
+        self.lock = allocate_lock()
+
+    def __len__(self):
+        return self.count
+
+    def is_empty(self):
+        return self.count == 0
+
+    def is_full(self):
+        return self.count == self.size
+
+    def clear(self):
+        """Drop every queued segment"""
+        with self.lock:
+            self.head = self.tail = self.count = 0
+
+    def push(self, dx_steps, dy_steps, pen=PEN_DOWN, rate=0.0):
+        """Queue a segment, returns False without queueing it when the queue is full"""
+        with self.lock:
+            if self.count == self.size:
+                return False
+            tail = self.tail
+            self.dx_steps[tail] = dx_steps
+            self.dy_steps[tail] = dy_steps
+            self.pen[tail] = pen
+            self.rate[tail] = rate
+            self.tail = tail + 1 if tail + 1 < self.size else 0
+            self.count += 1
+            return True
+
+    def push_wait(self, dx_steps, dy_steps, pen=PEN_DOWN, rate=0.0, timeout_ms=None):
+        """Queue a segment, waiting for room, returns False if there was none within timeout_ms"""
+        start = tick_millis() if timeout_ms is not None else 0
+        while not self.push(dx_steps, dy_steps, pen, rate):
+            if timeout_ms is not None and ticks_diff(tick_millis(), start) >= timeout_ms:
+                return False
+            sleep_micros(self.wait_us)
+        return True
+
+    def peek(self):
+        """Index of the oldest segment in the arrays, or -1 when the queue is empty"""
+        with self.lock:
+            return self.head if self.count else -1
+
+    def peek_wait(self, timeout_ms=None):
+        """Index of the oldest segment, waiting for one, or -1 if none arrived within timeout_ms"""
+        start = tick_millis() if timeout_ms is not None else 0
+        index = self.peek()
+        while index < 0:
+            if timeout_ms is not None and ticks_diff(tick_millis(), start) >= timeout_ms:
+                return -1
+            sleep_micros(self.wait_us)
+            index = self.peek()
+        return index
+
+    def drop(self):
+        """Remove the oldest segment once it has been read, returns False when the queue is empty"""
+        with self.lock:
+            if self.count == 0:
+                return False
+            self.head = self.head + 1 if self.head + 1 < self.size else 0
+            self.count -= 1
+            return True
+
+    def pop(self):
+        """Remove the oldest segment, returns (dx_steps, dy_steps, pen, rate) or None when the queue is empty"""
+        with self.lock:
+            if self.count == 0:
+                return None
+            head = self.head
+            segment = (self.dx_steps[head], self.dy_steps[head], self.pen[head], self.rate[head])
+            self.head = head + 1 if head + 1 < self.size else 0
+            self.count -= 1
+            return segment
+
+    def pop_wait(self, timeout_ms=None):
+        """Remove the oldest segment, waiting for one, or None if none arrived within timeout_ms"""
+        if self.peek_wait(timeout_ms) < 0:
+            return None
+        return self.pop()
@@ -46,9 +46,8 @@ class MplotGCodeMachine(GCodeMachine):
         self.plt.plot(point.x, point.y, 'o', color='black', markersize=MplotGCodeMachine.dot_size)
 
     def move(self, x = None, y = None):
-        current_point = Point(self.absolute_x, self.absolute_y)
         if self.relative_mode:
-            next_point =  Point(0 if x is None else x, 0 if y is None else y).add(current_point)
+            next_point = Point(0 if x is None else x, 0 if y is None else y).iadd(self.current_point())
         else:
             next_point = Point(self.absolute_x if x is None else x, self.absolute_y if y is None else y)
         # Only draw when pen is down. Pen-up moves should not plot a visible stroke;
@@ -0,0 +1,106 @@
+# GCodeMachine backends without side effects, for benchmarking and testing the interpreter and the
+# geometry of GCodeMachine (line sampling, arcs) in isolation from turtle, matplotlib or the GPIO pins.
+#
+#   NullGCodeMachine       does nothing but keep the position and count calls
+#   RecordingGCodeMachine  also stores every move, its rate and the pen state in compact arrays
+from array import array
+
+from gcode_machine import GCodeMachine
+
+
+class NullGCodeMachine(GCodeMachine):
+    """
+    GCodeMachine that only tracks its position and pen state and counts the calls made to it.
+    Lines and arcs still go through the GCodeMachine geometry, so move_count is the number of moves
+    a real machine would make.
+    """
+
+    def __init__(self, steps_per_mm=10, step_delay_us=0, rounding_precision=0, line_increment=0.25):
+        super().__init__(steps_per_mm, step_delay_us, rounding_precision, line_increment)
+        self.reset_counts()
+
+    def reset_counts(self):
+        """Start counting calls from 0 again"""
+        self.move_count = 0
+        self.line_count = 0
+        self.circle_count = 0
+        self.penup_count = 0
+        self.pendown_count = 0
+        self.home_count = 0
+        self.flush_count = 0
+
+    def line(self, end_point):
+        self.line_count += 1
+        super().line(end_point)
+
+    def circle(self, end_point, radius, is_clockwise=True):
+        self.circle_count += 1
+        super().circle(end_point, radius, is_clockwise)
+
+    def move(self, x = None, y = None):
+        self.move_count += 1
+        if self.relative_mode:
+            self.absolute_x += 0 if x is None else x
+            self.absolute_y += 0 if y is None else y
+        else:
+            self.absolute_x = self.absolute_x if x is None else x
+            self.absolute_y = self.absolute_y if y is None else y
+
+    def dot(self, point):
+        self.penup()
+        self.move(point.x, point.y)
+        self.pendown()
+
+    def home(self):
+        self.home_count += 1
+        self.penup()
+        self.absolute_x = 0
+        self.absolute_y = 0
+
+    def penup(self):
+        self.penup_count += 1
+        self.is_pendown = False
+
+    def pendown(self):
+        self.pendown_count += 1
+        self.is_pendown = True
+
+    def flush(self):
+        self.flush_count += 1
+
+
+class RecordingGCodeMachine(NullGCodeMachine):
+    """
+    NullGCodeMachine that records the absolute position reached by every move, in either distance mode,
+    the rate in mm/min selected for it and whether the pen was down for it. They are kept in array('d')
+    buffers, 24 bytes per move plus a byte for the pen, instead of a tuple per move.
+    """
+
+    def __init__(self, steps_per_mm=10, step_delay_us=0, rounding_precision=0, line_increment=0.25):
+        super().__init__(steps_per_mm, step_delay_us, rounding_precision, line_increment)
+        self.clear()
+
+    def clear(self):
+        """Forget the recorded moves, keeping the position"""
+        self.xs = array('d')
+        self.ys = array('d')
+        self.rates = array('d')
+        self.pen = bytearray()
+
+    def move(self, x = None, y = None):
+        super().move(x, y)
+        self.xs.append(self.absolute_x)
+        self.ys.append(self.absolute_y)
+        self.rates.append(self.rate)
+        self.pen.append(1 if self.is_pendown else 0)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def point(self, index):
+        """Absolute x, y reached by move index"""
+        return self.xs[index], self.ys[index]
+
+    def points(self):
+        """List of the absolute x, y reached by every move"""
+        return list(zip(self.xs, self.ys))
@@ -0,0 +1,273 @@
+# Reorder the strokes of a G-code program to cut the pen up travel between them.
+# Plot files from CAM tools often jump back and forth across the page, every jump is a rapid move
+# plus a pen up/pen down cycle on the plotter. The program is compiled into strokes (pen down polylines),
+# put in nearest neighbour order using a grid of stroke ends, improved with 2-opt and written back as G-code.
+# Strokes may be drawn backwards, which the plotter doesn't mind. Each stroke keeps its F word.
+# Arcs are flattened: the output draws them as the G1 chords they were compiled to.
+#
+# Usage on the host:
+#   python path_optimizer.py input.gcode output.gcode [--no-reverse]
+import math
+import sys
+from array import array
+
+from gcode_compiler import Program, compile_program, path_length
+
+# StepperGCodeMachine defaults: rapid moves at its 1000 us minimum phase delay, half steps and 11 steps/mm,
+# the pen motor moves 40 steps of 8 phases at 1500 us for each pen up or pen down
+DEFAULT_RAPID_RATE = 60_000_000 / (1000 * 8 * 11)
+PEN_TRANSITION_SECONDS = 40 * 8 * 1500 / 1_000_000
+
+
+def reversed_path(path):
+    """Copy of a path of x0, y0, x1, y1, ... pairs from its last point to its first"""
+    result = array('d', path)
+    last = len(path) - 2
+    for i in range(0, len(path), 2):
+        result[i] = path[last - i]
+        result[i + 1] = path[last - i + 1]
+    return result
+
+
+def pen_lifts(program):
+    """Pen up/pen down cycles needed between the strokes of program, joining strokes that touch"""
+    lifts = 0
+    for travel in program.travels[1:len(program.polylines)]:
+        if path_length(travel) > 0:
+            lifts += 1
+    return lifts
+
+
+def travel_seconds(program, rapid_rate=DEFAULT_RAPID_RATE, pen_transition_seconds=PEN_TRANSITION_SECONDS):
+    """Estimated time of the pen up travels of program at rapid_rate mm/min, including the pen cycles"""
+    return program.travel_length() * 60 / rapid_rate + 2 * pen_lifts(program) * pen_transition_seconds
+
+
+class _EndpointGrid:
+    """Uniform grid of the stroke ends not drawn yet, for finding the nearest one without checking them all"""
+
+    def __init__(self, xs, ys, entries):
+        min_x = min(xs)
+        min_y = min(ys)
+        width = max(xs) - min_x
+        height = max(ys) - min_y
+        # about one stroke end per cell
+        self.cell_size = max(math.sqrt(width * height / len(xs)), width / len(xs), height / len(xs), 1e-6)
+        self.min_x = min_x
+        self.min_y = min_y
+        self.columns = int(width / self.cell_size) + 1
+        self.rows = int(height / self.cell_size) + 1
+        self.cells = [None] * (self.columns * self.rows)
+        self.xs = xs
+        self.ys = ys
+        self.entries = entries
+        for n in range(len(xs)):
+            index = self._cell(xs[n], ys[n])
+            if self.cells[index] is None:
+                self.cells[index] = []
+            self.cells[index].append(n)
+
+    def _cell(self, x, y):
+        column = int((x - self.min_x) / self.cell_size)
+        row = int((y - self.min_y) / self.cell_size)
+        return row * self.columns + column
+
+    def nearest(self, x, y, visited):
+        """Index of the nearest point whose stroke isn't visited, dropping visited ones from the cells on the way"""
+        column = math.floor((x - self.min_x) / self.cell_size)
+        row = math.floor((y - self.min_y) / self.cell_size)
+        max_ring = max(column, self.columns - 1 - column, row, self.rows - 1 - row)
+        best = -1
+        best_distance = float('inf')
+        ring = max(0, -column, column - self.columns + 1, -row, row - self.rows + 1)
+        while ring <= max_ring:
+            for r in range(max(0, row - ring), min(self.rows - 1, row + ring) + 1):
+                edge = r == row - ring or r == row + ring
+                step = 1 if edge else 2 * ring
+                c = column - ring
+                while c <= column + ring:
+                    if 0 <= c < self.columns:
+                        found, distance = self._scan(r * self.columns + c, x, y, visited)
+                        if distance < best_distance:
+                            best, best_distance = found, distance
+                    c += step
+            # cells further out are at least ring cells away
+            if best >= 0 and best_distance <= ring * self.cell_size:
+                break
+            ring += 1
+        return best
+
+    def _scan(self, index, x, y, visited):
+        cell = self.cells[index]
+        if not cell:
+            return -1, float('inf')
+        best = -1
+        best_distance = float('inf')
+        stale = False
+        for n in cell:
+            if visited[self.entries[n] >> 1]:
+                stale = True
+                continue
+            distance = math.hypot(self.xs[n] - x, self.ys[n] - y)
+            if distance < best_distance:
+                best, best_distance = n, distance
+        if stale:
+            self.cells[index] = [n for n in cell if not visited[self.entries[n] >> 1]]
+        return best, best_distance
+
+
+def _nearest_neighbour_order(polylines, start_x, start_y, allow_reverse):
+    """Stroke order and whether each stroke is drawn backwards, always moving to the nearest stroke end"""
+    xs = array('d')
+    ys = array('d')
+    # stroke * 2, plus 1 when the point is the end of the stroke, i.e. drawing it backwards
+    entries = []
+    for stroke, polyline in enumerate(polylines):
+        xs.append(polyline[0])
+        ys.append(polyline[1])
+        entries.append(stroke * 2)
+        if allow_reverse and len(polyline) > 2:
+            xs.append(polyline[-2])
+            ys.append(polyline[-1])
+            entries.append(stroke * 2 + 1)
+    grid = _EndpointGrid(xs, ys, entries)
+    visited = bytearray(len(polylines))
+    order = []
+    backwards = []
+    x, y = start_x, start_y
+    for _ in range(len(polylines)):
+        entry = entries[grid.nearest(x, y, visited)]
+        stroke = entry >> 1
+        visited[stroke] = 1
+        order.append(stroke)
+        backwards.append(bool(entry & 1))
+        polyline = polylines[stroke]
+        x, y = (polyline[0], polyline[1]) if entry & 1 else (polyline[-2], polyline[-1])
+    return order, backwards
+
+
+def _two_opt(order, backwards, polylines, start, finish, window, passes):
+    """
+    Reverse runs of up to window strokes, flipping each stroke in the run, while that shortens the travel.
+    Only the two travels at the ends of the run change, so each try is O(1).
+    """
+    starts = []
+    ends = []
+    for stroke, backward in zip(order, backwards):
+        polyline = polylines[stroke]
+        first = (polyline[0], polyline[1])
+        last = (polyline[-2], polyline[-1])
+        starts.append(last if backward else first)
+        ends.append(first if backward else last)
+
+    count = len(order)
+    for _ in range(passes):
+        improved = False
+        for i in range(count):
+            before = ends[i - 1] if i > 0 else start
+            for j in range(i, min(count, i + window)):
+                after = starts[j + 1] if j + 1 < count else finish
+                delta = (math.dist(before, ends[j]) + math.dist(starts[i], after)
+                         - math.dist(before, starts[i]) - math.dist(ends[j], after))
+                if delta < -1e-9:
+                    starts[i:j + 1], ends[i:j + 1] = ends[i:j + 1][::-1], starts[i:j + 1][::-1]
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    backwards[i:j + 1] = [not backward for backward in backwards[i:j + 1][::-1]]
+                    improved = True
+        if not improved:
+            break
+
+
+def optimize_program(program, allow_reverse=True, window=30, passes=3):
+    """
+    Reorder the strokes of program to shorten the pen up travel, drawing strokes backwards when allow_reverse.
+    The optimized program starts and finishes where program does, its travels are single straight moves.
+    :param window: longest run of strokes 2-opt reverses, bounds its work to strokes * window per pass
+    :param passes: most 2-opt passes over the strokes
+    :return: new Program
+    """
+    start = (program.travels[0][0], program.travels[0][1])
+    last_travel = program.travels[-1]
+    finish = (last_travel[-2], last_travel[-1])
+    optimized = Program(start[0], start[1])
+    if not program.polylines:
+        optimized.travels[0].extend(finish)
+        return optimized
+
+    polylines = program.polylines
+    order, backwards = _nearest_neighbour_order(polylines, start[0], start[1], allow_reverse)
+    if allow_reverse:
+        _two_opt(order, backwards, polylines, start, finish, window, passes)
+
+    travel = optimized.travels[0]
+    for stroke, backward in zip(order, backwards):
+        polyline = reversed_path(polylines[stroke]) if backward else polylines[stroke]
+        if (polyline[0], polyline[1]) != (travel[-2], travel[-1]):
+            travel.extend(polyline[0:2])
+        optimized.polylines.append(polyline)
+        optimized.feed_rates.append(program.feed_rates[stroke])
+        travel = array('d', polyline[-2:])
+        optimized.travels.append(travel)
+    if finish != (travel[-2], travel[-1]):
+        travel.extend(finish)
+    return optimized
+
+
+def _number(value):
+    text = f"{value:.4f}".rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
+
+
+def write_gcode(program, out, feed_rate=None):
+    """
+    Write program as absolute G0 travels and G1 strokes. Strokes that start where the last one ended
+    continue without lifting the pen. Arcs are written as the chords they were compiled to.
+    The first G1 of a stroke carries its F word when that changes, feed_rate is used for strokes without one.
+    """
+    out.write("G21\nG90\n")
+    written_feed_rate = 0
+    for index, travel in enumerate(program.travels):
+        if len(travel) > 2:
+            out.write(f"G0 X{_number(travel[-2])} Y{_number(travel[-1])}\n")
+        if index < len(program.polylines):
+            polyline = program.polylines[index]
+            stroke_feed_rate = program.feed_rates[index] or feed_rate
+            feed = ""
+            if stroke_feed_rate and stroke_feed_rate != written_feed_rate:
+                feed = f" F{_number(stroke_feed_rate)}"
+                written_feed_rate = stroke_feed_rate
+            # the pen goes down with the first G1, a single point is a dot drawn by a G1 that doesn't move
+            first = 0 if len(polyline) == 2 else 2
+            for i in range(first, len(polyline), 2):
+                out.write(f"G1 X{_number(polyline[i])} Y{_number(polyline[i + 1])}{feed}\n")
+                feed = ""
+
+
+def optimize_file(source_path, target_path, allow_reverse=True):
+    """Optimize a G-code file into target_path, returns the (before, after) programs"""
+    with open(source_path, 'r') as source:
+        program = compile_program(source)
+    optimized = optimize_program(program, allow_reverse)
+    with open(target_path, 'w') as target:
+        write_gcode(optimized, target)
+    return program, optimized
+
+
+def report(program, optimized, rapid_rate=DEFAULT_RAPID_RATE):
+    """Summary of the travel distance and estimated time saved by optimizing program"""
+    before = program.travel_length()
+    after = optimized.travel_length()
+    saved = travel_seconds(program, rapid_rate) - travel_seconds(optimized, rapid_rate)
+    return (f"strokes: {len(program.polylines)}, pen lifts: {pen_lifts(program)} -> {pen_lifts(optimized)}\n"
+            f"pen up travel: {before:.1f} mm -> {after:.1f} mm, saved {before - after:.1f} mm\n"
+            f"estimated time saved: {saved:.1f} s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python path_optimizer.py input.gcode output.gcode [--no-reverse]")
+        print("Keeps the F words, arcs are written as G1 chords")
+    else:
+        before_program, after_program = optimize_file(sys.argv[1], sys.argv[2], "--no-reverse" not in sys.argv)
+        print(report(before_program, after_program))
+        print("arcs are written as G1 chords")
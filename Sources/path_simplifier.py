@@ -0,0 +1,201 @@
+# Drop points of pen paths that don't change the drawing by more than a tolerance, normally the size of
+# a motor step (1 / steps_per_mm). Arcs and dense G1 chains turn into many short, nearly collinear segments,
+# and every segment costs a planner slot and a run of the step loop on the stepper machine.
+# StreamingSimplifier runs on the Pico inside StepperGCodeMachine, the offline functions are meant for the host.
+#
+#   simplify_path / simplify_program  offline: collinear merge then Ramer-Douglas-Peucker on whole polylines
+#   StreamingSimplifier               live: merges moves as they arrive from the interpreter
+#
+# Usage on the host:
+#   python path_simplifier.py input.gcode output.gcode [tolerance_mm]
+import math
+import sys
+from array import array
+
+
+def _segment_distance_squared(px, py, ax, ay, bx, by):
+    """Squared distance from point p to the segment a-b"""
+    dx = bx - ax
+    dy = by - ay
+    length_squared = dx * dx + dy * dy
+    if length_squared > 0:
+        t = ((px - ax) * dx + (py - ay) * dy) / length_squared
+        if t > 1:
+            ax, ay = bx, by
+        elif t > 0:
+            ax += t * dx
+            ay += t * dy
+    return (px - ax) * (px - ax) + (py - ay) * (py - ay)
+
+
+def merge_collinear(path, tolerance=1e-9):
+    """Copy of a path of x0, y0, x1, y1, ... without the points inside straight runs"""
+    count = len(path) // 2
+    if count <= 2:
+        return array('d', path)
+    result = array('d', path[0:2])
+    for n in range(1, count - 1):
+        ax, ay = result[-2], result[-1]
+        px, py = path[2 * n], path[2 * n + 1]
+        bx, by = path[2 * n + 2], path[2 * n + 3]
+        # a point is dropped when it lies on the segment joining its neighbours, not when the path turns back
+        if _segment_distance_squared(px, py, ax, ay, bx, by) > tolerance * tolerance or (ax, ay) == (bx, by):
+            result.append(px)
+            result.append(py)
+    result.extend(path[-2:])
+    return result
+
+
+def simplify_path(path, tolerance):
+    """
+    Ramer-Douglas-Peucker simplification of a path of x0, y0, x1, y1, ... : every dropped point is within
+    tolerance of the segment replacing it. Uses a stack instead of recursion for MicroPython.
+    """
+    path = merge_collinear(path)
+    count = len(path) // 2
+    if count <= 2:
+        return path
+    keep = bytearray(count)
+    keep[0] = keep[count - 1] = 1
+    tolerance_squared = tolerance * tolerance
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = path[2 * first], path[2 * first + 1]
+        bx, by = path[2 * last], path[2 * last + 1]
+        farthest = -1
+        farthest_distance = tolerance_squared
+        for n in range(first + 1, last):
+            distance = _segment_distance_squared(path[2 * n], path[2 * n + 1], ax, ay, bx, by)
+            if distance > farthest_distance:
+                farthest, farthest_distance = n, distance
+        if farthest >= 0:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    result = array('d')
+    for n in range(count):
+        if keep[n]:
+            result.append(path[2 * n])
+            result.append(path[2 * n + 1])
+    return result
+
+
+def simplify_program(program, tolerance=None, steps_per_mm=11):
+    """
+    Simplify the pen down polylines of a gcode_compiler.Program in place, the travels are left alone.
+    :param tolerance: largest change to the drawing in mm, by default one motor step
+    :return: number of points removed
+    """
+    if tolerance is None:
+        tolerance = 1 / steps_per_mm
+    removed = 0
+    for index, polyline in enumerate(program.polylines):
+        simplified = simplify_path(polyline, tolerance)
+        removed += (len(polyline) - len(simplified)) // 2
+        program.polylines[index] = simplified
+    return removed
+
+
+class StreamingSimplifier:
+    """
+    Merges consecutive moves into one while every point in between stays within tolerance of the merged move,
+    so a machine can simplify the path while it is being interpreted. Moves are held back until the path
+    turns away or flush() is called, at most size points per merged move, kept in preallocated arrays.
+    With a tolerance of 0 only moves that continue in exactly the same direction are merged,
+    which is exact for the integer step positions of the stepper machine.
+    """
+
+    def __init__(self, emit, tolerance=0.0, size=32, x=0, y=0):
+        """
+        :param emit: called as emit(x, y) with the end of each merged move
+        :param tolerance: largest distance of a dropped point from the merged move, in the units of the points
+        :param size: most points held back in one merged move
+        """
+        self.emit = emit
+        self.tolerance = tolerance
+        self.size = size
+        self.xs = array('f', [0.0] * size)
+        self.ys = array('f', [0.0] * size)
+        self.count = 0
+        self.has_end = False
+        self.end_x = self.start_x = x
+        self.end_y = self.start_y = y
+
+    def reset(self, x=0, y=0):
+        """Forget anything held back and start again from x, y, e.g. after homing"""
+        self.count = 0
+        self.has_end = False
+        self.end_x = self.start_x = x
+        self.end_y = self.start_y = y
+
+    def add(self, x, y):
+        """Move to x, y"""
+        if not self.has_end:
+            if x != self.start_x or y != self.start_y:
+                self.end_x = x
+                self.end_y = y
+                self.has_end = True
+            return
+        if x == self.end_x and y == self.end_y:
+            return
+        if self.count < self.size and self._fits(x, y):
+            # the current end becomes one of the points in between
+            self.xs[self.count] = self.end_x
+            self.ys[self.count] = self.end_y
+            self.count += 1
+        else:
+            self.flush()
+            self.has_end = True
+        self.end_x = x
+        self.end_y = y
+
+    def flush(self):
+        """Emit the move held back, if any"""
+        if self.has_end:
+            self.emit(self.end_x, self.end_y)
+            self.start_x = self.end_x
+            self.start_y = self.end_y
+            self.count = 0
+            self.has_end = False
+
+    def _fits(self, x, y):
+        """True when the current end and the points before it are all within tolerance of start-x, y"""
+        start_x = self.start_x
+        start_y = self.start_y
+        dx = x - start_x
+        dy = y - start_y
+        length_squared = dx * dx + dy * dy
+        if length_squared == 0:
+            return False
+        limit = self.tolerance * self.tolerance * length_squared
+        if not self._within(self.end_x - start_x, self.end_y - start_y, dx, dy, length_squared, limit):
+            return False
+        for n in range(self.count):
+            if not self._within(self.xs[n] - start_x, self.ys[n] - start_y, dx, dy, length_squared, limit):
+                return False
+        return True
+
+    @staticmethod
+    def _within(px, py, dx, dy, length_squared, limit):
+        # inside the segment along it, and within tolerance across it: cross^2 / length^2 <= tolerance^2
+        along = px * dx + py * dy
+        if along < 0 or along > length_squared:
+            return False
+        cross = px * dy - py * dx
+        return cross * cross <= limit
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python path_simplifier.py input.gcode output.gcode [tolerance_mm]")
+    else:
+        from gcode_compiler import compile_program
+        from path_optimizer import write_gcode
+        with open(sys.argv[1], 'r') as source:
+            source_program = compile_program(source)
+        before = sum(len(polyline) // 2 for polyline in source_program.polylines)
+        removed = simplify_program(source_program, float(sys.argv[3]) if len(sys.argv) > 3 else None)
+        with open(sys.argv[2], 'w') as target:
+            write_gcode(source_program, target)
+        print(f"Simplified {sys.argv[1]} to {sys.argv[2]}: {before} points, {removed} removed")
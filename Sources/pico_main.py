@@ -9,7 +9,9 @@ import machine
 import os
 
 from stepper_gcode_machine import StepperGCodeMachine
-from gcode_interpreter import GcodeInterpreter, FileIO, UARTIO
+from gcode_interpreter import GcodeInterpreter, StreamingFileIO, UARTIO
+from gcode_compiler import CompiledFileIO
+from threaded_gcode_machine import ThreadedGCodeMachine
 
 
 def get_gcode_interpreter(uart=None):
@@ -20,10 +22,10 @@ def get_gcode_interpreter(uart=None):
             return GcodeInterpreter(stepper_machine, UARTIO(uart), use_polling=True)
         elif len(sys.argv) > 1:
             print("Using file provided in sys.argv: "+sys.argv[1])
-            return GcodeInterpreter(stepper_machine,FileIO(sys.argv[1]), use_polling=True)
+            return GcodeInterpreter(stepper_machine,StreamingFileIO(sys.argv[1]), use_polling=True)
         else:
             print("Using default file: absolute.gcode")
-            return GcodeInterpreter(stepper_machine, FileIO("absolute.gcode"), use_polling=True)
+            return GcodeInterpreter(stepper_machine, StreamingFileIO("absolute.gcode"), use_polling=True)
 
     except OSError as e:
         print("Error loading file for input: "+str(e))
@@ -35,17 +37,28 @@ def main(action="serial"):
     """
     Main function for running drawing gcode using Turtle Graphics.
     Args:
-        action: str - Type of input mode ('file', 'serial', or None for interactive)
+        action: str - Type of input mode ('file', 'compiled', 'serial', 'dual', or None for interactive)
+            'dual' reads the UART on core 0 while core 1 runs the motors
     """
 
-    if action == 'file':
-        io = FileIO("./absolute.gcode")
+    if action == 'compiled':
+        # absolute.gcb is created with: python gcode_compiler.py absolute.gcode absolute.gcb
+        CompiledFileIO("./absolute.gcb").execute(stepper_machine)
+        stepper_machine.end()
+        return
+    elif action == 'file':
+        io = StreamingFileIO("./absolute.gcode")
         interpreter = GcodeInterpreter(stepper_machine, io, use_polling=False)
     elif action == 'serial':
         uart = machine.UART(0, baudrate=115200, tx=17, rx=16)
         os.dupterm(uart)            # keep REPL / prints duplicated to the UART
         io = UARTIO(uart)          # your UARTIO accepts an object with .any, .readline, .write
         interpreter = GcodeInterpreter(stepper_machine, io, use_polling=True)
+    elif action == 'dual':
+        # oks go out once a line is queued, so the sender streams ahead by the RX buffer $I reports, keep room for it
+        uart = machine.UART(0, baudrate=115200, tx=17, rx=16, rxbuf=2 * GcodeInterpreter.RX_BUFFER_SIZE)
+        os.dupterm(uart)
+        interpreter = GcodeInterpreter(ThreadedGCodeMachine(stepper_machine), UARTIO(uart), use_polling=True)
     else:
         print("Running in interactive mode. Use 'file' or 'serial' as argument to specify input mode.")
         interpreter = GcodeInterpreter(stepper_machine)
@@ -1,28 +1,41 @@
 import math
 
+# numpy is only there on the host (turtle/mplot venv), PointArray needs it, Point works everywhere
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
 
 class Point:
-    def __init__(self, *args):
-        """ Initialize point using 2 integer or up to 2 strings starting with either x or y
+    # no per instance __dict__ on CPython, MicroPython ignores __slots__ and keeps working as a plain class
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x=0, y=0):
+        """ Initialize point from 2 numbers, use Point.parse for "x10", "y20" strings
             Examples:
                 10, 20 will set x=10, y=20
-                "x10", "y20" will set x=10, y=20
         """
+        self.x = x
+        self.y = y
 
-        self.x = 0
-        self.y = 0
-
-        if len(args) == 2 and not isinstance(args[0], str) and not isinstance(args[1], str):
-            self.x = args[0]
-            self.y = args[1]
-        else:
-            params =  args[0] if isinstance(args[0],list) and len(args) == 1 else args
-            for arg in params:
-                arg = arg.lower()
-                if arg.startswith("x"):
-                    self.x = int(arg[1:])
-                elif arg.startswith("y"):
-                    self.y = int(arg[1:])
+    @classmethod
+    def parse(cls, *args):
+        """ Create a point from up to 2 strings, or a list of them, starting with either x or y
+            Examples:
+                "x10", "y20" will set x=10, y=20
+        """
+        point = cls()
+        params = args[0] if len(args) == 1 and isinstance(args[0], list) else args
+        for arg in params:
+            arg = arg.lower()
+            if arg.startswith("x"):
+                point.x = int(arg[1:])
+            elif arg.startswith("y"):
+                point.y = int(arg[1:])
+        return point
 
     def __str__(self):
         return f"[({self.x:.2f}, {self.y:.2f})]"
@@ -73,6 +86,18 @@ class Point:
         """ Subtract other point from this point"""
         return Point( self.x - other_point.x,  self.y - other_point.y)
 
+    def iadd(self, other_point):
+        """ Add another point to this point in place, returns this point"""
+        self.x += other_point.x
+        self.y += other_point.y
+        return self
+
+    def isub(self, other_point):
+        """ Subtract another point from this point in place, returns this point"""
+        self.x -= other_point.x
+        self.y -= other_point.y
+        return self
+
     def vector(self, center_point):
         return Point(self.x - center_point.x, self.y - center_point.y)
 
@@ -146,4 +171,95 @@ class Point:
                 y0 += sy
 
 
+class PointArray:
+    """
+    N points held in one (N, 2) numpy float array, for geometry on whole paths at once on the host.
+    Needs numpy, check HAS_NUMPY first, MicroPython keeps using Point one at a time.
+    """
+
+    def __init__(self, xy):
+        """
+        :param xy: anything numpy can turn into an (N, 2) array of x, y pairs
+        """
+        if np is None:
+            raise ImportError("PointArray needs numpy")
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+
+    @classmethod
+    def from_points(cls, points):
+        return cls([(point.x, point.y) for point in points])
+
+    @classmethod
+    def arc(cls, center_point, radius, start_angle, sweep, segments):
+        """
+        Vertices of an arc split into segments chords, from start_angle through start_angle + sweep radians
+        around center_point, both ends included
+        """
+        angles = start_angle + np.arange(segments + 1) * (sweep / segments)
+        return cls(np.column_stack((center_point.x + radius * np.cos(angles),
+                                    center_point.y + radius * np.sin(angles))))
+
+    def __len__(self):
+        return len(self.xy)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self.xy[index])
+        x, y = self.xy[index]
+        return Point(float(x), float(y))
+
+    def __str__(self):
+        return f"PointArray({len(self)} points)"
+
+    @property
+    def x(self):
+        return self.xy[:, 0]
+
+    @property
+    def y(self):
+        return self.xy[:, 1]
+
+    def to_list(self):
+        """Points as a list of [x, y] python floats, cheap to iterate when moving through them"""
+        return self.xy.tolist()
+
+    def _other_xy(self, other):
+        return other.xy if isinstance(other, PointArray) else np.array((other.x, other.y), dtype=float)
+
+    def distance(self, other):
+        """Distance of every point to a Point, or point by point to another PointArray"""
+        delta = self._other_xy(other) - self.xy
+        return np.hypot(delta[:, 0], delta[:, 1])
+
+    def angle(self, center_point):
+        """Angle of every point around center_point in [0, 2 pi), like Point.angle"""
+        return np.arctan2(self.y - center_point.y, self.x - center_point.x) % (2 * math.pi)
+
+    def segment_lengths(self):
+        """Length of each of the len - 1 segments joining consecutive points"""
+        delta = np.diff(self.xy, axis=0)
+        return np.hypot(delta[:, 0], delta[:, 1])
+
+    def add(self, other):
+        """Add a Point to every point, or another PointArray point by point"""
+        return PointArray(self.xy + self._other_xy(other))
+
+    def subtract(self, other):
+        """Subtract a Point from every point, or another PointArray point by point"""
+        return PointArray(self.xy - self._other_xy(other))
+
+    def translate(self, dx, dy):
+        return PointArray(self.xy + (dx, dy))
+
+    def scale(self, factor, center_point=None):
+        """Scale by factor, or by (x factor, y factor), about center_point, the origin by default"""
+        origin = np.zeros(2) if center_point is None else self._other_xy(center_point)
+        return PointArray((self.xy - origin) * factor + origin)
 
+    def rotate(self, angle, center_point=None):
+        """Rotate counter clockwise by angle radians about center_point, the origin by default"""
+        origin = np.zeros(2) if center_point is None else self._other_xy(center_point)
+        cos_angle = math.cos(angle)
+        sin_angle = math.sin(angle)
+        rotation = np.array(((cos_angle, sin_angle), (-sin_angle, cos_angle)))
+        return PointArray((self.xy - origin) @ rotation + origin)
@@ -0,0 +1,58 @@
+# Run the interpreter on the host against a serial port, e.g. a USB serial adapter or a pty for testing,
+# with UARTIO(PySerialAdapter(...)). UARTIO reads the bytes as they arrive with any() and read(n), like a
+# MicroPython UART. pyserial's readline() returns partial lines when it times out, so the adapter's readline()
+# collects bytes until a whole line has arrived.
+# Host only, needs pyserial:  pip install pyserial
+import serial
+
+
+class PySerialAdapter:
+    """UART-like any(), read(n), readline() and write() over a pyserial Serial, readline() only returns whole lines"""
+
+    NEWLINE = b'\n'
+
+    def __init__(self, port, baudrate=115200):
+        """
+        :param port: device name, e.g. '/dev/ttyUSB0' or os.ttyname() of a pty, or an open serial.Serial
+        """
+        if isinstance(port, str):
+            port = serial.Serial(port, baudrate=baudrate, timeout=0)
+        self.serial = port
+        self._buffer = bytearray()
+
+    def _read_waiting(self):
+        waiting = self.serial.in_waiting
+        if waiting:
+            self._buffer += self.serial.read(waiting)
+
+    def any(self):
+        """Number of bytes that can be read without waiting"""
+        self._read_waiting()
+        return len(self._buffer)
+
+    def read(self, n=None):
+        """Up to n of the bytes waiting, all of them without n, or None when there are none"""
+        self._read_waiting()
+        if not self._buffer:
+            return None
+        end = len(self._buffer) if n is None else n
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+    def readline(self):
+        """The next line including its newline, or None when no whole line has arrived"""
+        if self.NEWLINE not in self._buffer:
+            self._read_waiting()
+        if self.NEWLINE not in self._buffer:
+            return None
+        end = self._buffer.index(self.NEWLINE) + 1
+        line = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return line
+
+    def write(self, data):
+        return self.serial.write(data)
+
+    def close(self):
+        self.serial.close()
@@ -1,8 +1,14 @@
 
-from point import Point
-from machine import Pin
+import math
+try:
+    from machine import Pin
+except ImportError:
+    # on the host only the timing of the machine is used, see job_estimator.py
+    Pin = None
 from gcode_machine import GCodeMachine
 from time_compat import sleep_micros
+from motion_planner import new_delay_table, fill_trapezoid, MotionPlanner
+from path_simplifier import StreamingSimplifier
 
 class Motor:
 
@@ -30,32 +36,46 @@ class Motor:
         self.current_step = 0
         self.delay_us = delay_us
         self.sequence = self.full_sequence if mode == 'full' else self.half_sequence
-
+        self.reverse_sequence = self.sequence[::-1]
+        # called after every step, e.g. GCodeMachine.between_steps for real-time commands
+        self.on_step = None
+
+    def phases(self, direction):
+        """Coil sequence making one step in direction"""
+        return self.sequence if direction > 0 else self.reverse_sequence
+
+    def can_step(self, direction):
+        """Check the endstop and max_steps limits, returns False when the motor must not step in direction"""
+        if self.endstop_direction == direction and self.is_endstop_triggered():
+            self.current_step = 0
+            print(f"End stop reached for: {self.name}")
+            return False
+        if self.max_steps and self.current_step >= self.max_steps and direction != self.endstop_direction:
+            print(f"Max steps reached for: {self.name}")
+            return False
+        return True
 
     def move(self, steps, direction = 1):
         count = 0
 
-        while count < steps:
-            if self.endstop_direction == direction and self.is_endstop_triggered():
-                self.current_step = 0
-                print(f"End stop reached for: {self.name}")
-                break
-            if self.max_steps and self.current_step >= self.max_steps and direction != self.endstop_direction:
-                print(f"Max steps reached for: {self.name}")
-                break
-
-
-            for step in self.sequence if direction > 0 else self.sequence[::-1]:
-                try:
-                    self.set_step(step)
-                    self.sleep_delay()
-                except Exception as e:
-                    print(f"Error during sleep: {e}")
-
-            count += 1
-            self.current_step += direction
-
-        self.stop()
+        try:
+            while count < steps:
+                if not self.can_step(direction):
+                    break
+
+                for step in self.phases(direction):
+                    try:
+                        self.set_step(step)
+                        self.sleep_delay()
+                    except Exception as e:
+                        print(f"Error during sleep: {e}")
+
+                count += 1
+                self.current_step += direction
+                if self.on_step is not None:
+                    self.on_step()
+        finally:
+            self.stop()
         return count * direction
 
 
@@ -63,7 +83,7 @@ class Motor:
     def stop(self):
         return
 
-    def sleep_delay(self):
+    def sleep_delay(self, delay_us=None):
         return
 
     def set_step(self, steps):
@@ -99,19 +119,149 @@ class StepperMotor(Motor):
     def is_endstop_triggered(self):
         return not self.endstop.value() if self.endstop else False
 
-    def sleep_delay(self):
-        sleep_micros(self.delay_us)
+    def sleep_delay(self, delay_us=None):
+        sleep_micros(self.delay_us if delay_us is None else delay_us)
+
+def step_runs(major, minor):
+    """
+    Integer DDA of a line of major steps along one axis and minor <= major steps along the other, as run lengths.
+    Yields, for each minor step, the number of ticks stepping only the major axis before the tick stepping both,
+    then the ticks left after the last minor step. Each run is computed directly instead of tick by tick,
+    the same ticks as a Bresenham loop starting from half an error.
+    """
+    ticks = major
+    if minor > 0:
+        error = major // 2
+        for _ in range(minor):
+            # ticks until the error reaches major, the last of them also steps the minor axis
+            run = (major - error + minor - 1) // minor
+            error += run * minor - major
+            ticks -= run
+            yield run - 1
+    yield ticks
+
+
+def _tick(timing_motor, delay_us, motor_a, phases_a, motor_b, phases_b, phase_count):
+    """Run the coil phases of one tick, phases_a or phases_b is None for a motor not stepping in this tick"""
+    for phase in range(phase_count):
+        try:
+            if phases_a is not None and phase < len(phases_a):
+                motor_a.set_step(phases_a[phase])
+            if phases_b is not None and phase < len(phases_b):
+                motor_b.set_step(phases_b[phase])
+            timing_motor.sleep_delay(delay_us)
+        except Exception as e:
+            print(f"Error during sleep: {e}")
+
+
+def move_together(motor_a, steps_a, direction_a, motor_b, steps_b, direction_b, delays=None):
+    """
+    Step two motors in one timing loop, interleaving their steps Bresenham style so a diagonal
+    move is a line rather than a staircase and takes the time of the longer axis instead of the sum.
+    The steps are walked as run length batches from step_runs: runs of the longer axis alone,
+    each followed by one tick stepping both.
+    Each motor keeps the endstop and max_steps checks of Motor.move and stops on its own when one triggers.
+    The on_step hook of motor_a runs after every tick, the motors are stopped if it raises.
+    delays[tick] is the wait after each coil phase of a tick, see motion_planner.fill_trapezoid,
+    by default every phase waits the delay_us of the slower motor.
+    :return: signed number of steps made by motor_a and motor_b
+    """
+    # like Motor.move, a fraction of a step counts as a whole step
+    steps_a = max(0, math.ceil(steps_a))
+    steps_b = max(0, math.ceil(steps_b))
+    if steps_b > steps_a:
+        count_b, count_a = move_together(motor_b, steps_b, direction_b, motor_a, steps_a, direction_a, delays)
+        return count_a, count_b
+
+    # motor_a is the major axis from here on
+    phases_a = motor_a.phases(direction_a)
+    phases_b = motor_b.phases(direction_b)
+    phase_count = max(len(phases_a), len(phases_b))
+    # the slower motor sets the pace of the shared loop
+    timing_motor = motor_a if motor_a.delay_us >= motor_b.delay_us else motor_b
+
+    count_a = count_b = 0
+    moving_a = steps_a > 0
+    moving_b = steps_b > 0
+    remaining_b = steps_b
+    tick = 0
+    delay_us = None
+    on_step = motor_a.on_step
+    try:
+        for run in step_runs(steps_a, steps_b):
+            # the last tick of every run but the final one steps motor_b as well
+            ticks = run + 1 if remaining_b else run
+            for n in range(ticks):
+                if delays is not None:
+                    delay_us = delays[tick]
+                tick += 1
+                moving_a = moving_a and motor_a.can_step(direction_a)
+                step_b = False
+                if n == run:
+                    moving_b = moving_b and motor_b.can_step(direction_b)
+                    step_b = moving_b
+                if not moving_a and not moving_b:
+                    break
+                _tick(timing_motor, delay_us,
+                      motor_a, phases_a if moving_a else None,
+                      motor_b, phases_b if step_b else None, phase_count)
+                if moving_a:
+                    count_a += 1
+                    motor_a.current_step += direction_a
+                if step_b:
+                    count_b += 1
+                    motor_b.current_step += direction_b
+                if on_step is not None:
+                    on_step()
+            if not moving_a and not moving_b:
+                break
+            remaining_b -= 1
+    finally:
+        motor_a.stop()
+        motor_b.stop()
+    return count_a * direction_a, count_b * direction_b
+
 
 class StepperGCodeMachine(GCodeMachine):
 
     dot_size = 2
 
-    def __init__(self, steps_per_mm, step_delay_us):
+    def __init__(self, steps_per_mm, step_delay_us, min_step_delay_us=1000, acceleration=20.0, start_step_delay_us=None,
+                 planner_size=16, simplify_tolerance=0.0):
+        """
+        :param step_delay_us: delay between coil phases at the default feed rate
+        :param min_step_delay_us: shortest delay between coil phases the motors can follow, sets max_rate
+        :param acceleration: acceleration along the path in mm/s^2 for ramping moves up to their rate and back down
+        :param start_step_delay_us: delay between coil phases the motors can start and stop at without a ramp,
+            defaults to step_delay_us
+        :param planner_size: number of moves planned ahead so polylines and arcs don't stop at every vertex
+        :param simplify_tolerance: moves are merged while the path stays within this many mm of the merged move,
+            0 only merges moves continuing in the same direction
+        """
         super().__init__(steps_per_mm, step_delay_us)
-        self.motor_y = StepperMotor("Y", 0, 1, 2, 3, delay_us=1500, mode='half', endstop_pin=15, endstop_direction=1)
-        self.motor_x = StepperMotor("X", 4, 5, 6, 7, delay_us=1500, mode='half', endstop_pin=14, endstop_direction=-1)
-        self.motor_z = StepperMotor("Z", 8, 9, 10, 11, delay_us=1500, mode='half')
+        self._build_motors(step_delay_us)
+        for motor in (self.motor_x, self.motor_y, self.motor_z):
+            motor.on_step = self.between_steps
         self.is_pendown = False
+        # True while _execute_segment runs the motors, status reports say Run
+        self.stepping = False
+        self.min_step_delay_us = min_step_delay_us
+        self.start_step_delay_us = step_delay_us if start_step_delay_us is None else start_step_delay_us
+        self.acceleration = acceleration
+        # per tick delays of the current move, reused so moves don't allocate
+        self._delays = new_delay_table()
+        self.planner = MotionPlanner(self._execute_segment, planner_size, acceleration)
+        self.block_buffer_size = planner_size
+        self.max_rate = self.rate_for_delay(min_step_delay_us)
+        self.rapid_rate = self.max_rate
+        self.feed_rate = self.clamp_rate(self.rate_for_delay(step_delay_us))
+        self.rate = self.feed_rate
+        # position in whole motor steps, moves are rounded to it
+        self.step_x = 0
+        self.step_y = 0
+        # merges the step positions of consecutive moves before they reach the planner
+        self.simplifier = StreamingSimplifier(self._queue_move, simplify_tolerance * steps_per_mm)
+        self._simplified_rate = self.rate
         self.home()
         # may need to adjust as 0
         self.rounding_precision = 0
@@ -119,6 +269,12 @@ class StepperGCodeMachine(GCodeMachine):
 
 
 
+    def _build_motors(self, step_delay_us):
+        """The X and Y motors and the Z motor moving the pen, on the Pico GPIO pins"""
+        self.motor_y = StepperMotor("Y", 0, 1, 2, 3, delay_us=step_delay_us, mode='half', endstop_pin=15, endstop_direction=1)
+        self.motor_x = StepperMotor("X", 4, 5, 6, 7, delay_us=step_delay_us, mode='half', endstop_pin=14, endstop_direction=-1)
+        self.motor_z = StepperMotor("Z", 8, 9, 10, 11, delay_us=1500, mode='half')
+
     def dot(self, point):
         """draw a dot at point"""
         self.penup()
@@ -126,43 +282,145 @@ class StepperGCodeMachine(GCodeMachine):
         self.pendown()
         self.penup()
 
+    def line(self, end_point):
+        """Straight line to end_point, the motors interpolate it in step space so it is a single move"""
+        self.move(end_point.x, end_point.y)
+
     def move(self, x = None, y = None):
-        current_point = Point(self.absolute_x, self.absolute_y)
         if self.relative_mode:
-            relative_point = Point(0 if x is None else x, 0 if y is None else y)
-            next_point =  relative_point.add(current_point)
+            next_x = self.absolute_x + (0 if x is None else x)
+            next_y = self.absolute_y + (0 if y is None else y)
         else:
-            next_point = Point(self.absolute_x if x is None else x, self.absolute_y if y is None else y)
-            relative_point = next_point.subtract(current_point)
-
-        x_steps = abs(relative_point.x)
-        x_direction = self.motor_x.endstop_direction if  relative_point.x < 0 else self.motor_x.endstop_direction * -1
-        y_steps = abs(relative_point.y)
-        y_direction = self.motor_y.endstop_direction if relative_point.y < 0 else self.motor_y.endstop_direction * -1
-        self.motor_x.move(x_steps * self.steps_per_mm , x_direction)
-        self.motor_y.move(y_steps * self.steps_per_mm, y_direction)
-
-        self.absolute_x = next_point.x
-        self.absolute_y = next_point.y
-
-
+            next_x = self.absolute_x if x is None else x
+            next_y = self.absolute_y if y is None else y
+
+        if self.rate != self._simplified_rate:
+            # moves are only merged at the same rate
+            self.simplifier.flush()
+            self._simplified_rate = self.rate
+        # target in whole motor steps, so rounding doesn't build up over many short moves
+        self.simplifier.add(round(next_x * self.steps_per_mm), round(next_y * self.steps_per_mm))
+        self.absolute_x = next_x
+        self.absolute_y = next_y
+
+    def _queue_move(self, step_x, step_y):
+        """Queue a merged move to the step position step_x, step_y in the planner, called by the simplifier"""
+        # the motors run it once the moves that follow are known or on flush()
+        self.planner.push((step_x - self.step_x) / self.steps_per_mm, (step_y - self.step_y) / self.steps_per_mm,
+                          self._simplified_rate / 60, self.junction_deviation)
+        self.step_x = step_x
+        self.step_y = step_y
+
+    def _execute_segment(self, dx, dy, nominal_speed, entry_speed, exit_speed):
+        """Run one planned move of dx, dy mm on the motors, called by the planner"""
+        x_steps = round(dx * self.steps_per_mm)
+        y_steps = round(dy * self.steps_per_mm)
+        x_direction = self.motor_x.endstop_direction if x_steps < 0 else self.motor_x.endstop_direction * -1
+        y_direction = self.motor_y.endstop_direction if y_steps < 0 else self.motor_y.endstop_direction * -1
+        x_steps = abs(x_steps)
+        y_steps = abs(y_steps)
+        self.stepping = True
+        try:
+            move_together(self.motor_x, x_steps, x_direction, self.motor_y, y_steps, y_direction,
+                          self.move_delays(x_steps / self.steps_per_mm, y_steps / self.steps_per_mm,
+                                           nominal_speed * 60, entry_speed, exit_speed))
+        finally:
+            self.stepping = False
+
+    def is_busy(self):
+        return self.stepping
+
+    def machine_position(self):
+        """Where the motor steps have got to, the planner may hold moves that haven't run yet"""
+        # moving towards the endstop counts the motor steps down, see _execute_segment
+        return (self.motor_x.current_step * -self.motor_x.endstop_direction / self.steps_per_mm,
+                self.motor_y.current_step * -self.motor_y.endstop_direction / self.steps_per_mm)
+
+    def flush(self):
+        self.simplifier.flush()
+        self.planner.flush()
+
+    def abort(self):
+        """Drop the moves still queued after a soft reset, the position becomes where the motors stopped"""
+        self.planner.clear()
+        # moving towards the endstop counts the motor steps down, see _execute_segment
+        self.step_x = self.motor_x.current_step * -self.motor_x.endstop_direction
+        self.step_y = self.motor_y.current_step * -self.motor_y.endstop_direction
+        self.absolute_x = self.step_x / self.steps_per_mm
+        self.absolute_y = self.step_y / self.steps_per_mm
+        self.simplifier.reset(self.step_x, self.step_y)
+        super().abort()
+
+    def rate_for_delay(self, delay_us):
+        """Axis rate in mm/min when every coil phase takes delay_us"""
+        return 60_000_000 / (delay_us * len(self.motor_x.sequence) * self.steps_per_mm)
+
+    def ticks(self, x_distance, y_distance):
+        """Ticks of the step loop for a move of x_distance, y_distance mm, moves are whole steps"""
+        return round(max(x_distance, y_distance) * self.steps_per_mm)
+
+    def phase_delay_us(self, x_distance, y_distance, rate=None):
+        """Delay between coil phases so a move of x_distance, y_distance mm runs at rate (default self.rate) along its path"""
+        rate = self.rate if rate is None else rate
+        ticks = self.ticks(x_distance, y_distance)
+        if ticks <= 0 or rate <= 0:
+            return self.step_delay_us
+        distance = math.sqrt(x_distance * x_distance + y_distance * y_distance)
+        delay_us = distance * 60_000_000 / (rate * ticks * len(self.motor_x.sequence))
+        return max(int(delay_us), self.min_step_delay_us)
+
+    def move_profile(self, x_distance, y_distance, rate=None, entry_speed=0.0, exit_speed=0.0):
+        """
+        Speed profile of a move of x_distance, y_distance mm at rate mm/min, ramping from entry_speed and down to
+        exit_speed in mm/s, never slower than the start rate.
+        :return: ticks, entry rate, cruise rate and exit rate in ticks/s and the acceleration in ticks/s^2,
+            see motion_planner.fill_trapezoid
+        """
+        ticks = self.ticks(x_distance, y_distance)
+        if ticks <= 0:
+            return 0, 0.0, 0.0, 0.0, 0.0
+        phases = len(self.motor_x.sequence)
+        cruise_rate = 1_000_000 / (self.phase_delay_us(x_distance, y_distance, rate) * phases)
+        start_rate = 1_000_000 / (self.start_step_delay_us * phases)
+        ticks_per_mm = ticks / math.sqrt(x_distance * x_distance + y_distance * y_distance)
+        return (ticks, max(start_rate, entry_speed * ticks_per_mm), cruise_rate,
+                max(start_rate, exit_speed * ticks_per_mm), self.acceleration * ticks_per_mm)
+
+    def move_delays(self, x_distance, y_distance, rate=None, entry_speed=0.0, exit_speed=0.0):
+        """Per tick coil phase delays for a move, see move_profile"""
+        ticks, entry_rate, cruise_rate, exit_rate, acceleration = self.move_profile(
+            x_distance, y_distance, rate, entry_speed, exit_speed)
+        if ticks <= 0:
+            return self._delays
+        return fill_trapezoid(self._delays, ticks, entry_rate, cruise_rate, exit_rate, acceleration,
+                              len(self.motor_x.sequence))
+
+    def end(self):
+        self.flush()
+        super().end()
 
     def home(self):
         self.penup()
+        self.flush()
         self.motor_x.home()
         self.motor_y.home()
         self.absolute_x = 0
         self.absolute_y = 0
+        self.step_x = 0
+        self.step_y = 0
+        self.simplifier.reset()
 
 
     def penup(self):
         if self.is_pendown:
+            self.flush()
             print("\tPen up")
             self.is_pendown = False
             self.motor_z.move(40, -1)
 
     def pendown(self):
         if not self.is_pendown:
+            self.flush()
             print("\tPen down")
             self.is_pendown = True
             self.motor_z.move(40, 1)
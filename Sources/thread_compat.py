@@ -0,0 +1,26 @@
+# python
+# Compatibility wrapper: threads on CPython, the second core through _thread on MicroPython.
+# On the RP2040/RP2350 _thread.start_new_thread runs the function on core 1, only one thread can be started.
+import _thread
+
+try:
+    import threading
+except ImportError:
+    threading = None  # MicroPython
+
+
+def allocate_lock():
+    """Return a new lock with acquire(blocking=True) and release(), usable from both threads or cores."""
+    return _thread.allocate_lock()
+
+
+def start_thread(function, *args):
+    """Run function(*args) in a new thread, on the second core on the Pico. Returns the Thread on CPython."""
+    if threading is not None:
+        # a daemon thread doesn't keep the host process alive when the main thread ends
+        thread = threading.Thread(target=function, args=args)
+        thread.daemon = True
+        thread.start()
+        return thread
+    _thread.start_new_thread(function, args)
+    return None
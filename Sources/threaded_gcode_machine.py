@@ -0,0 +1,255 @@
+# Run the motors of a GCodeMachine in a second thread, on the second core of the RP2040/RP2350,
+# so the interpreter can keep reading UART or answering HTTP while a move is stepping.
+# ThreadedGCodeMachine is what the interpreter drives: it works out lines and arcs and puts each move
+# and pen change into a MotionQueue, a fixed size, lock protected ring buffer. The motion thread takes them out
+# in order and runs them on the real machine. When the queue is full the interpreter waits, which holds back
+# the input, so the host can't run ahead of the plotter by more than the queue.
+# Real-time commands are read by the interpreter thread while it waits on the queue, a feed hold or soft reset
+# is passed on to the machine, which acts on it between steps in the motion thread.
+# Works on both CPython (threading) and MicroPython (_thread).
+from gcode_machine import GCodeMachine, SoftReset
+from motion_queue import MotionQueue, PEN_UP, PEN_DOWN
+from thread_compat import start_thread
+from time_compat import sleep_micros
+
+# pen values of the queued segments that aren't moves
+HOME = -1
+FLUSH = -2
+PEN_MOTOR = -3
+END = -4
+
+
+class _QueuedMotor:
+    """
+    Stands in for the pen motor of the machine, its moves are queued with the segments.
+    Like the moves of the machine they are queued as whole steps, so fractions of a step don't get lost.
+    """
+
+    def __init__(self, threaded_machine):
+        self.threaded_machine = threaded_machine
+        # position asked for and the whole step position queued, in steps
+        self.position = 0.0
+        self.step = 0
+
+    def move(self, steps, direction=1):
+        self.position += steps * direction
+        step = round(self.position)
+        if step != self.step:
+            self.threaded_machine._push(abs(step - self.step), 1 if step > self.step else -1, PEN_MOTOR)
+            self.step = step
+        return steps * direction
+
+
+class ThreadedGCodeMachine(GCodeMachine):
+    """
+    GCodeMachine that runs machine in a motion thread, fed through a MotionQueue of size segments.
+    Moves are queued as whole motor steps, so rounding doesn't build up, with the pen state and rate of each move.
+    Positions and the pen state are those of the moves queued so far, the motors may still be behind,
+    machine_position() is where they are.
+    Commands machine registers with the interpreter are not forwarded, they would run in the wrong thread.
+    """
+
+    def __init__(self, machine, size=32, start=True):
+        self.machine = machine
+        super().__init__(machine.steps_per_mm, machine.step_delay_us, machine.rounding_precision, machine.line_increment)
+        self.feed_rate = machine.feed_rate
+        self.rapid_rate = machine.rapid_rate
+        self.max_rate = machine.max_rate
+        self.rate = machine.rate
+        self.junction_deviation = machine.junction_deviation
+        self.arc_tolerance = machine.arc_tolerance
+        self.is_pendown = machine.is_pendown
+        self.absolute_x = machine.absolute_x
+        self.absolute_y = machine.absolute_y
+        # step position of the last queued move
+        self.step_x = round(machine.absolute_x * self.steps_per_mm)
+        self.step_y = round(machine.absolute_y * self.steps_per_mm)
+        self.queue = MotionQueue(size)
+        self.block_buffer_size = size + machine.block_buffer_size
+        self.motor_z = _QueuedMotor(self)
+        # exception that stopped the motion thread, raised again in the interpreter thread
+        self.error = None
+        self.running = False
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the motion thread, on the second core on the Pico"""
+        self.running = True
+        start_thread(self._run, self.step_x, self.step_y)
+
+    def _run(self, step_x, step_y):
+        machine = self.machine
+        queue = self.queue
+        steps_per_mm = self.steps_per_mm
+        # queued moves are absolute
+        machine.relative_mode = False
+        try:
+            while True:
+                # the segment stays queued while it runs, so is_busy() covers it
+                index = queue.peek()
+                if index < 0:
+                    if machine.reset_requested:
+                        # a soft reset that came in while the motors were idle
+                        machine.abort()
+                    sleep_micros(queue.wait_us)
+                    continue
+                dx_steps = queue.dx_steps[index]
+                dy_steps = queue.dy_steps[index]
+                pen = queue.pen[index]
+                try:
+                    if pen == PEN_UP or pen == PEN_DOWN:
+                        if pen == PEN_DOWN:
+                            machine.pendown()
+                        else:
+                            machine.penup()
+                        if dx_steps or dy_steps:
+                            step_x += dx_steps
+                            step_y += dy_steps
+                            machine.rate = queue.rate[index]
+                            machine.junction_deviation = self.junction_deviation
+                            machine.move(step_x / steps_per_mm, step_y / steps_per_mm)
+                    elif pen == HOME:
+                        machine.home()
+                        step_x = step_y = 0
+                    elif pen == FLUSH:
+                        machine.flush()
+                    elif pen == PEN_MOTOR:
+                        machine.motor_z.move(dx_steps, dy_steps)
+                    elif pen == END:
+                        machine.end()
+                        queue.drop()
+                        break
+                except SoftReset:
+                    # the queue was cleared by soft_reset(), carry on from where the motors stopped
+                    machine.abort()
+                    step_x = round(machine.absolute_x * steps_per_mm)
+                    step_y = round(machine.absolute_y * steps_per_mm)
+                    continue
+                queue.drop()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.running = False
+
+    def _push(self, dx_steps, dy_steps, pen, rate=0.0):
+        """Queue a segment, waiting while the queue is full"""
+        # checked before every try, a soft reset read while waiting clears the queue, nothing may follow it
+        self._check()
+        while not self.queue.push(dx_steps, dy_steps, pen, rate):
+            self._wait()
+            self._check()
+
+    def _check(self):
+        if not self.running:
+            raise RuntimeError(f"Motion thread stopped: {self.error}")
+        if self.reset_requested:
+            # whatever the interpreter was queueing belongs to the job that was reset
+            raise SoftReset()
+
+    def _wait(self):
+        # the interpreter thread is stuck here while the queue is full, keep answering real-time commands
+        if self.poll_realtime is not None:
+            self.poll_realtime()
+        sleep_micros(self.queue.wait_us)
+
+    def is_busy(self):
+        """True while queued segments haven't all run"""
+        return not self.queue.is_empty()
+
+    def machine_position(self):
+        """The position the motion thread has run the machine to, not that of the moves queued"""
+        return self.machine.machine_position()
+
+    def wait_idle(self):
+        """Wait until every queued segment has run"""
+        while not self.queue.is_empty():
+            self._check()
+            self._wait()
+
+    def feed_hold(self):
+        super().feed_hold()
+        self.machine.feed_hold()
+
+    def resume(self):
+        super().resume()
+        self.machine.resume()
+
+    def soft_reset(self):
+        super().soft_reset()
+        self.queue.clear()
+        self.machine.soft_reset()
+
+    def abort(self):
+        """Wait for the motion thread to stop the motors, then carry on from where they are"""
+        self.queue.clear()
+        while self.machine.reset_requested and self.running:
+            sleep_micros(self.queue.wait_us)
+        machine = self.machine
+        self.absolute_x = machine.absolute_x
+        self.absolute_y = machine.absolute_y
+        self.step_x = round(machine.absolute_x * self.steps_per_mm)
+        self.step_y = round(machine.absolute_y * self.steps_per_mm)
+        self.is_pendown = machine.is_pendown
+        super().abort()
+
+    def move(self, x = None, y = None):
+        if self.relative_mode:
+            next_x = self.absolute_x + (0 if x is None else x)
+            next_y = self.absolute_y + (0 if y is None else y)
+        else:
+            next_x = self.absolute_x if x is None else x
+            next_y = self.absolute_y if y is None else y
+        step_x = round(next_x * self.steps_per_mm)
+        step_y = round(next_y * self.steps_per_mm)
+        # moves within the current step don't move the motors, don't spend a slot on them
+        if step_x != self.step_x or step_y != self.step_y:
+            self._push(step_x - self.step_x, step_y - self.step_y,
+                       PEN_DOWN if self.is_pendown else PEN_UP, self.rate)
+            self.step_x = step_x
+            self.step_y = step_y
+        self.absolute_x = next_x
+        self.absolute_y = next_y
+
+    def dot(self, point):
+        """draw a dot at point"""
+        self.penup()
+        self.move(point.x, point.y)
+        self.pendown()
+        self.penup()
+
+    def home(self):
+        self.penup()
+        self._push(0, 0, HOME)
+        self.absolute_x = 0
+        self.absolute_y = 0
+        self.step_x = 0
+        self.step_y = 0
+
+    def penup(self):
+        if self.is_pendown:
+            self.is_pendown = False
+            self._push(0, 0, PEN_UP)
+
+    def pendown(self):
+        if not self.is_pendown:
+            self.is_pendown = True
+            self._push(0, 0, PEN_DOWN)
+
+    def flush(self):
+        self._push(0, 0, FLUSH)
+
+    def end(self):
+        """Run what is queued, end the machine and stop the motion thread"""
+        if not self.running:
+            return
+        self.penup()
+        self._push(0, 0, END)
+        while self.running:
+            if self.reset_requested:
+                # a soft reset dropped the END with the rest of the queue
+                self.abort()
+                self._push(0, 0, END)
+            self._wait()
+        if self.error is not None:
+            raise RuntimeError(f"Motion thread stopped: {self.error}")
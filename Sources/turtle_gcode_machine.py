@@ -59,9 +59,8 @@ class TurtleGCodeMachine(GCodeMachine):
         self.t.dot(TurtleGCodeMachine.dot_size)
 
     def move(self, x = None, y = None):
-        current_point = Point(self.absolute_x, self.absolute_y)
         if self.relative_mode:
-            next_point =  Point(0 if x is None else x, 0 if y is None else y).add(current_point)
+            next_point = Point(0 if x is None else x, 0 if y is None else y).iadd(self.current_point())
         else:
             next_point = Point(self.absolute_x if x is None else x, self.absolute_y if y is None else y)
 
@@ -0,0 +1,67 @@
+# Benchmark of arc flattening, moves per arc and arcs/second before and after chordal tolerance segmentation.
+# Run from the project root:
+#   python Tests/bench_arc_segmentation.py [arc_count]
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from null_gcode_machine import NullGCodeMachine
+from point import Point
+
+
+def legacy_circle(machine, end_point, radius, is_clockwise=True):
+    """Previous floor(arc_length * steps_per_mm) sampler with two trig passes, kept for comparison"""
+    start_point = machine.current_point()
+    center_point = start_point.circle_center(end_point, radius, is_clockwise)
+    start_angle = start_point.angle(center_point)
+    delta = end_point.angle(center_point) - start_angle
+    delta = (delta + math.pi) % (2.0 * math.pi) - math.pi
+    if is_clockwise:
+        sweep = delta - (2.0 * math.pi) if delta > 0 else delta
+    else:
+        sweep = delta + (2.0 * math.pi) if delta < 0 else delta
+    steps = max(1, int(math.floor(abs(sweep) * abs(radius) * machine.steps_per_mm)))
+    emitted = []
+    for _ in range(2):
+        emitted = []
+        last = None
+        for n in range(steps):
+            theta = start_angle + n / float(steps) * sweep
+            sample = (round(center_point.x + abs(radius) * math.cos(theta), machine.rounding_precision),
+                      round(center_point.y + abs(radius) * math.sin(theta), machine.rounding_precision))
+            if sample != last:
+                emitted.append(sample)
+                last = sample
+    for x, y in emitted:
+        machine.move(x, y)
+    machine.move(end_point.x, end_point.y)
+
+
+def bench(name, draw, arc_count):
+    machine = NullGCodeMachine(steps_per_mm=11)
+    start = time.perf_counter()
+    for _ in range(arc_count):
+        machine.absolute_x, machine.absolute_y = 70, 30
+        draw(machine)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {machine.move_count // arc_count:>6} moves/arc {arc_count / elapsed:>10,.0f} arcs/s  ({elapsed:.3f}s)")
+    return elapsed
+
+
+def main(arc_count=200):
+    # before computes about 2000 samples per circle, rounding them to whole mm collapses them to fewer moves
+    # that are up to half a mm off the circle, after keeps every chord within the default $12 = 0.01 mm
+    print(f"full circle of radius 30 mm at 11 steps/mm, {arc_count} times")
+    before = bench("before", lambda m: legacy_circle(m, Point(70.1, 30), 30), arc_count)
+    after = bench("after", lambda m: m.circle(Point(70.1, 30), 30), arc_count)
+    print(f"speedup  {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,63 @@
+# Benchmark of G-code line tokenizing, lines/second before and after the single pass scanner.
+# Run from the project root:
+#   python Tests/bench_gcode_parser.py [line_count]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_parser import parse_line
+
+
+def legacy_tokenize(command):
+    """Previous split_and_separate_with_spaces + split + startswith parsing, kept for comparison"""
+    replacements = {"g": " g", "x": " x", "y": " y", "z": " z", "r": " r", "f": " f", "=": "= "}
+    result = (command or "").split(';', 1)[0].rstrip().lower()
+    if len(command) > 2:
+        for key, value in replacements.items():
+            result = result.replace(key, value)
+    if not result:
+        return None, None
+    sub_commands = result.split()
+    x = y = z = r = None
+    for sub_command in sub_commands[1:]:
+        if sub_command.startswith("x"):
+            x = float(sub_command[1:])
+        elif sub_command.startswith("y"):
+            y = float(sub_command[1:])
+        elif sub_command.startswith("z"):
+            z = float(sub_command[1:])
+        elif sub_command.startswith("r"):
+            r = float(sub_command[1:])
+    return sub_commands[0], {'x': x, 'y': y, 'z': z, 'r': r}
+
+
+def load_lines(line_count):
+    with open(os.path.join(SOURCES, 'absolute.gcode'), 'r') as f:
+        source = [ln.rstrip('\n') for ln in f.readlines()]
+    return (source * (line_count // len(source) + 1))[:line_count]
+
+
+def bench(name, tokenize, lines):
+    start = time.perf_counter()
+    for line in lines:
+        tokenize(line)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {len(lines) / elapsed:>12,.0f} lines/s  ({elapsed:.3f}s)")
+    return elapsed
+
+
+def main(line_count=100_000):
+    lines = load_lines(line_count)
+    print(f"absolute.gcode scaled to {len(lines):,} lines")
+    before = bench("before", legacy_tokenize, lines)
+    after = bench("after", parse_line, lines)
+    print(f"speedup      {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,46 @@
+# Benchmark of GcodeInterpreter.interpret() lines/second, reading a generated file through FileIO
+# into a machine that does nothing, so only the input loop, tokenizing and dispatch are measured.
+# Run from the project root:
+#   python Tests/bench_interpreter_throughput.py [line_count]
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from null_gcode_machine import NullGCodeMachine
+from gcode_interpreter import GcodeInterpreter, FileIO
+from logging_compat import logging
+
+
+def write_program(path, line_count):
+    with open(path, 'w') as f:
+        f.write("G21\nG90\n")
+        for n in range(line_count - 2):
+            f.write(f"G0{n % 2} X{n % 100}.5 Y{n % 50}.25\n")
+
+
+def bench(name, path, use_polling, line_count):
+    interpreter = GcodeInterpreter(NullGCodeMachine(line_increment=0), FileIO(path, write_to_stdout=False), use_polling=use_polling)
+    start = time.perf_counter()
+    interpreter.interpret()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {line_count / elapsed:>12,.0f} lines/s  ({elapsed:.3f}s)")
+
+
+def main(line_count=50_000):
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'program.gcode')
+        write_program(path, line_count)
+        print(f"{line_count:,} lines, the fixed 10 ms sleep per line capped this at 100 lines/s")
+        bench("blocking", path, False, line_count)
+        bench("polling", path, True, line_count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,51 @@
+# Benchmark of job_estimator.estimate_lines() lines/second on generated strokes and arcs,
+# the estimate has to keep up with files of a million lines.
+# Run from the project root:
+#   python Tests/bench_job_estimator.py [line_count]
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from job_estimator import estimate_lines
+from logging_compat import logging
+
+
+def program(line_count, arcs, seed=1):
+    """Random short strokes and travels around the middle of the bed, with a half circle every fourth line if arcs"""
+    random.seed(seed)
+    lines = ["G21", "G90"]
+    x = y = 50.0
+    for n in range(line_count - 2):
+        if arcs and n % 4 == 3:
+            lines.append(f"G2 X{x + 5:.2f} Y{y:.2f} R2.5")
+            x += 5
+        else:
+            x = min(max(x + random.uniform(-3, 3), 0), 100)
+            y = min(max(y + random.uniform(-3, 3), 0), 100)
+            lines.append(f"G{1 if n % 7 else 0} X{x:.2f} Y{y:.2f} F{300 + n % 3 * 100}")
+    return lines
+
+
+def bench(name, lines):
+    start = time.perf_counter()
+    estimator = estimate_lines(lines)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {len(lines) / elapsed:>10,.0f} lines/s {elapsed * 1e6 / len(lines):>7.1f} us/line  "
+          f"estimate {estimator.total_seconds():,.0f}s")
+
+
+def main(line_count=50_000):
+    logging.disable(logging.CRITICAL)
+    print(f"{line_count:,} lines")
+    bench("strokes", program(line_count, arcs=False))
+    bench("arcs", program(line_count, arcs=True))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
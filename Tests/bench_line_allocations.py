@@ -0,0 +1,76 @@
+# Benchmark of drawing straight lines on the stepper machine, Point allocations and moves per mm drawn
+# before and after the integer step space line. Run from the project root:
+#   python Tests/bench_line_allocations.py [line_count]
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import stepper_gcode_machine
+from stepper_gcode_machine import StepperGCodeMachine
+from point import Point
+
+
+def legacy_line(machine, end_point):
+    """Previous line(): a Point per bresenham_line sample, subtracted from the current Point for every move"""
+    start_point = machine.current_point()
+    for point in start_point.bresenham_line(end_point, machine.line_increment):
+        machine.relative_mode = True
+        next_point = point.subtract(machine.current_point())
+        machine.move(next_point.x, next_point.y)
+        machine.relative_mode = False
+
+
+def bench(name, draw, line_count):
+    machine = StepperGCodeMachine(11, 1500)
+    machine.pendown()
+    ends = [Point(40, 30) if n % 2 == 0 else Point(0, 0) for n in range(line_count)]
+    distance = 50 * line_count
+
+    # count the Points made and the moves queued while drawing
+    counts = {'points': 0, 'moves': 0}
+    original_init = Point.__init__
+    original_push = machine.planner.push
+
+    def counting_init(point, *args):
+        counts['points'] += 1
+        original_init(point, *args)
+
+    def counting_push(*args):
+        counts['moves'] += 1
+        original_push(*args)
+
+    Point.__init__ = counting_init
+    machine.planner.push = counting_push
+    # the peak includes the delay table the motors reuse, which grows to the longest move
+    tracemalloc.start()
+    start = time.perf_counter()
+    for end_point in ends:
+        draw(machine, end_point)
+        machine.flush()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    Point.__init__ = original_init
+    machine.planner.push = original_push
+
+    print(f"{name:<8} {counts['moves'] / distance:>6.2f} moves/mm {counts['points'] / distance:>6.2f} Points/mm "
+          f"{peak:>8,} bytes peak {distance / elapsed:>8,.0f} mm/s  ({elapsed:.3f}s)")
+    return elapsed
+
+
+def main(line_count=20):
+    stepper_gcode_machine.sleep_micros = lambda us: None
+    print(f"{line_count} diagonal lines of 50 mm at 11 steps/mm, motors not sleeping")
+    before = bench("before", legacy_line, line_count)
+    after = bench("after", StepperGCodeMachine.line, line_count)
+    print(f"speedup  {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
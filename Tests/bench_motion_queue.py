@@ -0,0 +1,71 @@
+# Benchmark of MotionQueue push/pop rates, against a list used as a queue of tuples and queue.Queue,
+# in one thread and between a producer and a consumer thread.
+# Run from the project root:
+#   python Tests/bench_motion_queue.py [segment_count]
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from motion_queue import MotionQueue
+
+
+def report(name, count, elapsed):
+    print(f"{name:<28} {count / elapsed:>12,.0f} segments/s  ({elapsed:.3f}s)")
+
+
+def bench_list(count):
+    segments = []
+    start = time.perf_counter()
+    for n in range(count):
+        segments.append((n, -n, 1, 500.0))
+        if len(segments) == 64:
+            while segments:
+                segments.pop(0)
+    report("list, one thread", count, time.perf_counter() - start)
+
+
+def bench_motion_queue(count):
+    motion_queue = MotionQueue(64)
+    start = time.perf_counter()
+    for n in range(count):
+        if not motion_queue.push(n, -n, 1, 500.0):
+            while motion_queue.peek() >= 0:
+                motion_queue.drop()
+            motion_queue.push(n, -n, 1, 500.0)
+    report("MotionQueue, one thread", count, time.perf_counter() - start)
+
+
+def bench_threads(name, count, push, pop):
+    consumer = threading.Thread(target=lambda: [pop() for _ in range(count)])
+    start = time.perf_counter()
+    consumer.start()
+    for n in range(count):
+        push(n)
+    consumer.join()
+    report(name, count, time.perf_counter() - start)
+
+
+def main(count=200_000):
+    print(f"{count:,} segments through a 64 segment queue, the list and queue.Queue allocate a tuple per segment")
+    bench_list(count)
+    bench_motion_queue(count)
+    reference = queue.Queue(64)
+    bench_threads("queue.Queue, two threads", count, lambda n: reference.put((n, -n, 1, 500.0)), reference.get)
+    motion_queue = MotionQueue(64, wait_us=20)
+
+    def pop():
+        motion_queue.peek_wait()
+        motion_queue.drop()
+
+    bench_threads("MotionQueue, two threads", count, lambda n: motion_queue.push_wait(n, -n, 1, 500.0), pop)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
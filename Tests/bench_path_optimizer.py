@@ -0,0 +1,45 @@
+# Benchmark of pen up travel optimization on random short strokes, travel and time saved and optimizer run time.
+# Run from the project root:
+#   python Tests/bench_path_optimizer.py [stroke_count]
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_compiler import compile_program
+from path_optimizer import optimize_program, report
+
+
+def random_strokes(stroke_count, size=300, seed=1):
+    rng = random.Random(seed)
+    lines = ["G90"]
+    for _ in range(stroke_count):
+        x, y = rng.uniform(0, size), rng.uniform(0, size)
+        lines.append(f"G0 X{x:.3f} Y{y:.3f}")
+        for _ in range(rng.randint(1, 4)):
+            x += rng.uniform(-3, 3)
+            y += rng.uniform(-3, 3)
+            lines.append(f"G1 X{x:.3f} Y{y:.3f}")
+    lines.append("G0 X0 Y0")
+    return lines
+
+
+def main(stroke_count=20_000):
+    lines = random_strokes(stroke_count)
+    start = time.perf_counter()
+    program = compile_program(lines)
+    compiled = time.perf_counter()
+    optimized = optimize_program(program)
+    finished = time.perf_counter()
+    print(f"{stroke_count:,} random strokes on a 300 mm page")
+    print(report(program, optimized))
+    print(f"compile {compiled - start:.2f}s, optimize {finished - compiled:.2f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,49 @@
+# Benchmark of polyline simplification on arc heavy programs, segments removed and simplification rate.
+# Run from the project root:
+#   python Tests/bench_path_simplifier.py [arc_count]
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_compiler import compile_program
+from path_simplifier import simplify_program
+
+
+def arc_lines(arc_count, seed=1):
+    """Random circles and half circles between 1 and 40 mm radius, plus the shapes of absolute.gcode"""
+    rng = random.Random(seed)
+    with open(os.path.join(SOURCES, 'absolute.gcode')) as f:
+        lines = [line.strip() for line in f]
+    for _ in range(arc_count):
+        radius = round(rng.uniform(1, 40), 3)
+        x, y = round(rng.uniform(0, 200), 3), round(rng.uniform(0, 200), 3)
+        lines.append(f"G0 X{x:.3f} Y{y:.3f}")
+        end_x = x + 2 * radius - 0.001 if rng.random() < 0.5 else x + 0.1
+        lines.append(f"G{rng.choice((2, 3))} X{end_x:.3f} Y{y:.3f} R{radius:.3f}")
+    return lines
+
+
+def segments(program):
+    return sum(max(0, len(polyline) // 2 - 1) for polyline in program.polylines)
+
+
+def main(arc_count=500, steps_per_mm=11):
+    program = compile_program(arc_lines(arc_count), steps_per_mm=steps_per_mm)
+    before = segments(program)
+    start = time.perf_counter()
+    simplify_program(program, steps_per_mm=steps_per_mm)
+    elapsed = time.perf_counter() - start
+    after = segments(program)
+    print(f"{arc_count} random arcs, $12 arc tolerance 0.002 mm, simplified to one step ({1 / steps_per_mm:.3f} mm)")
+    print(f"segments {before:,} -> {after:,}, {100 * (before - after) / before:.1f}% removed "
+          f"in {elapsed:.2f}s ({before / elapsed:,.0f} segments/s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,101 @@
+# Benchmark of Point, memory per instance and operations/second before and after __slots__ and in place arithmetic.
+# Run from the project root, with CPython or with MicroPython where gc.mem_alloc() stands in for tracemalloc:
+#   python Tests/bench_point.py [point_count]
+import gc
+import os
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from point import Point
+
+
+class LegacyPoint:
+    """Previous Point with an instance __dict__ and the varargs constructor, kept for comparison"""
+    def __init__(self, *args):
+        self.x = 0
+        self.y = 0
+        if len(args) == 2 and not isinstance(args[0], str) and not isinstance(args[1], str):
+            self.x = args[0]
+            self.y = args[1]
+        else:
+            params = args[0] if isinstance(args[0], list) and len(args) == 1 else args
+            for arg in params:
+                arg = arg.lower()
+                if arg.startswith("x"):
+                    self.x = int(arg[1:])
+                elif arg.startswith("y"):
+                    self.y = int(arg[1:])
+
+    def add(self, other_point):
+        return LegacyPoint(self.x + other_point.x, self.y + other_point.y)
+
+
+def clock():
+    return time.perf_counter() if hasattr(time, 'perf_counter') else time.ticks_us() / 1_000_000
+
+
+def bytes_per_point(cls, point_count):
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        points = [cls(n, n) for n in range(point_count)]
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    else:
+        before = gc.mem_alloc()
+        points = [cls(n, n) for n in range(point_count)]
+        used = gc.mem_alloc() - before
+    # leave out the list holding the points
+    used -= sys.getsizeof(points) if hasattr(sys, 'getsizeof') else 4 * point_count
+    return used / len(points)
+
+
+def ops_per_second(operation, point_count):
+    start = clock()
+    operation(point_count)
+    return point_count / (clock() - start)
+
+
+def construct(cls):
+    def operation(point_count):
+        for n in range(point_count):
+            cls(n, n)
+    return operation
+
+
+def legacy_walk(point_count):
+    position = LegacyPoint(0, 0)
+    step = LegacyPoint(1, 1)
+    for _ in range(point_count):
+        position = position.add(step)
+
+
+def in_place_walk(point_count):
+    position = Point(0, 0)
+    step = Point(1, 1)
+    for _ in range(point_count):
+        position.iadd(step)
+
+
+def main(point_count=200_000):
+    print(f"{point_count:,} points")
+    print(f"memory   before {bytes_per_point(LegacyPoint, point_count):>8.1f} bytes/point"
+          f"   after {bytes_per_point(Point, point_count):>8.1f} bytes/point")
+    print(f"create   before {ops_per_second(construct(LegacyPoint), point_count):>10,.0f}/s"
+          f"   after {ops_per_second(construct(Point), point_count):>10,.0f}/s")
+    print(f"add      before {ops_per_second(legacy_walk, point_count):>10,.0f}/s"
+          f"   after {ops_per_second(in_place_walk, point_count):>10,.0f}/s (iadd)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -7,49 +7,82 @@ SOURCES = os.path.join(ROOT, 'Sources')
 if SOURCES not in sys.path:
     sys.path.insert(0, SOURCES)
 
-from gcode_machine import GCodeMachine
+from gcode_interpreter import GcodeInterpreter
+from null_gcode_machine import RecordingGCodeMachine
 from point import Point
 
 
-class DummyMachine(GCodeMachine):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.moves = []
-
-    def penup(self):
-        # no-op for test
-        pass
-
-    def pendown(self):
-        # no-op for test
-        pass
-
-    def move(self, x=None, y=None):
-        # simulate updating absolute position
-        # treat inputs as absolute positions when provided as Points; otherwise numeric
-        if isinstance(x, Point):
-            self.absolute_x = x.x
-            self.absolute_y = x.y
-            self.moves.append((self.absolute_x, self.absolute_y))
-            return
-        if x is None and y is None:
-            return
-        # if call comes with relative coordinates we will add them
-        self.absolute_x = x
-        self.absolute_y = y
-        self.moves.append((self.absolute_x, self.absolute_y))
-
-
 def test_circle_streaming_runs_without_allocating_list():
     # Use low resolution for quick test
-    m = DummyMachine(steps_per_mm=1, step_delay_us=0)
+    m = RecordingGCodeMachine(steps_per_mm=1, step_delay_us=0)
     # start at 0,0
     assert (m.absolute_x, m.absolute_y) == (0, 0)
     # draw a quarter circle to (10,0) with radius 10 (should sample a few points)
     m.circle(Point(10, 0), 10, is_clockwise=True)
     # ensure some moves were recorded
-    assert len(m.moves) > 0
+    assert len(m) > 0
     # final position should be at or very near (10,0)
-    fx, fy = m.moves[-1]
+    fx, fy = m.point(-1)
     assert abs(fx - 10) < 1e-6
     assert abs(fy - 0) < 1e-6
+
+
+def chord_error(center, radius, a, b):
+    """Distance between the circle and the midpoint of the chord a-b"""
+    mx, my = (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+    return radius - math.hypot(mx - center[0], my - center[1])
+
+
+def test_arc_chords_stay_within_tolerance_of_the_circle():
+    for tolerance in (0.002, 0.01, 0.1):
+        m = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+        m.arc_tolerance = tolerance
+        m.absolute_x, m.absolute_y = 70, 30
+        m.circle(Point(70.1, 30), 30, is_clockwise=True)
+        center = Point(70, 30).circle_center(Point(70.1, 30), 30, True)
+        points = [(70, 30)] + m.points()
+        for (x, y) in points[1:-1]:
+            assert abs(math.hypot(x - center.x, y - center.y) - 30) < 1e-9
+        for a, b in zip(points, points[1:]):
+            assert chord_error((center.x, center.y), 30, a, b) <= tolerance + 1e-9
+        assert points[-1] == (70.1, 30)
+
+
+def test_arc_segment_count_follows_tolerance():
+    m = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+    # full circle of radius 30 at the default 0.01 mm tolerance
+    assert m.arc_segments(30, 2 * math.pi) == math.ceil(2 * math.pi / (2 * math.acos(1 - 0.01 / 30)))
+    m.arc_tolerance = 0.05
+    assert m.arc_segments(30, 2 * math.pi) < 60
+    # tolerance larger than the radius still draws a polygon
+    assert m.arc_segments(0.01, math.pi) == 2
+
+
+def test_arc_tolerance_setting_must_be_positive():
+    m = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+    interpreter = GcodeInterpreter(m)
+    # $12=0 made acos(1) = 0 chords per radian, a division by zero, $12=-1 a math domain error
+    for value in ("0", "-1"):
+        assert interpreter.gcode(f"$12={value}").startswith("error:")
+        assert m.arc_tolerance == 0.01
+    assert interpreter.gcode("G2 X20 Y0 R10") == "ok\r\n"
+    assert m.point(-1) == (20, 0)
+
+
+def test_arc_keeps_the_pen_where_it_is():
+    # the arc starts at the current point, there's nothing to lift the pen for
+    m = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+    m.pendown()
+    m.reset_counts()
+    m.circle(Point(20, 0), 10, is_clockwise=True)
+    assert (m.penup_count, m.pendown_count) == (0, 0)
+    assert len(m) > 2 and all(m.pen)
+
+
+def test_arc_direction():
+    for clockwise, sign in ((True, 1), (False, -1)):
+        m = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+        m.circle(Point(20, 0), 10, is_clockwise=clockwise)
+        # clockwise about (10,0) leaves (0,0) upwards, counter-clockwise downwards
+        x, y = m.point(1)
+        assert y * sign > 0
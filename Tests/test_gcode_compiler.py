@@ -0,0 +1,122 @@
+import math
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_compiler import compile_file, compile_program, interpret_lines, path_length, CompiledFileIO
+from null_gcode_machine import RecordingGCodeMachine
+
+
+def moved_path(machine):
+    """(x, y, pen) of the moves a RecordingGCodeMachine recorded, without the ones that stayed in place"""
+    path = []
+    x, y = 0, 0
+    for n in range(len(machine)):
+        point = machine.point(n)
+        if point != (x, y):
+            path.append((point[0], point[1], machine.pen[n]))
+            x, y = point
+    return path
+
+
+def interpreted_path(source):
+    # the geometry compile_file() uses by default: single move lines, arcs within half a step
+    machine = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0, line_increment=0)
+    machine.arc_tolerance = 0.5 / 11
+    with open(source) as f:
+        interpret_lines(machine, f)
+    return moved_path(machine)
+
+
+def assert_same_path(expected, actual, tolerance):
+    assert len(expected) == len(actual)
+    for (ex, ey, epen), (ax, ay, apen) in zip(expected, actual):
+        assert abs(ex - ax) <= tolerance and abs(ey - ay) <= tolerance
+        assert epen == apen
+
+
+def test_compiled_program_replays_interpreted_path(tmp_path):
+    for name in ('absolute.gcode', 'relative.gcode'):
+        source = os.path.join(SOURCES, name)
+        target = str(tmp_path / 'program.gcb')
+        compile_file(source, target)
+
+        machine = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+        machine.relative_mode = True
+        CompiledFileIO(target).execute(machine)
+        assert machine.relative_mode
+        assert_same_path(interpreted_path(source), moved_path(machine), 1e-4)
+
+
+def test_compiled_program_is_smaller_than_its_source(tmp_path):
+    for integer_steps in (False, True):
+        source = os.path.join(SOURCES, 'absolute.gcode')
+        target = str(tmp_path / 'program.gcb')
+        compile_file(source, target, integer_steps=integer_steps)
+        assert os.path.getsize(target) < os.path.getsize(source)
+
+
+def test_compiled_program_with_integer_steps(tmp_path):
+    source = os.path.join(SOURCES, 'absolute.gcode')
+    target = str(tmp_path / 'program.gcb')
+    compile_file(source, target, steps_per_mm=11, integer_steps=True)
+    program = CompiledFileIO(target)
+    assert program.steps_per_mm == 11
+
+    machine = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+    program.execute(machine)
+    assert_same_path(interpreted_path(source), moved_path(machine), 0.5 / 11 + 1e-9)
+
+
+def test_program_polylines_and_travels():
+    program = compile_program([
+        "G90",
+        "G0 X50 Y80",
+        "G1 X90 Y80 F500",
+        "G1 X90 Y40",
+        "G1 X50 Y40 ; same stroke",
+        "G0 X10 Y10",
+        "G91",
+        "G1 X5 Y0",
+        "G0 X-15 Y-10",
+    ])
+    assert [list(p) for p in program.polylines] == [[50, 80, 90, 80, 90, 40, 50, 40], [10, 10, 15, 10]]
+    assert [list(t) for t in program.travels] == [[0, 0, 50, 80], [50, 40, 10, 10], [15, 10, 0, 0]]
+    assert program.draw_length() == 40 + 40 + 40 + 5
+    assert path_length(program.travels[0]) == math.hypot(50, 80)
+
+
+def test_program_matches_interpreted_path():
+    for name in ('absolute.gcode', 'relative.gcode'):
+        source = os.path.join(SOURCES, name)
+        with open(source) as f:
+            program = compile_program(f)
+        machine = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0, line_increment=0)
+        program.execute(machine)
+
+        expected = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0, line_increment=0)
+        with open(source) as f:
+            interpret_lines(expected, f)
+        assert_same_path(moved_path(expected), moved_path(machine), 1e-9)
+        # the arc of radius 30 is drawn as chords, continuing the pen down path it starts from
+        assert max(len(polyline) for polyline in program.polylines) > 200
+        assert min(len(polyline) for polyline in program.polylines) >= 4
+
+
+def test_compiled_program_keeps_feed_and_rapid_rates(tmp_path):
+    lines = ["G90", "G0 X10 Y10", "G1 X20 Y10 F300", "G0 X0 Y0", "G1 X5 Y5", "G1 X6 Y5 F1200", "G0 X0 Y0"]
+    expected = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0, line_increment=0)
+    interpret_lines(expected, lines)
+
+    source = tmp_path / 'program.gcode'
+    source.write_text("\n".join(lines))
+    target = str(tmp_path / 'program.gcb')
+    compile_file(str(source), target)
+    machine = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+    CompiledFileIO(target).execute(machine)
+    assert machine.rates == expected.rates
+    assert list(machine.rates) == [expected.rapid_rate, 300, expected.rapid_rate, 300, 1200, expected.rapid_rate]
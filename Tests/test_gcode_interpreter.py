@@ -0,0 +1,241 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import gcode_interpreter
+from gcode_machine import GCodeMachine
+from gcode_interpreter import GcodeInterpreter, IOBase, SilentIO, StdioIO, UARTIO, LINE_OVERFLOW, REALTIME_STATUS
+from null_gcode_machine import NullGCodeMachine
+from time_compat import tick_millis
+
+
+class PenCommandMachine(GCodeMachine):
+    """Machine that adds its own M3/M5 pen codes through the interpreter registry"""
+
+    def register_commands(self, interpreter):
+        interpreter.register_command("M3", self._pen_down_command, "Pen down")
+        interpreter.register_command("m5", self._pen_up_command)
+
+    def _pen_down_command(self, words):
+        self.pendown()
+        return "ok\r\n"
+
+    def _pen_up_command(self, words):
+        self.penup()
+        return "ok\r\n"
+
+    def pendown(self):
+        self.is_pendown = True
+
+    def penup(self):
+        self.is_pendown = False
+
+
+def test_machine_registered_commands():
+    machine = PenCommandMachine()
+    interpreter = GcodeInterpreter(machine, SilentIO())
+    assert interpreter.gcode("M3") == "ok\r\n"
+    assert machine.is_pendown
+    assert interpreter.gcode("m5 ; lift") == "ok\r\n"
+    assert not machine.is_pendown
+    assert "m3: Pen down" in interpreter.gcode("$")
+
+
+def test_builtin_and_unknown_commands():
+    machine = PenCommandMachine()
+    interpreter = GcodeInterpreter(machine, SilentIO())
+    assert interpreter.gcode("G91") == "ok\r\n"
+    assert machine.relative_mode
+    assert interpreter.gcode("G90") == "ok\r\n"
+    assert not machine.relative_mode
+    assert interpreter.gcode("G99 X1") == "error:20\r\n"
+    assert interpreter.gcode("; comment only") == "ok\r\n"
+    assert interpreter.gcode("%") == "ok\r\n"
+
+
+def test_two_digit_arc_words_share_the_arc_handlers():
+    interpreter = GcodeInterpreter(PenCommandMachine(), SilentIO())
+    handlers = interpreter.command_handlers
+    assert handlers["g02"] == handlers["g2"] == interpreter._clockwise_arc
+    assert handlers["g03"] == handlers["g3"] == interpreter._counter_clockwise_arc
+
+
+class ScriptedIO(IOBase):
+    """Hands out lines after a number of empty any() checks, collects everything written"""
+    def __init__(self, lines, idle_checks=0):
+        self.lines = list(lines)
+        self.idle_checks = idle_checks
+        self.written = []
+
+    def any(self):
+        if self.idle_checks > 0:
+            self.idle_checks -= 1
+            return False
+        return True
+
+    def read_line(self, blocking=True):
+        return self.lines.pop(0) if self.lines else None
+
+    def write(self, s: str):
+        self.written.append(s)
+
+
+def test_polling_loop_does_not_sleep_between_lines():
+    import time
+    io = ScriptedIO(["G91"] + ["G0 X1 Y1"] * 2000)
+    interpreter = GcodeInterpreter(PenCommandMachine(), io, use_polling=True)
+    start = time.time()
+    interpreter.interpret()
+    # a 10 ms sleep per line would take 20 seconds
+    assert time.time() - start < 2
+    assert io.written.count("ok\r\n") == 2001
+    assert io.written[-1] == "ended interpreter\r\n"
+
+
+def test_idle_polling_still_sends_status_after_banner():
+    io = ScriptedIO(["G90"], idle_checks=3)
+    interpreter = GcodeInterpreter(PenCommandMachine(), io, use_polling=True)
+    interpreter.banner_sent = True
+    interpreter.last_question_time = tick_millis()
+    interpreter.last_status_time = tick_millis() - GcodeInterpreter.STATUS_INTERVAL_MS * 2
+    interpreter.interpret()
+    assert io.written[0].startswith("<Idle|MPos:")
+    assert io.written[1:] == ["ok\r\n", "ended interpreter\r\n"]
+
+
+def test_pen_stays_down_between_touching_strokes():
+    machine = NullGCodeMachine(line_increment=0)
+    interpreter = GcodeInterpreter(machine, SilentIO())
+    for line in ("G90", "G0 X10 Y10", "G1 X20 Y10", "G0 X20 Y10", "G1 X20 Y20",
+                 "G2 X40 Y20 R10", "G91", "G0 X0 Y0", "G1 X5", "G0 X5", "G1 X5", "G28"):
+        interpreter.gcode(line)
+    assert (interpreter.pen_downs, interpreter.pen_ups, interpreter.pen_lifts_skipped) == (2, 2, 2)
+    assert interpreter.gcode("$s") == "[STATS:pen_downs=2,pen_ups=2,pen_lifts_skipped=2]\r\nok\r\n"
+
+
+class BusyNullMachine(NullGCodeMachine):
+    busy = False
+
+    def is_busy(self):
+        return self.busy
+
+
+def test_every_status_poll_is_answered_from_the_cache():
+    machine = BusyNullMachine()
+    interpreter = GcodeInterpreter(machine, SilentIO())
+    # two quick '?' make the banner handshake
+    interpreter.gcode("?")
+    assert "Grbl 1.1f" in interpreter.gcode("?")
+    replies = []
+    for n in range(10_000):
+        if n % 1000 == 999:
+            machine.move(n / 1000, 1)
+        if n == 5000:
+            machine.busy = True
+        if n == 8000:
+            machine.feed_hold()
+        replies.append(interpreter.gcode("?"))
+    # formatted once per change of position or state, the same string is handed out in between
+    assert len({id(reply) for reply in replies}) == 1 + 10 + 2
+    assert replies[0] == "<Idle|MPos:0.000,0.000,0.000|FS:0,0>\r\n"
+    assert replies[998] is replies[0]
+    assert replies[999] == "<Idle|MPos:0.999,1.000,0.000|FS:0,0>\r\n"
+    assert replies[5000].startswith("<Run|MPos:4.999,1.000")
+    assert replies[9999] == "<Hold|MPos:9.999,1.000,0.000|FS:0,0>\r\n"
+    machine.resume()
+    machine.busy = False
+    assert interpreter.gcode("?").startswith("<Idle|")
+
+
+class ChunkUART:
+    def __init__(self, data):
+        self.data = bytearray(data)
+
+    def any(self):
+        return len(self.data)
+
+    def read(self, n):
+        chunk = bytes(self.data[:n])
+        del self.data[:n]
+        return chunk
+
+    def write(self, data):
+        pass
+
+
+class CountingHostUART:
+    """A host streaming with GRBL character counting: a line goes out only while the lines not yet
+    answered fit in rx_size bytes, every ok or error answers the oldest of them"""
+
+    def __init__(self, lines, rx_size):
+        self.lines = [line.encode() + b"\n" for line in lines]
+        self.rx_size = rx_size
+        self.unanswered = []
+        self.data = bytearray()
+        self.replies = []
+
+    def any(self):
+        while self.lines and sum(self.unanswered) + len(self.lines[0]) <= self.rx_size:
+            line = self.lines.pop(0)
+            self.unanswered.append(len(line))
+            self.data += line
+        return len(self.data)
+
+    def read(self, n):
+        self.any()
+        chunk = bytes(self.data[:n])
+        del self.data[:n]
+        return chunk
+
+    def write(self, data):
+        assert isinstance(data, bytes)
+        for reply in data.decode().split("\r\n"):
+            if reply == "ok" or reply.startswith("error"):
+                self.replies.append(reply)
+                self.unanswered.pop(0)
+
+
+def test_every_streamed_line_is_answered(monkeypatch):
+    def stalled(seconds):
+        raise AssertionError("the host is waiting for a reply that never comes")
+
+    monkeypatch.setattr(gcode_interpreter, 'sleep_secs', stalled)
+    lines = ["G90", "; comment only", "", "G1 X1 Y1 F500", "%", "G99 X1", "G1 X2 ; to the right", "%", "M30"]
+    uart = CountingHostUART(lines, rx_size=32)
+    GcodeInterpreter(NullGCodeMachine(), UARTIO(uart), use_polling=True).interpret()
+    assert not uart.lines and not uart.unanswered
+    assert uart.replies == ["ok"] * 5 + ["error:20"] + ["ok"] * 3
+
+
+def test_uart_skips_the_rest_of_an_overlong_line():
+    io = UARTIO(ChunkUART(b"G1 X10 Y20 F500\r\nG0 X1\r\n"), line_size=8)
+    assert io.read_line(blocking=False) == LINE_OVERFLOW
+    assert io.read_line(blocking=False) == "G0 X1"
+    assert io.read_line(blocking=False) is None
+
+
+def test_stdio_polls_bytes_without_waiting_for_the_newline(monkeypatch):
+    read_fd, write_fd = os.pipe()
+    stdin = os.fdopen(read_fd)
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    try:
+        io = StdioIO()
+        realtime = []
+        io.realtime_handler = realtime.append
+        os.write(write_fd, b"G1 X1\r\n?G1 X")
+        # reading the line after the '?' would wait for its newline
+        io.poll_realtime()
+        assert realtime == [REALTIME_STATUS]
+        assert io.read_line(blocking=False) == "G1 X1"
+        assert io.read_line(blocking=False) == ""
+        os.write(write_fd, b"2\nG0 X3")
+        os.close(write_fd)
+        assert io.read_line() == "G1 X2"
+        assert io.read_line() == "G0 X3"
+        assert io.read_line() is None
+    finally:
+        stdin.close()
@@ -0,0 +1,49 @@
+import math
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from null_gcode_machine import RecordingGCodeMachine
+from point import Point
+
+
+def path_length(start, moves):
+    points = [start] + moves
+    return sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(points, points[1:]))
+
+
+def test_absolute_line_moves_through_each_point_once():
+    machine = RecordingGCodeMachine(line_increment=0.25)
+    machine.absolute_x, machine.absolute_y = 10, 10
+    machine.line(Point(13, 14))
+    # 4 mm along the longer axis in 0.25 mm increments
+    assert len(machine) == 16
+    assert len(set(machine.points())) == 16
+    assert machine.point(-1) == (13, 14)
+    assert math.isclose(path_length((10, 10), machine.points()), 5)
+
+
+def test_relative_line_matches_absolute_line():
+    absolute = RecordingGCodeMachine(line_increment=0.25)
+    absolute.line(Point(3, -4))
+    relative = RecordingGCodeMachine(line_increment=0.25)
+    relative.relative_mode = True
+    relative.line(Point(3, -4))
+    assert len(relative) == len(absolute)
+    for (ax, ay), (rx, ry) in zip(absolute.points(), relative.points()):
+        assert math.isclose(ax, rx, abs_tol=1e-9) and math.isclose(ay, ry, abs_tol=1e-9)
+    assert math.isclose(path_length((0, 0), relative.points()), 5)
+
+
+def test_axis_aligned_and_uneven_lines():
+    machine = RecordingGCodeMachine(line_increment=0.25)
+    machine.line(Point(0, 7))
+    assert machine.points() == [(0, 7)]
+    # endpoints off the increment grid still end exactly on the endpoint
+    machine.line(Point(0.3, 7.1))
+    assert machine.point(-1) == (0.3, 7.1)
+    assert len(machine) == 3
@@ -0,0 +1,36 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_parser import parse_line
+
+
+def test_parse_words_and_comment():
+    assert parse_line("G01 X90 Y80 F500  ; Move to right corner") == ("g01", {'x': 90.0, 'y': 80.0, 'f': 500.0})
+    assert parse_line("G02 X70.1 y30 R30") == ("g02", {'x': 70.1, 'y': 30.0, 'r': 30.0})
+    assert parse_line("G02 X.1 y0 R-30") == ("g02", {'x': 0.1, 'y': 0.0, 'r': -30.0})
+
+
+def test_parse_without_spaces():
+    assert parse_line("G1Z1") == ("g1", {'z': 1.0})
+    assert parse_line("g0x10y-5") == ("g0", {'x': 10.0, 'y': -5.0})
+
+
+def test_parse_blank_and_comment_lines():
+    assert parse_line("") == (None, None)
+    assert parse_line("   ") == (None, None)
+    assert parse_line("; Draw the square") == (None, None)
+
+
+def test_parse_system_commands():
+    assert parse_line("?") == ("?", {})
+    assert parse_line("%") == ("%", {})
+    assert parse_line("$") == ("$", {})
+    assert parse_line("$$") == ("$$", {})
+    assert parse_line("$X") == ("$x", {})
+    assert parse_line("$J=G91 X10 Y-2.5") == ("$j=", {'g': 91.0, 'x': 10.0, 'y': -2.5})
+    assert parse_line("$11=0.02") == ("$n=", {'n': 11.0, 'v': 0.02})
@@ -0,0 +1,66 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+import stepper_gcode_machine
+from stepper_gcode_machine import StepperGCodeMachine
+from gcode_compiler import compile_file, interpret_lines
+from job_estimator import JobEstimator, estimate_file, estimate_lines
+from motion_planner import trapezoid_seconds
+
+
+def test_estimate_matches_the_stepper_machine(monkeypatch):
+    lines = ["G90", "G0 X20 Y10", "G1 X40 Y10 F400", "G1 X40 Y30", "G2 X60 Y30 R10",
+             "G0 X5 Y5", "G1 X10 Y12", "G28"]
+    estimator = estimate_lines(lines)
+
+    sleeps = []
+    monkeypatch.setattr(stepper_gcode_machine, 'sleep_micros', sleeps.append)
+    machine = StepperGCodeMachine(11, 1500)
+    # the mock endstops never trigger, homing is timed by the estimator only
+    monkeypatch.setattr(machine, 'home', lambda: machine.penup())
+    sleeps.clear()
+    interpret_lines(machine, lines)
+    machine.end()
+
+    moving = estimator.draw_seconds + estimator.travel_seconds + estimator.pen_seconds
+    assert moving == pytest.approx(sum(sleeps) / 1_000_000, rel=0.01)
+    assert estimator.pen_lifts == 2
+    assert estimator.draw_mm == pytest.approx(20 + 20 + 3.14159 * 10 + (25 + 49) ** 0.5, rel=0.01)
+    # homing from X10 Y12 runs 242 steps of 8 phases at 1500 us
+    assert estimator.home_seconds == pytest.approx(242 * 8 * 1500 / 1_000_000)
+    assert "pen lifts" in estimator.report()
+
+
+def test_estimate_gcode_file():
+    estimator = estimate_file(os.path.join(SOURCES, 'absolute.gcode'))
+    assert estimator.total_seconds() > estimator.draw_seconds > 0
+    assert estimator.pen_lifts == 4
+
+
+def test_compiled_program_estimates_like_its_source(tmp_path):
+    source = os.path.join(SOURCES, 'absolute.gcode')
+    target = str(tmp_path / 'absolute.gcb')
+    compile_file(source, target)
+    text = estimate_file(source)
+    compiled = estimate_file(target)
+    # the same F words and rapid travels, only the arc chords differ
+    assert compiled.travel_seconds == pytest.approx(text.travel_seconds, rel=1e-3)
+    assert compiled.draw_seconds == pytest.approx(text.draw_seconds, rel=0.05)
+
+
+def test_segment_time_matches_the_move_profile():
+    estimator = JobEstimator()
+    for dx, dy, speed, entry, exit in ((10, 0, 5, 0, 0), (3.2, -1.1, 8, 2, 1), (0.1, 0.05, 20, 20, 20),
+                                       (-4, 7, 16.6, 0, 3), (0.04, 0, 5, 0, 0)):
+        x_distance = abs(round(dx * 11)) / 11
+        y_distance = abs(round(dy * 11)) / 11
+        expected = trapezoid_seconds(*estimator.move_profile(x_distance, y_distance, speed * 60, entry, exit))
+        before = estimator.total_seconds()
+        estimator._execute_segment(dx, dy, speed, entry, exit)
+        assert estimator.total_seconds() - before == pytest.approx(expected)
@@ -0,0 +1,105 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import math
+import pytest
+from motion_planner import new_delay_table, fill_trapezoid, trapezoid_seconds
+
+
+def test_trapezoid_ramps_up_cruises_and_ramps_down():
+    delays = fill_trapezoid(new_delay_table(), 400, 100, 500, 100, 2000)
+    profile = list(delays[:400])
+    assert profile[0] == profile[-1] == 10_000
+    assert min(profile) == 2_000
+    # accelerating then decelerating, never the other way round
+    middle = profile.index(2_000)
+    assert profile[:middle] == sorted(profile[:middle], reverse=True)
+    assert profile[middle:] == sorted(profile[middle:])
+    # 500^2 - 100^2 = 2 * 2000 * d gives 60 ticks of ramp at each end
+    assert profile.count(2_000) == 400 - 2 * 60
+
+
+def test_short_move_gets_a_triangle_and_table_is_reused():
+    delays = new_delay_table(10)
+    profile = list(fill_trapezoid(delays, 20, 100, 500, 100, 2000)[:20])
+    assert len(delays) == 20
+    assert min(profile) > 2_000
+    assert profile == profile[::-1]
+
+    # a later shorter move only touches the start of the same table
+    assert fill_trapezoid(delays, 5, 200, 200, 200, 2000, phases=8) is delays
+    assert list(delays[:5]) == [625] * 5
+
+
+def test_exit_rate_and_start_from_rest():
+    profile = list(fill_trapezoid(new_delay_table(), 100, 0, 1000, 250, 10000)[:100])
+    assert profile[0] == 10_000
+    assert profile[-1] == 4_000
+
+
+def test_trapezoid_seconds_matches_the_delay_table():
+    for ticks, entry, cruise, exit_rate, acceleration in ((1000, 83, 400, 83, 220), (50, 83, 400, 83, 220),
+                                                          (300, 300, 250, 100, 500), (10, 200, 200, 200, 0)):
+        delays = fill_trapezoid(new_delay_table(), ticks, entry, cruise, exit_rate, acceleration, 8)
+        assert trapezoid_seconds(ticks, entry, cruise, exit_rate, acceleration) == \
+            pytest.approx(sum(delays) * 8 / 1_000_000, rel=0.01)
+
+
+from motion_planner import MotionPlanner
+
+
+class TestMotionPlanner:
+
+    def planner(self, size=4):
+        executed = []
+        planner = MotionPlanner(lambda *segment: executed.append(segment), size, acceleration=20.0)
+        return planner, executed
+
+    def test_segments_run_in_order_once_buffer_is_full(self):
+        planner, executed = self.planner()
+        for n in range(4):
+            planner.push(n + 1, 0, 10, 0.01)
+        assert executed == []
+        planner.push(5, 0, 10, 0.01)
+        assert [segment[0] for segment in executed] == [1]
+        planner.flush()
+        assert [segment[0] for segment in executed] == [1, 2, 3, 4, 5]
+        # zero length moves are dropped
+        planner.push(0, 0, 10, 0.01)
+        assert planner.count == 0
+
+    def test_straight_line_does_not_stop_between_segments(self):
+        planner, executed = self.planner()
+        for _ in range(3):
+            planner.push(10, 0, 10, 0.01)
+        planner.flush()
+        entries = [segment[3] for segment in executed]
+        exits = [segment[4] for segment in executed]
+        assert entries[0] == 0 and exits[-1] == 0
+        assert exits[0] == entries[1] == 10
+        assert exits[1] == entries[2] == 10
+
+    def test_junction_speeds(self):
+        planner, executed = self.planner()
+        planner.push(10, 0, 10, 0.01)
+        planner.push(0, 10, 10, 0.01)
+        # right angle: v^2 = a * deviation * sin(theta/2) / (1 - sin(theta/2))
+        assert planner.max_entry_speed[1] == pytest.approx(math.sqrt(20 * 0.01 * math.sqrt(0.5) / (1 - math.sqrt(0.5))), rel=1e-5)
+        planner.push(0, -10, 10, 0.01)
+        # reversal comes to a stop
+        assert planner.max_entry_speed[2] == 0
+        # larger deviation allows a faster corner
+        assert planner.junction_speed(1, 0, 0.1) > planner.junction_speed(1, 0, 0.01)
+
+    def test_speed_is_limited_by_acceleration(self):
+        planner, executed = self.planner()
+        planner.push(0.1, 0, 100, 0.01)
+        planner.push(0.1, 0, 100, 0.01)
+        planner.flush()
+        # 0.1 mm at 20 mm/s^2 from rest reaches sqrt(2 * 20 * 0.1) = 2 mm/s
+        assert executed[0][4] == pytest.approx(2.0, rel=1e-5)
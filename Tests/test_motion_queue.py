@@ -0,0 +1,56 @@
+import os
+import sys
+import threading
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from motion_queue import MotionQueue, PEN_UP, PEN_DOWN
+
+
+def test_push_and_pop_wrap_around_in_order():
+    queue = MotionQueue(size=3)
+    assert queue.is_empty() and queue.peek() == -1 and queue.pop() is None and not queue.drop()
+    for n in range(10):
+        assert queue.push(n, -n, PEN_DOWN if n % 2 else PEN_UP, 100.0 + n)
+        assert queue.push(n + 100, 0)
+        assert queue.pop() == (n, -n, n % 2, 100.0 + n)
+        index = queue.peek()
+        assert queue.dx_steps[index] == n + 100 and queue.pen[index] == PEN_DOWN
+        assert queue.drop()
+    assert queue.is_empty()
+
+
+def test_non_blocking_push_fails_when_full_and_waits_time_out():
+    queue = MotionQueue(size=2, wait_us=100)
+    assert queue.push(1, 1) and queue.push(2, 2)
+    assert queue.is_full() and len(queue) == 2
+    assert not queue.push(3, 3)
+    assert not queue.push_wait(3, 3, timeout_ms=5)
+    queue.clear()
+    assert queue.peek_wait(timeout_ms=5) == -1
+    assert queue.pop_wait(timeout_ms=5) is None
+
+
+def test_stress_producer_and_consumer_threads():
+    count = 50_000
+    queue = MotionQueue(size=8, wait_us=10)
+    received = []
+
+    def consume():
+        for _ in range(count):
+            index = queue.peek_wait()
+            received.append((queue.dx_steps[index], queue.dy_steps[index], queue.pen[index], queue.rate[index]))
+            queue.drop()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for n in range(count):
+        assert queue.push_wait(n, -n, n % 2, float(n % 1000))
+        assert len(queue) <= 8
+    consumer.join(timeout=60)
+    assert not consumer.is_alive()
+    assert queue.is_empty()
+    assert received == [(n, -n, n % 2, float(n % 1000)) for n in range(count)]
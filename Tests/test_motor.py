@@ -1,6 +1,16 @@
 
 
-from stepper_gcode_machine import Motor
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+# the mock MicroPython machine module in Tests
+from machine import Pin
+from stepper_gcode_machine import Motor, StepperMotor, move_together, step_runs
 
 class MockMotor(Motor):
 
@@ -34,3 +44,77 @@ class TestMotor:
         assert motor.current_step == 0
 
 
+class TestMoveTogether:
+
+    def record_pins(self, monkeypatch):
+        """Log every coil write on the mock machine.Pin as (pin_id, value)"""
+        writes = []
+        original_value = Pin.value
+
+        def value(pin, val=None):
+            if val is not None and pin.mode == Pin.OUT:
+                writes.append((pin.pin_id, 1 if val else 0))
+            return original_value(pin, val)
+        monkeypatch.setattr(Pin, 'value', value)
+        return writes
+
+    def motors(self):
+        motor_x = StepperMotor("X", 4, 5, 6, 7, delay_us=0, mode='half', endstop_pin=14, endstop_direction=-1)
+        motor_y = StepperMotor("Y", 0, 1, 2, 3, delay_us=0, mode='half', endstop_pin=15, endstop_direction=1)
+        return motor_x, motor_y
+
+    def test_steps_are_interleaved(self, monkeypatch):
+        motor_x, motor_y = self.motors()
+        writes = self.record_pins(monkeypatch)
+
+        assert move_together(motor_x, 6, 1, motor_y, 3, -1) == (6, -3)
+        assert motor_x.current_step == 6
+        assert motor_y.current_step == -3
+
+        x_writes = [n for n, (pin, _) in enumerate(writes) if pin in (4, 5, 6, 7)]
+        y_writes = [n for n, (pin, _) in enumerate(writes) if pin in (0, 1, 2, 3)]
+        # every step is 8 half steps of 4 coils, followed by the final stop of 4 coils
+        assert len(x_writes) == (6 * 8 + 1) * 4
+        assert len(y_writes) == (3 * 8 + 1) * 4
+        # y steps happen while x is moving rather than after it
+        assert y_writes[0] < x_writes[6 * 8 * 4 // 2]
+        assert y_writes[3 * 8 * 4 - 1] < x_writes[6 * 8 * 4 - 1]
+        # coils are released at the end
+        assert all(pin.value() == 0 for pin in motor_x.coils + motor_y.coils)
+
+    def test_each_motor_keeps_its_limits(self, monkeypatch):
+        motor_x, motor_y = self.motors()
+        self.record_pins(monkeypatch)
+        # x stops at max_steps while y finishes
+        motor_x.max_steps = 4
+        assert move_together(motor_x, 10, 1, motor_y, 5, -1) == (4, -5)
+        # y stops at its triggered endstop while x finishes
+        motor_x.current_step = 0
+        motor_y.endstop.value(0)
+        assert move_together(motor_x, 3, 1, motor_y, 5, motor_y.endstop_direction) == (3, 0)
+        assert motor_y.current_step == 0
+
+    def test_single_axis_and_fractional_steps(self):
+        motor_x, motor_y = self.motors()
+        assert move_together(motor_x, 2.5, 1, motor_y, 0, 1) == (3, 0)
+        assert move_together(motor_x, 0, 1, motor_y, 0, 1) == (0, 0)
+
+    def test_step_runs_match_a_bresenham_loop(self):
+        for major, minor in ((6, 3), (7, 2), (110, 1), (13, 13), (5, 0), (0, 0), (97, 41)):
+            # per tick loop of the previous move_together
+            expected = []
+            run = 0
+            error = major // 2
+            for _ in range(major):
+                error += minor
+                if error >= major:
+                    error -= major
+                    expected.append(run)
+                    run = 0
+                else:
+                    run += 1
+            expected.append(run)
+            runs = list(step_runs(major, minor))
+            assert runs == expected
+            assert len(runs) == minor + 1
+            assert sum(runs) + minor == major
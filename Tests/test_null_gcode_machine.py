@@ -0,0 +1,38 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_compiler import interpret_lines
+from null_gcode_machine import NullGCodeMachine, RecordingGCodeMachine
+
+
+def test_null_machine_counts_calls_and_keeps_position():
+    machine = NullGCodeMachine(line_increment=0)
+    interpret_lines(machine, ["G90", "G0 X10 Y5", "G1 X20 Y5", "G2 X30 Y5 R5", "G91", "G1 X-5 Y1", "G28"])
+    assert machine.line_count == 2
+    assert machine.circle_count == 1
+    assert machine.move_count > 3
+    assert machine.pendown_count == 1
+    assert machine.home_count == 1
+    assert (machine.absolute_x, machine.absolute_y) == (0, 0)
+    assert not machine.is_pendown
+
+    machine.reset_counts()
+    assert machine.move_count == machine.line_count == machine.home_count == 0
+
+
+def test_recording_machine_stores_absolute_moves_and_pen():
+    machine = RecordingGCodeMachine(line_increment=0)
+    interpret_lines(machine, ["G90", "G0 X10 Y5", "G1 X20 Y5", "G91", "G1 X0 Y2", "G0 X1 Y1"])
+    assert machine.points() == [(10, 5), (20, 5), (20, 7), (21, 8)]
+    assert list(machine.pen) == [0, 1, 1, 0]
+    assert machine.point(-1) == (21, 8)
+    assert machine.xs.itemsize == 8
+
+    machine.clear()
+    assert len(machine) == 0
+    assert (machine.absolute_x, machine.absolute_y) == (21, 8)
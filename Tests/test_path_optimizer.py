@@ -0,0 +1,102 @@
+import io
+import os
+import random
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_compiler import compile_program
+from path_optimizer import optimize_file, optimize_program, write_gcode, pen_lifts, travel_seconds, reversed_path
+
+
+def strokes(program):
+    """Strokes as point tuples, regardless of the direction they are drawn in"""
+    result = []
+    for polyline in program.polylines:
+        points = tuple(zip(polyline[0::2], polyline[1::2]))
+        result.append(min(points, points[::-1]))
+    return sorted(result)
+
+
+def zigzag_program():
+    # horizontal strokes drawn alternately at the far left and far right of the page
+    lines = ["G90"]
+    for n in range(10):
+        y = n * 5
+        x = 0 if n % 2 == 0 else 100
+        lines += [f"G0 X{x} Y{y}", f"G1 X{x + 10} Y{y}"]
+    for n in range(10):
+        y = n * 5
+        x = 100 if n % 2 == 0 else 0
+        lines += [f"G0 X{x} Y{y}", f"G1 X{x + 10} Y{y}"]
+    lines.append("G0 X0 Y0")
+    return compile_program(lines)
+
+
+def test_reordering_cuts_travel_and_keeps_every_stroke():
+    program = zigzag_program()
+    optimized = optimize_program(program)
+    assert strokes(optimized) == strokes(program)
+    assert optimized.travel_length() < 0.5 * program.travel_length()
+    assert travel_seconds(optimized) < travel_seconds(program)
+    # starts and finishes at the same places
+    assert optimized.travels[0][:2] == program.travels[0][:2]
+    assert optimized.travels[-1][-2:] == program.travels[-1][-2:]
+
+
+def test_strokes_are_reversed_only_when_allowed():
+    program = compile_program(["G0 X50 Y0", "G1 X0 Y0", "G0 X50 Y10", "G1 X0 Y10", "G0 X0 Y0"])
+    optimized = optimize_program(program)
+    # drawing the first stroke backwards from home leaves only the 10 mm steps between the strokes
+    assert [list(p) for p in optimized.polylines] == [[0, 0, 50, 0], [50, 10, 0, 10]]
+    assert optimized.travel_length() == 20
+
+    forward = optimize_program(program, allow_reverse=False)
+    assert [list(p) for p in forward.polylines] == [list(p) for p in program.polylines]
+
+
+def test_written_gcode_compiles_to_the_optimized_program():
+    optimized = optimize_program(zigzag_program())
+    out = io.StringIO()
+    write_gcode(optimized, out, feed_rate=600)
+    text = out.getvalue()
+    assert "F600" in text
+    recompiled = compile_program(text.splitlines())
+    assert [list(p) for p in recompiled.polylines] == [list(p) for p in optimized.polylines]
+    assert pen_lifts(recompiled) == pen_lifts(optimized)
+
+
+def test_strokes_keep_their_feed_rates(tmp_path):
+    source = tmp_path / 'source.gcode'
+    source.write_text("G90\nG0 X100 Y0\nG1 X110 Y0 F120\nG1 X120 Y0 F600\nG0 X0 Y0\nG1 X10 Y0\nG0 X0 Y0\n")
+    target = tmp_path / 'optimized.gcode'
+    program, optimized = optimize_file(str(source), str(target))
+    # the change of F splits the first stroke where it happened
+    assert [list(p) for p in program.polylines] == [[100, 0, 110, 0], [110, 0, 120, 0], [0, 0, 10, 0]]
+    assert program.feed_rates == [120, 600, 600]
+    assert pen_lifts(program) == 1
+    recompiled = compile_program(target.read_text().splitlines())
+    assert [list(p) for p in recompiled.polylines] == [list(p) for p in optimized.polylines]
+    assert recompiled.feed_rates == optimized.feed_rates
+    assert sorted(zip(map(tuple, optimized.polylines), optimized.feed_rates)) == \
+        sorted(zip(map(tuple, program.polylines), program.feed_rates))
+
+
+def test_many_random_strokes():
+    rng = random.Random(1)
+    lines = []
+    for _ in range(3000):
+        x, y = rng.uniform(0, 200), rng.uniform(0, 200)
+        lines += [f"G0 X{x:.3f} Y{y:.3f}", f"G1 X{x + rng.uniform(-2, 2):.3f} Y{y + rng.uniform(-2, 2):.3f}"]
+    program = compile_program(lines)
+    optimized = optimize_program(program)
+    assert len(optimized.polylines) == 3000
+    assert strokes(optimized) == strokes(program)
+    assert optimized.travel_length() < 0.1 * program.travel_length()
+
+
+def test_reversed_path():
+    assert list(reversed_path([1, 2, 3, 4, 5, 6])) == [5, 6, 3, 4, 1, 2]
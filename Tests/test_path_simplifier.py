@@ -0,0 +1,76 @@
+import math
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+from gcode_compiler import compile_program
+from path_simplifier import merge_collinear, simplify_path, simplify_program, StreamingSimplifier
+
+
+def distance_to_path(x, y, path):
+    best = math.hypot(x - path[0], y - path[1])
+    for i in range(0, len(path) - 2, 2):
+        ax, ay, bx, by = path[i], path[i + 1], path[i + 2], path[i + 3]
+        dx, dy = bx - ax, by - ay
+        length_squared = dx * dx + dy * dy
+        t = 0 if length_squared == 0 else max(0, min(1, ((x - ax) * dx + (y - ay) * dy) / length_squared))
+        best = min(best, math.hypot(x - ax - t * dx, y - ay - t * dy))
+    return best
+
+
+def assert_within(original, simplified, tolerance):
+    assert list(simplified[:2]) == list(original[:2]) and list(simplified[-2:]) == list(original[-2:])
+    for i in range(0, len(original), 2):
+        assert distance_to_path(original[i], original[i + 1], simplified) <= tolerance + 1e-9
+
+
+def arc_program(tolerance):
+    return compile_program(["G0 X70 Y30", "G2 X70.1 Y30 R30", "G0 X10 Y10", "G3 X20 Y10 R5"],
+                           arc_tolerance=tolerance)
+
+
+def test_merge_collinear_keeps_turns():
+    assert list(merge_collinear([0, 0, 1, 0, 2, 0, 2, 1, 2, 3])) == [0, 0, 2, 0, 2, 3]
+    # going back over the same line is a turn
+    assert list(merge_collinear([0, 0, 2, 0, 1, 0])) == [0, 0, 2, 0, 1, 0]
+
+
+def test_simplified_arcs_stay_within_tolerance():
+    tolerance = 1 / 11
+    program = arc_program(0.002)
+    original = [list(polyline) for polyline in program.polylines]
+    removed = simplify_program(program, steps_per_mm=11)
+    assert removed > 0
+    for before, after in zip(original, program.polylines):
+        assert len(after) <= len(before)
+        assert_within(before, after, tolerance)
+    # the full circle keeps about a quarter of its vertices
+    longest = max(original, key=len)
+    assert len(simplify_path(longest, tolerance)) < len(longest) / 4
+
+
+def test_streaming_simplifier_merges_within_tolerance():
+    emitted = [(0, 0)]
+    simplifier = StreamingSimplifier(lambda x, y: emitted.append((x, y)), tolerance=0.5)
+    points = [(n, round(20 * math.sin(n / 20))) for n in range(1, 200)]
+    for x, y in points:
+        simplifier.add(x, y)
+    simplifier.flush()
+    assert emitted[-1] == points[-1]
+    assert len(emitted) < len(points) / 3
+    path = [c for point in emitted for c in point]
+    for x, y in points:
+        assert distance_to_path(x, y, path) <= 0.5 + 1e-9
+
+
+def test_streaming_simplifier_with_no_tolerance_merges_straight_runs_only():
+    emitted = []
+    simplifier = StreamingSimplifier(lambda x, y: emitted.append((x, y)))
+    for point in [(1, 1), (2, 2), (2, 2), (3, 3), (3, 4), (3, 2)]:
+        simplifier.add(*point)
+    simplifier.flush()
+    assert emitted == [(3, 3), (3, 4), (3, 2)]
@@ -0,0 +1,38 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+from point import Point
+
+
+def test_numeric_constructor_and_parse():
+    point = Point(10, 20.5)
+    assert (point.x, point.y) == (10, 20.5)
+    assert (Point().x, Point().y) == (0, 0)
+    point = Point.parse("x10", "Y-20")
+    assert (point.x, point.y) == (10, -20)
+    point = Point.parse(["y5"])
+    assert (point.x, point.y) == (0, 5)
+
+
+def test_in_place_arithmetic_returns_the_same_point():
+    point = Point(1, 2)
+    assert point.iadd(Point(3, 4)) is point
+    assert (point.x, point.y) == (4, 6)
+    assert point.isub(Point(1, 1)) is point
+    assert (point.x, point.y) == (3, 5)
+    # the copying forms leave their operands alone
+    total = point.add(Point(1, 1))
+    assert total is not point and (point.x, point.y) == (3, 5)
+
+
+def test_points_have_no_instance_dict():
+    point = Point(1, 2)
+    assert not hasattr(point, '__dict__')
+    with pytest.raises(AttributeError):
+        point.z = 3
@@ -0,0 +1,71 @@
+import math
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from gcode_machine import GCodeMachine
+from null_gcode_machine import RecordingGCodeMachine
+from point import Point, PointArray
+
+
+def test_matches_scalar_point_geometry():
+    points = [Point(3, 4), Point(-1, 2.5), Point(0, -7)]
+    array = PointArray.from_points(points)
+    center = Point(1, 1)
+    assert len(array) == 3
+    assert np.allclose(array.distance(center), [p.distance(center) for p in points])
+    assert np.allclose(array.angle(center), [p.angle(center) for p in points])
+    moved = array.add(Point(1, -1))
+    assert (moved[0].x, moved[0].y) == (4, 3)
+    assert np.allclose(array.subtract(array).xy, 0)
+    assert np.allclose(array.segment_lengths(), [points[0].distance(points[1]), points[1].distance(points[2])])
+
+
+def test_transforms():
+    array = PointArray([(1, 0), (0, 2)])
+    assert np.allclose(array.translate(2, 3).xy, [(3, 3), (2, 5)])
+    assert np.allclose(array.scale(2).xy, [(2, 0), (0, 4)])
+    assert np.allclose(array.scale(2, Point(1, 0)).xy, [(1, 0), (-1, 4)])
+    # counter clockwise quarter turn
+    assert np.allclose(array.rotate(math.pi / 2).xy, [(0, 1), (-2, 0)])
+    assert np.allclose(array.rotate(math.pi, Point(1, 1)).xy, [(1, 2), (2, 0)])
+
+
+def test_arc_samples_lie_on_the_circle():
+    arc = PointArray.arc(Point(10, 0), 10, math.pi, -math.pi, 8)
+    assert len(arc) == 9
+    assert np.allclose(arc.distance(Point(10, 0)), 10)
+    assert np.allclose(arc.xy[[0, -1]], [(0, 0), (20, 0)])
+
+
+def test_vectorized_circle_matches_scalar_circle(monkeypatch):
+    # the coordinates handed to move(), the recorded ones are floats whatever they were
+    coordinate_types = set()
+    record = RecordingGCodeMachine.move
+
+    def move(self, x=None, y=None):
+        coordinate_types.add(type(x))
+        record(self, x, y)
+
+    monkeypatch.setattr(RecordingGCodeMachine, 'move', move)
+
+    def draw():
+        machine = RecordingGCodeMachine(steps_per_mm=11, step_delay_us=0)
+        machine.absolute_x, machine.absolute_y = 70, 30
+        machine.circle(Point(70.1, 30), 30, is_clockwise=False)
+        return machine.points()
+
+    monkeypatch.setattr(GCodeMachine, 'VECTORIZED_ARCS', True)
+    vectorized = draw()
+    assert coordinate_types <= {float, int}
+    monkeypatch.setattr(GCodeMachine, 'VECTORIZED_ARCS', False)
+    scalar = draw()
+    assert len(vectorized) == len(scalar) > 100
+    assert np.allclose(vectorized, scalar, atol=1e-9)
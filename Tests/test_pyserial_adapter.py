@@ -0,0 +1,138 @@
+import os
+import select
+import sys
+import threading
+import time
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+
+serial = pytest.importorskip("serial")
+if not hasattr(os, "openpty"):
+    pytest.skip("needs os.openpty", allow_module_level=True)
+
+from gcode_interpreter import GcodeInterpreter, UARTIO
+from logging_compat import logging
+from null_gcode_machine import NullGCodeMachine
+from pyserial_adapter import PySerialAdapter
+from threaded_gcode_machine import ThreadedGCodeMachine
+
+
+class SerialPair:
+    """Interpreter on one end of a pty through PySerialAdapter, the test plays the sender on the other end"""
+
+    def __init__(self, rx_buffer_size=128):
+        logging.disable(logging.CRITICAL)
+        self.host, device = os.openpty()
+        self.adapter = PySerialAdapter(os.ttyname(device))
+        self.machine = ThreadedGCodeMachine(NullGCodeMachine(line_increment=0), size=16)
+        self.interpreter = GcodeInterpreter(self.machine, UARTIO(self.adapter), use_polling=True,
+                                            rx_buffer_size=rx_buffer_size)
+        self.thread = threading.Thread(target=self.interpreter.interpret)
+        self.thread.start()
+        self.received = b""
+
+    def reply(self, timeout=5.0):
+        """Next reply line, waiting for it"""
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self.received:
+            remaining = deadline - time.monotonic()
+            assert remaining > 0, "no reply from the interpreter"
+            if select.select([self.host], [], [], remaining)[0]:
+                self.received += os.read(self.host, 4096)
+        line, self.received = self.received.split(b"\n", 1)
+        return line.decode().rstrip("\r")
+
+    def stream(self, lines, rx_buffer_size):
+        """
+        Send lines GRBL character counting style: keep sending while the lines not acknowledged yet fit
+        in rx_buffer_size bytes, each ok or error acknowledges the oldest line.
+        Returns every reply line and the most bytes ever in flight.
+        """
+        replies = []
+        in_flight = []
+        most = 0
+        for line in lines:
+            data = (line + "\n").encode()
+            while in_flight and sum(in_flight) + len(data) > rx_buffer_size:
+                self._acknowledge(replies)
+                in_flight.pop(0)
+            os.write(self.host, data)
+            in_flight.append(len(data))
+            most = max(most, sum(in_flight))
+        while in_flight:
+            self._acknowledge(replies)
+            in_flight.pop(0)
+        return replies, most
+
+    def _acknowledge(self, replies):
+        reply = self.reply()
+        replies.append(reply)
+        while reply != "ok" and not reply.startswith("error"):
+            reply = self.reply()
+            replies.append(reply)
+
+    def close(self):
+        os.write(self.host, b"M30\n")
+        self.thread.join(timeout=10)
+        self.adapter.close()
+        os.close(self.host)
+        logging.disable(logging.NOTSET)
+
+
+def program(count):
+    return ["G90"] + [f"G{n % 2} X{n % 100}.5 Y{n % 37}.25 F1000" for n in range(count)]
+
+
+def test_info_advertises_the_rx_buffer():
+    pair = SerialPair(rx_buffer_size=96)
+    try:
+        os.write(pair.host, b"$I\n")
+        assert pair.reply().startswith("[VER:")
+        assert pair.reply() == "[OPT:,17,96]"
+        assert pair.reply() == "ok"
+    finally:
+        pair.close()
+
+
+def test_character_counting_stream_gets_every_ok_in_order():
+    pair = SerialPair()
+    try:
+        lines = program(300)
+        lines.insert(150, "$I")
+        start = time.perf_counter()
+        replies, most = pair.stream(lines, 128)
+        elapsed = time.perf_counter() - start
+        print(f"character counting: {len(lines) / elapsed:,.0f} lines/s")
+        assert most <= 128
+        # one ok per line, $I answers with its own lines before its ok
+        assert replies[:150] == ["ok"] * 150
+        assert replies[150].startswith("[VER:")
+        assert replies[151:153] == ["[OPT:,17,128]", "ok"]
+        assert len(replies) == len(lines) + 2
+        pair.machine.wait_idle()
+        assert pair.machine.machine.move_count == 300
+    finally:
+        pair.close()
+
+
+def test_ping_pong_and_character_counting_rates():
+    pair = SerialPair()
+    try:
+        lines = program(200)
+        start = time.perf_counter()
+        for line in lines:
+            os.write(pair.host, (line + "\n").encode())
+            assert pair.reply() == "ok"
+        ping_pong = len(lines) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        replies, _ = pair.stream(lines, 128)
+        counting = len(lines) / (time.perf_counter() - start)
+        assert replies == ["ok"] * len(lines)
+        print(f"ping-pong: {ping_pong:,.0f} lines/s, character counting: {counting:,.0f} lines/s")
+    finally:
+        pair.close()
@@ -0,0 +1,174 @@
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+import gcode_interpreter
+import gcode_machine
+import stepper_gcode_machine
+from stepper_gcode_machine import StepperGCodeMachine
+from gcode_interpreter import GcodeInterpreter, UARTIO
+
+STEP_DELAY_US = 1500
+
+
+class FakeClock:
+    """Time that only moves when the code under test sleeps"""
+
+    def __init__(self):
+        self.us = 0
+
+    def sleep_micros(self, us):
+        self.us += us
+
+    def sleep_secs(self, seconds):
+        self.us += int(seconds * 1_000_000)
+
+    def tick_millis(self):
+        return self.us // 1000
+
+
+class ScriptedUART:
+    """UART with any() and read(n) that receives each scripted chunk of bytes once its time has come"""
+
+    def __init__(self, clock, script, motor_x):
+        self.clock = clock
+        self.motor_x = motor_x
+        # (ms, bytes) in time order
+        self.script = list(script)
+        self.received = bytearray()
+        self.writes = []
+
+    def _arrive(self):
+        while self.script and self.script[0][0] * 1000 <= self.clock.us:
+            self.received += self.script.pop(0)[1]
+
+    def any(self):
+        self._arrive()
+        return len(self.received)
+
+    def read(self, n):
+        self._arrive()
+        data = bytes(self.received[:n])
+        del self.received[:n]
+        return data or None
+
+    def write(self, data):
+        # with the step the X motor had reached, a status report shows that position
+        self.writes.append((self.clock.us, data.decode(), self.motor_x.current_step))
+
+    def replies(self, text):
+        """Times in us at which a reply containing text was written"""
+        return [us for us, written, _ in self.writes if text in written]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(stepper_gcode_machine, 'sleep_micros', clock.sleep_micros)
+    monkeypatch.setattr(gcode_machine, 'sleep_micros', clock.sleep_micros)
+    monkeypatch.setattr(gcode_interpreter, 'sleep_secs', clock.sleep_secs)
+    monkeypatch.setattr(gcode_interpreter, 'tick_millis', clock.tick_millis)
+    return clock
+
+
+def run_script(clock, script):
+    machine = StepperGCodeMachine(11, STEP_DELAY_US)
+    # homing has run, the script starts from here
+    start_ms = clock.tick_millis()
+    uart = ScriptedUART(clock, [(start_ms + ms, data) for ms, data in script], machine.motor_x)
+    interpreter = GcodeInterpreter(machine, UARTIO(uart))
+    interpreter.interpret()
+    return machine, uart, start_ms * 1000
+
+
+def statuses(uart, start_us):
+    """(us after start_us, X in mm) of every status report outside the banner, checked against the X motor step"""
+    reports = []
+    for us, text, step in uart.writes:
+        if "Grbl 1.1f" in text:
+            continue
+        for report in text.split("\r\n"):
+            if "MPos:" in report:
+                x = float(report.split("MPos:")[1].split(",")[0])
+                assert x == pytest.approx(abs(step) / 11, abs=0.001)
+                reports.append((us - start_us, x))
+    return reports
+
+
+def test_status_is_answered_mid_move(clock):
+    # 30 mm at 300 mm/min take 6 s
+    machine, uart, start_us = run_script(clock, [
+        (0, b"??"),
+        (100, b"G1 X30 F300\n"),
+        (2000, b"?"),
+        (20000, b"M30\n"),
+    ])
+    assert uart.replies("Grbl 1.1f")
+    mid_move = [(us, x) for us, x in statuses(uart, start_us) if us >= 2_000_000]
+    assert mid_move
+    us, x = mid_move[0]
+    # answered within a couple of steps of arriving, not after the move
+    assert us - 2_000_000 <= 2 * 8 * STEP_DELAY_US
+    assert 0 < x < 30
+    assert machine.absolute_x == pytest.approx(30, abs=0.1)
+
+
+def test_feed_hold_stops_the_steps_until_resumed(clock):
+    machine, uart, start_us = run_script(clock, [
+        (0, b"??"),
+        (100, b"G1 X30 F300\n"),
+        (2000, b"!"),
+        (3000, b"?"),
+        (5900, b"?"),
+        (6000, b"~"),
+        (7000, b"?"),
+        (30000, b"M30\n"),
+    ])
+    reports = [x for us, x in statuses(uart, start_us) if us >= 2_000_000]
+    assert len(reports) == 3
+    held_x, still_held_x, resumed_x = reports
+    assert 0 < held_x == still_held_x < resumed_x
+    assert machine.absolute_x == pytest.approx(30, abs=0.1)
+    assert not machine.holding
+
+
+def test_soft_reset_aborts_the_move(clock):
+    machine, uart, start_us = run_script(clock, [
+        (0, b"??"),
+        (100, b"G1 X30 F300\n"),
+        (2000, b"\x18"),
+        (2500, b"??"),
+        (3000, b"G1 X0 Y5 F300\n"),
+        (30000, b"M30\n"),
+    ])
+    reset = [us - start_us for us in uart.replies("\r\nGrbl 1.1f")]
+    assert len(reset) == 1 and reset[0] - 2_000_000 <= 2 * 8 * STEP_DELAY_US
+    # the X30 move stopped part way
+    stopped = [x for us, x in statuses(uart, start_us) if us >= 2_500_000]
+    assert stopped and 0 < stopped[0] < 30
+    # the line after the reset still ran
+    assert machine.absolute_x == pytest.approx(0, abs=0.1)
+    assert machine.absolute_y == pytest.approx(5, abs=0.1)
+    assert not machine.reset_requested
+
+
+def test_every_status_poll_is_answered_before_and_after_the_handshake(clock):
+    machine, uart, start_us = run_script(clock, [
+        (0, b"?"),
+        (100, b"G1 X3 F300\n"),
+        (2000, b"??"),
+        # no '?' for longer than IDLE_RESET_MS, the host may have reconnected
+        (12000, b"?"),
+        (12100, b"M30\n"),
+    ])
+    reports = statuses(uart, start_us)
+    # the first '?' of a session and the first one after the gap get a report of their own
+    assert reports[0] == (0, 0)
+    assert [x for us, x in reports if us >= 12_000_000] == [pytest.approx(3)]
+    # the banner went out once, for the quick pair
+    assert len(uart.replies("Grbl 1.1f")) == 1
@@ -0,0 +1,186 @@
+import io
+import os
+import sys
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+import stepper_gcode_machine
+from stepper_gcode_machine import StepperGCodeMachine
+from gcode_interpreter import GcodeInterpreter, SilentIO
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the delay of every coil phase instead of sleeping"""
+    delays = []
+    monkeypatch.setattr(stepper_gcode_machine, 'sleep_micros', delays.append)
+    return delays
+
+
+def new_machine(sleeps):
+    machine = StepperGCodeMachine(11, 1500)
+    interpreter = GcodeInterpreter(machine, SilentIO())
+    machine.pendown()
+    # drop the homing and pen moves
+    sleeps.clear()
+    return machine, interpreter
+
+
+def run(interpreter, line):
+    """Interpret a line and let the motors run everything the planner has queued"""
+    interpreter.gcode(line)
+    interpreter.machine.flush()
+
+
+def test_default_rates(sleeps):
+    machine, _ = new_machine(sleeps)
+    # default feed keeps the previous fixed 1500 us per half step
+    assert machine.phase_delay_us(10, 0) == 1500
+    assert machine.max_rate == pytest.approx(60_000_000 / (1000 * 8 * 11))
+    assert machine.rapid_rate == machine.max_rate
+
+
+def test_feed_rate_sets_step_timing(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    run(interpreter, "G1 X10 F300")
+    assert machine.feed_rate == 300
+    # 10 mm at 300 mm/min is 2 seconds over 110 steps of 8 phases
+    assert len(sleeps) == 110 * 8
+    assert sum(sleeps) == pytest.approx(2_000_000, rel=0.01)
+
+    # F is modal
+    sleeps.clear()
+    run(interpreter, "G1 X0")
+    assert sum(sleeps) == pytest.approx(2_000_000, rel=0.01)
+
+
+def test_rapid_moves_are_faster_and_rates_are_clamped(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    machine.penup()
+    sleeps.clear()
+    run(interpreter, "G0 X10")
+    # ramps from the start delay up to max_rate and back down
+    assert sleeps[0] == sleeps[-1] == machine.start_step_delay_us
+    assert min(sleeps) == machine.min_step_delay_us
+
+    run(interpreter, "G1 X0 Y0 F100000")
+    assert machine.feed_rate == machine.max_rate
+    assert "F681.8" in interpreter._send_state()
+
+
+def test_diagonal_feed_is_along_the_path(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    run(interpreter, "G1 X30 Y40 F600")
+    # 50 mm path at 600 mm/min takes 5 seconds although the longer axis is only 40 mm
+    assert sum(sleeps) == pytest.approx(5_000_000, rel=0.01)
+
+
+def test_long_rapid_move_takes_less_time_with_acceleration(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    machine.penup()
+    sleeps.clear()
+    run(interpreter, "G0 X80")
+    ramped = sum(sleeps)
+    # no faster than max_rate, but well under the fixed 1500 us per phase of the start rate
+    assert ramped > 80 * 11 * 8 * machine.min_step_delay_us
+    assert ramped < 0.8 * 80 * 11 * 8 * machine.start_step_delay_us
+
+
+def test_polyline_runs_through_vertices_without_stopping(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    for line in ("G1 X10 F600", "G1 X20", "G1 X30"):
+        interpreter.gcode(line)
+    machine.flush()
+    cruise = machine.phase_delay_us(10, 0, 600)
+    ticks = 110 * 8
+    assert len(sleeps) == 3 * ticks
+    # only the start and the end of the polyline ramp, the middle segment cruises throughout
+    assert set(sleeps[ticks:2 * ticks]) == {cruise}
+    assert sleeps[0] > cruise and sleeps[-1] > cruise
+
+
+def test_junction_deviation_setting(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    assert "$11=0.01 (Junction deviation, mm)" in interpreter.gcode("$$")
+    assert interpreter.gcode("$11=0.05") == "ok\r\n"
+    assert machine.junction_deviation == 0.05
+    assert "$11=0.05 (Junction deviation, mm)" in interpreter.gcode("$$")
+    assert interpreter.gcode("$99=1").startswith("error")
+
+
+def test_junction_deviation_must_be_positive(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    for value in ("-1", "0"):
+        assert interpreter.gcode(f"$11={value}").startswith("error:")
+        assert machine.junction_deviation == 0.01
+    # the corner that raised a math domain error with $11=-1
+    interpreter.gcode("G1 X10 Y0")
+    interpreter.gcode("G1 X10 Y10")
+    run(interpreter, "G1 X0 Y10")
+    assert (machine.absolute_x, machine.absolute_y) == (0, 10)
+
+
+def test_short_moves_do_not_accumulate_rounding(sleeps):
+    machine, interpreter = new_machine(sleeps)
+    interpreter.gcode("G91")
+    for _ in range(100):
+        # 0.55 steps each, rounding every move to whole steps would make 0 or 100 steps
+        interpreter.gcode("G1 X0.05 Y-0.05")
+    machine.flush()
+    assert machine.step_x == 55
+    assert machine.motor_x.current_step == -55 * machine.motor_x.endstop_direction
+    assert machine.motor_y.current_step == 55 * machine.motor_y.endstop_direction
+
+
+def test_line_is_a_single_move(sleeps, monkeypatch):
+    machine, interpreter = new_machine(sleeps)
+    calls = []
+    monkeypatch.setattr(stepper_gcode_machine, 'move_together',
+                        lambda *args: calls.append((args[1], args[4])) or (0, 0))
+    run(interpreter, "G1 X40 Y30")
+    assert calls == [(440, 330)]
+
+
+def test_collinear_moves_are_merged(sleeps, monkeypatch):
+    machine, interpreter = new_machine(sleeps)
+    calls = []
+    monkeypatch.setattr(stepper_gcode_machine, 'move_together',
+                        lambda *args: calls.append((args[1], args[4])) or (0, 0))
+    for line in ("G1 X10 Y10", "G1 X20 Y20", "G1 X30 Y30", "G1 X30 Y0", "G1 X40 Y0 F300"):
+        interpreter.gcode(line)
+    machine.flush()
+    # the last move runs at its own feed rate
+    assert calls == [(330, 330), (0, 330), (110, 0)]
+
+
+def test_arcs_and_empty_rapids_do_not_cycle_the_pen(sleeps, monkeypatch):
+    machine, interpreter = new_machine(sleeps)
+    pen_moves = []
+    monkeypatch.setattr(machine.motor_z, 'move', lambda steps, direction=1: pen_moves.append(direction))
+    for line in ("G1 X10 Y10", "G0 X10 Y10", "G2 X30 Y10 R10", "G1 X40 Y10"):
+        interpreter.gcode(line)
+    machine.flush()
+    assert pen_moves == []
+    interpreter.gcode("G0 X0 Y0")
+    assert pen_moves == [-1]
+
+
+def test_moves_run_once_the_input_goes_idle(sleeps, monkeypatch):
+    machine = StepperGCodeMachine(11, 1500)
+    reached = []
+
+    class TypedStdin(io.StringIO):
+        """stdin without a file descriptor, like MicroPython's, notes where the motors are at every read"""
+
+        def readline(self, *args):
+            reached.append(machine.machine_position())
+            return super().readline(*args)
+
+    monkeypatch.setattr(sys, 'stdin', TypedStdin("G1 X10 Y5\n"))
+    GcodeInterpreter(machine).interpret()
+    # waiting for the next line, the move has run
+    assert reached[1] == pytest.approx((10, 5))
@@ -0,0 +1,85 @@
+import os
+import sys
+import tracemalloc
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+from gcode_interpreter import FileIO, StreamingFileIO, GcodeInterpreter, LINE_OVERFLOW
+from null_gcode_machine import NullGCodeMachine
+
+
+def read_all(io):
+    lines = []
+    while io.has_line():
+        line = io.read_line(blocking=False)
+        assert line is not None
+        lines.append(line)
+    assert io.read_line() is None
+    return lines
+
+
+def test_same_lines_as_file_io(tmp_path):
+    path = tmp_path / 'lines.gcode'
+    path.write_bytes(b"G21\r\n\nG00 X1 Y2 ; comment\nG01 X3 Y4")
+    for buffer_size in (20, 21, 64, 512):
+        assert read_all(StreamingFileIO(str(path), buffer_size=buffer_size)) == ["G21", "", "G00 X1 Y2 ; comment", "G01 X3 Y4"]
+    assert read_all(FileIO(str(path))) == ["G21", "", "G00 X1 Y2 ; comment", "G01 X3 Y4"]
+
+
+def test_long_line_overflows_and_missing_file_is_empty(tmp_path):
+    path = tmp_path / 'long.gcode'
+    path.write_bytes(b"0123456789\nend\n012")
+    assert read_all(StreamingFileIO(str(path), buffer_size=4)) == [LINE_OVERFLOW, "end", "012"]
+    path.write_bytes(b"end\n0123456789")
+    assert read_all(StreamingFileIO(str(path), buffer_size=4)) == ["end", LINE_OVERFLOW]
+    assert read_all(StreamingFileIO(str(tmp_path / 'missing.gcode'))) == []
+
+
+def test_overflowing_line_is_answered_with_an_error(tmp_path):
+    path = tmp_path / 'overflow.gcode'
+    path.write_bytes(b"G90\nG1 X10 Y20 F500 ; too long for the buffer\nG1 X3 Y4\nM30\n")
+    machine = NullGCodeMachine(line_increment=0)
+    replies = []
+    io = StreamingFileIO(str(path), write_to_stdout=False, buffer_size=16)
+    io.write = replies.append
+    GcodeInterpreter(machine, io).interpret()
+    # no part of the long line ran, the line after it did
+    assert replies[:3] == ["ok\r\n", "error: Line overflow\r\n", "ok\r\n"]
+    assert machine.move_count == 1
+    assert (machine.absolute_x, machine.absolute_y) == (3, 4)
+
+
+@pytest.mark.parametrize('file_io', [FileIO, StreamingFileIO])
+def test_polling_loop_stops_at_the_end_of_the_file(tmp_path, file_io):
+    path = tmp_path / 'no_m30.gcode'
+    path.write_bytes(b"G90\nG1 X3 Y4\n")
+    machine = NullGCodeMachine(line_increment=0)
+    GcodeInterpreter(machine, file_io(str(path), write_to_stdout=False), use_polling=True).interpret()
+    assert (machine.absolute_x, machine.absolute_y) == (3, 4)
+
+
+def test_multi_megabyte_file_memory_is_bounded(tmp_path):
+    path = tmp_path / 'big.gcode'
+    with open(path, 'w') as f:
+        for n in range(120_000):
+            f.write(f"G01 X{n % 100}.125 Y{n % 77}.5 F500 ; segment {n}\n")
+    assert os.path.getsize(path) > 4_000_000
+
+    machine = NullGCodeMachine(line_increment=0)
+    io = StreamingFileIO(str(path), write_to_stdout=False)
+    interpreter = GcodeInterpreter(machine, io)
+    tracemalloc.start()
+    try:
+        line = io.read_line()
+        while line is not None:
+            interpreter.gcode(line)
+            line = io.read_line()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert machine.move_count == 120_000
+    assert peak < 64 * 1024
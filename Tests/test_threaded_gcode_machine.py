@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+import time
+# Ensure Sources directory is on path for imports during tests
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SOURCES = os.path.join(ROOT, 'Sources')
+if SOURCES not in sys.path:
+    sys.path.insert(0, SOURCES)
+
+import pytest
+from gcode_compiler import interpret_lines
+from null_gcode_machine import RecordingGCodeMachine
+from threaded_gcode_machine import ThreadedGCodeMachine
+
+PROGRAM = ["G90", "G0 X10 Y5", "G1 X20 Y5 F300", "G2 X30 Y5 R5", "G91", "G1 X-5 Y1", "G0 X1 Y1", "G90", "G28"]
+
+
+class SlowMachine(RecordingGCodeMachine):
+    """Takes delay seconds for every move, like the step loop, and notes the threads the moves ran in"""
+
+    def __init__(self, delay=0.0):
+        super().__init__(line_increment=0.25)
+        self.delay = delay
+        self.threads = set()
+
+    def move(self, x=None, y=None):
+        self.threads.add(threading.get_ident())
+        if self.delay:
+            time.sleep(self.delay)
+        # like the step loop, a feed hold or soft reset takes effect here
+        self.between_steps()
+        super().move(x, y)
+
+
+def test_commands_run_in_order_in_the_motion_thread():
+    direct = SlowMachine()
+    interpret_lines(direct, PROGRAM)
+    direct.end()
+
+    machine = SlowMachine()
+    threaded = ThreadedGCodeMachine(machine, size=8)
+    interpret_lines(threaded, PROGRAM)
+    threaded.end()
+
+    assert not threaded.running
+    # the moves reach the machine as whole steps, moves within a step are dropped
+    expected = []
+    for n, (x, y) in enumerate(direct.points()):
+        step = (round(x * 10), round(y * 10))
+        if not expected or step != expected[-1][0]:
+            expected.append((step, direct.pen[n], direct.rates[n]))
+    assert len(machine) == len(expected)
+    for n, (step, pen, rate) in enumerate(expected):
+        assert machine.point(n) == pytest.approx((step[0] / 10, step[1] / 10))
+        assert machine.pen[n] == pen
+        assert machine.rates[n] == pytest.approx(rate)
+    assert len(machine.threads) == 1 and threading.get_ident() not in machine.threads
+    assert not machine.is_pendown
+
+
+def test_full_buffer_holds_back_the_interpreter():
+    machine = SlowMachine(delay=0.002)
+    threaded = ThreadedGCodeMachine(machine, size=4)
+    deepest = 0
+    start = time.perf_counter()
+    for n in range(40):
+        threaded.move(n + 1, n % 3)
+        deepest = max(deepest, len(threaded.queue))
+    queued = time.perf_counter() - start
+    # the interpreter runs ahead by at most the buffer, so queueing takes about as long as the moves before it
+    assert deepest == 4
+    assert queued > 30 * 0.002
+    assert threaded.is_busy()
+    threaded.wait_idle()
+    assert not threaded.is_busy()
+    assert len(machine) == 40
+    threaded.end()
+
+
+def test_motion_thread_errors_reach_the_interpreter():
+    class FailingMachine(RecordingGCodeMachine):
+        def home(self):
+            raise OSError("endstop wiring")
+
+    threaded = ThreadedGCodeMachine(FailingMachine(), size=4)
+    threaded.home()
+    with pytest.raises(RuntimeError, match="endstop wiring"):
+        for n in range(100):
+            threaded.move(n, 0)
+            time.sleep(0.001)
+
+
+def test_soft_reset_drops_the_queued_moves():
+    machine = SlowMachine(delay=0.005)
+    threaded = ThreadedGCodeMachine(machine, size=8)
+    for n in range(8):
+        threaded.move(n + 1, 0)
+    threaded.soft_reset()
+    threaded.abort()
+    assert len(machine) < 8
+    assert not threaded.reset_requested and not machine.reset_requested
+    assert (threaded.absolute_x, threaded.absolute_y) == (machine.absolute_x, machine.absolute_y)
+    # later moves carry on from where the reset stopped the machine
+    threaded.move(20, 2)
+    threaded.end()
+    assert machine.point(len(machine) - 1) == pytest.approx((20, 2))
+
+
+def test_status_position_is_where_the_motion_thread_got_to():
+    machine = SlowMachine(delay=0.005)
+    threaded = ThreadedGCodeMachine(machine, size=8)
+    for n in range(8):
+        threaded.move(n + 1, 1)
+    # queued, the motion thread is a few moves behind
+    assert (threaded.absolute_x, threaded.absolute_y) == (8, 1)
+    assert threaded.machine_position()[0] < 8
+    threaded.wait_idle()
+    assert threaded.machine_position() == pytest.approx((8, 1))
+    threaded.end()
+
+
+def test_pen_motor_steps_are_rounded_not_truncated():
+    class PenMotor:
+        def __init__(self):
+            self.steps = []
+
+        def move(self, steps, direction=1):
+            self.steps.append(steps * direction)
+            return steps * direction
+
+    machine = SlowMachine()
+    machine.motor_z = PenMotor()
+    threaded = ThreadedGCodeMachine(machine, size=8)
+    # fine Z jogs of 0.4 steps add up instead of each dropping to 0
+    for _ in range(10):
+        threaded.motor_z.move(0.4, 1)
+    for _ in range(5):
+        threaded.motor_z.move(0.4, -1)
+    threaded.end()
+    assert sum(machine.motor_z.steps) == 2
+    assert all(steps == int(steps) for steps in machine.motor_z.steps)